@@ -0,0 +1,66 @@
+"""Connect-to-joined latency: NickServ after MOTD against SASL during CAP negotiation.
+
+Usage: python benchmarks/connect_bench.py [--rounds 20] [--channels 20] [--motd 40] [--services-delay 0.2]
+
+Both modes log in with the same password against a local FakeIRCServer whose
+NickServ answers after --services-delay seconds. 'nickserv' waits for that
+answer (nickservWait) before joining after the MOTD; 'sasl' authenticates
+before registration and joins as soon as the welcome burst ends. Reports the
+median and worst time from connect() to the last JOIN echo.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyircsdk import AsyncIRCSDK, IRCSDKConfig  # noqa: E402
+
+
+async def connectToJoined(port, mode, channels):
+    options = dict(nickservWait=True) if mode == 'nickserv' else dict(saslPassword='secret')
+    irc = AsyncIRCSDK(IRCSDKConfig(host='127.0.0.1', port=port, nick='bench', user='bench', realname='bench',
+                                   channels=channels, nickservPassword='secret', ssl=False, nodataTimeout=0,
+                                   **options))
+    joined = set()
+    done = asyncio.Event()
+
+    def on_message(message):
+        if message.command == 'JOIN' and message.messageFrom == 'bench':
+            joined.add(message.messageTo or message.trailing)
+            if len(joined) == len(channels):
+                done.set()
+    irc.event.on('message', on_message)
+
+    start = time.perf_counter()
+    task = asyncio.ensure_future(irc.connect())
+    await asyncio.wait_for(done.wait(), 30)
+    elapsed = time.perf_counter() - start
+    task.cancel()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--channels', type=int, default=20)
+    parser.add_argument('--motd', type=int, default=40, help='MOTD lines')
+    parser.add_argument('--services-delay', type=float, default=0.2, help='seconds NickServ takes to answer')
+    args = parser.parse_args()
+
+    from benchmarks.harness import FakeIRCServer
+    server = FakeIRCServer(messages=0, caps=('sasl=PLAIN,EXTERNAL', 'server-time', 'multi-prefix'),
+                           motdLines=args.motd, servicesDelay=args.services_delay).start_in_thread()
+    channels = ['#bench%d' % i for i in range(args.channels)]
+
+    print('%-9s %12s %12s' % ('mode', 'median (ms)', 'max (ms)'))
+    for mode in ('nickserv', 'sasl'):
+        times = [asyncio.run(connectToJoined(server.port, mode, channels)) for _ in range(args.rounds)]
+        print('%-9s %12.1f %12.1f' % (mode, statistics.median(times) * 1000, max(times) * 1000))
+
+
+if __name__ == '__main__':
+    main()
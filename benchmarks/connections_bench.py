@@ -0,0 +1,115 @@
+"""Compare the blocking IRCSDK (one thread per bot) with AsyncIRCSDK (one loop).
+
+Usage: python benchmarks/connections_bench.py [--clients 50] [--messages 2000]
+
+Each mode runs in a fresh subprocess against a local FakeIRCServer so that the
+reported peak RSS belongs to the client alone.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyircsdk import AsyncIRCSDK, IRCSDK, IRCSDKConfig  # noqa: E402
+
+
+def make_config(port, i):
+    return IRCSDKConfig(host='127.0.0.1', port=port, nick='bot%d' % i, user='bot', realname='bench',
+                        ssl=False, nodataTimeout=0)
+
+
+def track(irc, counter, done):
+    def on_message(message):
+        if message.command == 'PRIVMSG':
+            if message.message == 'done':
+                done()
+            else:
+                counter[0] += 1
+    irc.event.on('message', on_message)
+
+
+def run_blocking(port, clients):
+    counter = [0]
+    finished = threading.Semaphore(0)
+    for i in range(clients):
+        irc = IRCSDK(make_config(port, i))
+        track(irc, counter, finished.release)
+        threading.Thread(target=irc.connect, daemon=True).start()
+    for _ in range(clients):
+        finished.acquire()
+    return counter[0]
+
+
+def run_asyncio(port, clients):
+    async def main():
+        counter = [0]
+        remaining = [clients]
+        all_done = asyncio.Event()
+
+        def done():
+            remaining[0] -= 1
+            if not remaining[0]:
+                all_done.set()
+
+        tasks = []
+        for i in range(clients):
+            irc = AsyncIRCSDK(make_config(port, i))
+            track(irc, counter, done)
+            tasks.append(asyncio.ensure_future(irc.connect()))
+        await all_done.wait()
+        for task in tasks:
+            task.cancel()
+        return counter[0]
+
+    return asyncio.run(main())
+
+
+def child(mode, port, clients):
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        received = (run_blocking if mode == 'blocking' else run_asyncio)(port, clients)
+        threads = threading.active_count()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'mode': mode,
+        'messages': received,
+        'seconds': elapsed,
+        'msgs_per_sec': received / elapsed,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'threads': threads,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--messages', type=int, default=2000, help='messages per client')
+    parser.add_argument('--mode', choices=['blocking', 'asyncio'])
+    parser.add_argument('--port', type=int)
+    args = parser.parse_args()
+
+    if args.mode:
+        child(args.mode, args.port, args.clients)
+        return
+
+    from benchmarks.harness import FakeIRCServer
+    server = FakeIRCServer(messages=args.messages).start_in_thread()
+    print('%-9s %8s %12s %10s %8s' % ('mode', 'clients', 'msgs/sec', 'rss (MB)', 'threads'))
+    for mode in ('blocking', 'asyncio'):
+        out = subprocess.run([sys.executable, __file__, '--mode', mode, '--port', str(server.port),
+                              '--clients', str(args.clients)], capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        print('%-9s %8d %12.0f %10.1f %8d' % (mode, args.clients, result['msgs_per_sec'],
+                                              result['max_rss_mb'], result['threads']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Module dispatch cost: legacy 'message' listeners versus the command Router.
+
+Usage: python benchmarks/dispatch_bench.py [--messages 20000]
+
+Loads N fantasy-command modules (!cmd0 .. !cmdN-1) and pushes a mix of
+PRIVMSG, PING, JOIN and numeric lines through IRCSDK.handle_raw_message,
+reporting the time per message for each N.
+"""
+import argparse
+import os
+import sys
+import time
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyircsdk import IRCSDK, IRCSDKConfig, Module  # noqa: E402
+
+
+class BenchModule(Module):
+    def handleCommand(self, message, command):
+        if message.command == 'PRIVMSG' and command.command == self.fantasy + self.command:
+            self.hits += 1
+
+    def handleError(self, message, command, error):
+        pass
+
+
+class RoutedBenchModule(BenchModule):
+    ircCommands = ('PRIVMSG',)
+
+
+def workload(count):
+    lines = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            lines.append(':nick!user@host PRIVMSG #channel :!cmd%d some args' % (i % 5))
+        elif kind == 1:
+            lines.append(':nick!user@host PRIVMSG #channel :ordinary chatter here')
+        elif kind == 2:
+            lines.append(':nick!user@host JOIN #channel')
+        else:
+            lines.append(':server 353 nick = #channel :@op +voice regular')
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+
+def run(module_class, modules, raw, count):
+    irc = IRCSDK(IRCSDKConfig(host='127.0.0.1', port=6667, ssl=False))
+    irc.irc = MagicMock()
+    loaded = []
+    for i in range(modules):
+        module = module_class(irc, '!', 'cmd%d' % i)
+        module.hits = 0
+        module.startListening()
+        loaded.append(module)
+    start = time.perf_counter()
+    irc.handle_raw_message(raw)
+    elapsed = time.perf_counter() - start
+    assert sum(m.hits for m in loaded) == count // 4
+    return elapsed / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=20000)
+    args = parser.parse_args()
+    raw = workload(args.messages)
+
+    print('%-8s %16s %16s' % ('modules', 'legacy (us/msg)', 'router (us/msg)'))
+    for modules in (5, 50, 500):
+        legacy = run(BenchModule, modules, raw, args.messages)
+        routed = run(RoutedBenchModule, modules, raw, args.messages)
+        print('%-8d %16.2f %16.2f' % (modules, legacy, routed))
+
+
+if __name__ == '__main__':
+    main()
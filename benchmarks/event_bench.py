@@ -0,0 +1,109 @@
+"""Event bus: emit throughput with 1 to 1000 listeners, and subscribe/unsubscribe churn.
+
+Usage: python benchmarks/event_bench.py [--emits 200000]
+
+Compares the current Event with the list-based one it replaced (inlined here
+as LegacyEvent). Emit cost is reported per call and per listener call, along
+with the bytes allocated across 1000 emits, which should not grow with them.
+Churn adds N listeners and removes them in random order: by callback
+for both, and by handle with Event.off.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyircsdk.event.event import Event  # noqa: E402
+
+
+class LegacyEvent:
+    def __init__(self):
+        self.listeners = {}
+
+    def emit(self, name, data):
+        if name in self.listeners:
+            for callback in self.listeners[name]:
+                callback(data)
+
+    def on(self, name, callback):
+        if name not in self.listeners:
+            self.listeners[name] = []
+        self.listeners[name].append(callback)
+
+    def remove(self, name, callback):
+        if name in self.listeners:
+            try:
+                self.listeners[name].remove(callback)
+            except ValueError:
+                pass
+
+
+def makeListeners(count):
+    # distinct callables, so removal by callback has to search
+    return [(lambda data: None) for _ in range(count)]
+
+
+def timeEmits(event, emits):
+    emit = event.emit
+    emit('message', None)  # resolve the snapshot outside the timing
+    start = time.perf_counter()
+    for _ in range(emits):
+        emit('message', None)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(1000):
+        emit('message', None)
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return elapsed, allocated
+
+
+def churn(eventClass, count, byHandle, rng):
+    event = eventClass()
+    callbacks = makeListeners(count)
+    start = time.perf_counter()
+    handles = [event.on('message', callback) for callback in callbacks]
+    order = list(range(count))
+    rng.shuffle(order)
+    for i in order:
+        if byHandle:
+            event.off(handles[i])
+        else:
+            event.remove('message', callbacks[i])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--emits', type=int, default=200000, help='total listener calls per case')
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    print('%-9s %10s %12s %14s %12s' % ('impl', 'listeners', 'ns/emit', 'ns/listener', 'alloc (B)'))
+    for count in (1, 10, 100, 1000):
+        emits = max(100, args.emits // count)
+        for name, eventClass in (('legacy', LegacyEvent), ('current', Event)):
+            event = eventClass()
+            for callback in makeListeners(count):
+                event.on('message', callback)
+            elapsed, allocated = timeEmits(event, emits)
+            print('%-9s %10d %12.0f %14.1f %12d' % (name, count, elapsed / emits * 1e9,
+                                                   elapsed / emits / count * 1e9, allocated))
+
+    print()
+    print('%-18s %10s %12s' % ('churn', 'listeners', 'ms'))
+    for count in (100, 1000, 10000):
+        for name, eventClass, byHandle in (('legacy remove', LegacyEvent, False),
+                                           ('current remove', Event, False),
+                                           ('current off', Event, True)):
+            print('%-18s %10d %12.2f' % (name, count, churn(eventClass, count, byHandle, rng) * 1000))
+
+
+if __name__ == '__main__':
+    main()
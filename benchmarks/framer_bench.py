@@ -0,0 +1,63 @@
+"""Receive-buffer framing: the old str buffer versus LineFramer.
+
+Usage: python benchmarks/framer_bench.py
+
+Replays the tests/stress_test.py workloads (N PRIVMSG lines delivered in one
+buffer, and the same lines in 4 KiB recv-sized chunks) at growing N. The str
+buffer re-splits the whole remainder for every line, so its time per line
+grows with N; the framer's stays flat.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyircsdk.framer import LineFramer  # noqa: E402
+
+
+def str_buffer(chunks):
+    """The pre-LineFramer IRCSDK.handle_raw_message buffering"""
+    buffer = ''
+    lines = 0
+    for data in chunks:
+        buffer += data.decode('utf-8')
+        while '\r\n' in buffer:
+            line, buffer = buffer.split('\r\n', 1)
+            if line:
+                lines += 1
+    return lines
+
+
+def line_framer(chunks):
+    framer = LineFramer()
+    lines = 0
+    for data in chunks:
+        lines += len(framer.feed(data))
+    return lines
+
+
+def workload(count):
+    lines = [':user%d!user@host PRIVMSG #channel :Message number %d' % (i, i) for i in range(count)]
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+
+def timed(fn, chunks, expected):
+    start = time.perf_counter()
+    assert fn(chunks) == expected
+    return time.perf_counter() - start
+
+
+def main():
+    print('%-8s %-12s %16s %16s' % ('lines', 'delivery', 'str (us/line)', 'framer (us/line)'))
+    for count in (1000, 4000, 16000, 64000):
+        raw = workload(count)
+        for delivery, chunks in (('one buffer', [raw]),
+                                 ('4k chunks', [raw[i:i + 4096] for i in range(0, len(raw), 4096)])):
+            old = timed(str_buffer, chunks, count)
+            new = timed(line_framer, chunks, count)
+            print('%-8d %-12s %16.3f %16.3f' % (count, delivery, old / count * 1e6, new / count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
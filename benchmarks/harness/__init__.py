@@ -0,0 +1,2 @@
+from .server import FakeIRCServer, selfSignedContext
+from . import traffic
@@ -0,0 +1,60 @@
+"""Parser conformance corpus: every backend in pyircsdk.parser.BACKENDS must agree with it.
+
+Each entry is (line, rawTags, prefix, command, params, trailing). The edge
+cases pin down how malformed input is split, so a faster backend can't
+quietly read it differently.
+"""
+
+PARSER_CORPUS = [
+    # Everyday traffic
+    (':nick!user@host PRIVMSG #channel :Hello world', None, 'nick!user@host', 'PRIVMSG', ['#channel'], 'Hello world'),
+    (':nick!user@host JOIN #channel', None, 'nick!user@host', 'JOIN', ['#channel'], None),
+    (':nick!user@host JOIN #channel * :Real Name', None, 'nick!user@host', 'JOIN', ['#channel', '*'], 'Real Name'),
+    (':nick!user@host PART #channel :Leaving', None, 'nick!user@host', 'PART', ['#channel'], 'Leaving'),
+    (':nick!user@host QUIT :Ping timeout: 240 seconds', None, 'nick!user@host', 'QUIT', [],
+     'Ping timeout: 240 seconds'),
+    (':nick!user@host NICK newnick', None, 'nick!user@host', 'NICK', ['newnick'], None),
+    (':nick!user@host MODE #channel +ov a b', None, 'nick!user@host', 'MODE', ['#channel', '+ov', 'a', 'b'], None),
+    (':op!u@h KICK #channel victim :bye now', None, 'op!u@h', 'KICK', ['#channel', 'victim'], 'bye now'),
+    ('PING :server.example.com', None, None, 'PING', [], 'server.example.com'),
+    ('PING server.example.com', None, None, 'PING', ['server.example.com'], None),
+    (':server.example.com PONG server.example.com :token', None, 'server.example.com', 'PONG',
+     ['server.example.com'], 'token'),
+    (':server 001 nick :Welcome to the network', None, 'server', '001', ['nick'], 'Welcome to the network'),
+    (':server 005 nick CHANTYPES=# PREFIX=(ov)@+ :are supported by this server', None, 'server', '005',
+     ['nick', 'CHANTYPES=#', 'PREFIX=(ov)@+'], 'are supported by this server'),
+    (':server 353 nick = #channel :@op +voice regular', None, 'server', '353', ['nick', '=', '#channel'],
+     '@op +voice regular'),
+    (':server CAP * LS :multi-prefix sasl=PLAIN,EXTERNAL', None, 'server', 'CAP', ['*', 'LS'],
+     'multi-prefix sasl=PLAIN,EXTERNAL'),
+    ('AUTHENTICATE +', None, None, 'AUTHENTICATE', ['+'], None),
+    ('ERROR :Closing Link: nick (Quit)', None, None, 'ERROR', [], 'Closing Link: nick (Quit)'),
+    ('AWAY', None, None, 'AWAY', [], None),
+    # IRCv3 tags
+    ('@time=2024-01-01T00:00:00.000Z;msgid=abc :nick!user@host PRIVMSG #channel :Hi there',
+     'time=2024-01-01T00:00:00.000Z;msgid=abc', 'nick!user@host', 'PRIVMSG', ['#channel'], 'Hi there'),
+    ('@account=bob PING :server', 'account=bob', None, 'PING', [], 'server'),
+    ('@+typing=active :n!u@h TAGMSG #channel', '+typing=active', 'n!u@h', 'TAGMSG', ['#channel'], None),
+    ('@a=x\\sy\\:z :n!u@h PRIVMSG #c :escaped', 'a=x\\sy\\:z', 'n!u@h', 'PRIVMSG', ['#c'], 'escaped'),
+    # Trailing parameters
+    (':n!u@h PRIVMSG #c :a :b  c ', None, 'n!u@h', 'PRIVMSG', ['#c'], 'a :b  c '),
+    (':n!u@h PRIVMSG #c :', None, 'n!u@h', 'PRIVMSG', ['#c'], ''),
+    (':n!u@h PRIVMSG #c ::)', None, 'n!u@h', 'PRIVMSG', ['#c'], ':)'),
+    (':n!u@h PRIVMSG #c :caf\xe9 ☃ \U0001f600', None, 'n!u@h', 'PRIVMSG', ['#c'], 'caf\xe9 ☃ \U0001f600'),
+    (':n!u@h PRIVMSG #c :\x01ACTION waves\x01', None, 'n!u@h', 'PRIVMSG', ['#c'], '\x01ACTION waves\x01'),
+    (':n!u@h PRIVMSG #c:x', None, 'n!u@h', 'PRIVMSG', ['#c:x'], None),
+    # Malformed or unusual spacing
+    (':server  PING   a  b  :c', None, 'server', 'PING', ['a', 'b'], 'c'),
+    (':n!u@h PRIVMSG\t#c :tab', None, 'n!u@h', 'PRIVMSG\t#c', [], 'tab'),
+    ('PRIVMSG #c  :two spaces', None, None, 'PRIVMSG', ['#c'], 'two spaces'),
+    (' PING :leading space', None, None, 'PING', [], 'leading space'),
+    ('@a=1  PING :x', 'a=1', None, 'PING', [], 'x'),
+    ('@ PING :x', '', None, 'PING', [], 'x'),
+    ('@a=1', 'a=1', None, '', [], None),
+    (':server', None, None, ':server', [], None),
+    (':server :x', None, None, ':server', [], 'x'),
+    (':server  :x', None, None, ':server', [], 'x'),
+    (' :x', None, None, '', [], 'x'),
+    (':', None, None, ':', [], None),
+    ('', None, None, '', [], None),
+]
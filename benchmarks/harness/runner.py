@@ -0,0 +1,203 @@
+"""Drive a client with FakeIRCServer traffic and report throughput, latency and memory.
+
+Usage: python -m benchmarks.harness.runner [--scenario privmsg|names|netsplit|replay] [--lines 100000] [--rate 0]
+                                           [--tls] [--client blocking|asyncio] [--drop-every N] [--reply-every N]
+                                           [--json out.json] [--baseline base.json --tolerance 0.2]
+
+Run it from the repository root.
+
+The server runs in its own process and tags every traffic line with the time
+its batch was written, so latency is measured from the server's write to the
+client's 'message' listener (CLOCK_MONOTONIC, shared by processes on Linux
+and macOS). Peak RSS belongs to the client process alone. With --baseline the
+run exits with status 1 when it is more than --tolerance worse than that
+earlier --json result.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from pyircsdk import AsyncIRCSDK, IRCSDK, IRCSDKConfig
+from . import traffic
+from .server import SENT_TAG, FakeIRCServer, selfSignedContext
+
+_TAG = SENT_TAG.decode() + '='
+
+SCENARIOS = {
+    'privmsg': lambda o, nick: traffic.privmsgStorm(o['lines'], o['channels'], o['users']),
+    'names': lambda o, nick: traffic.namesFlood(nick, o['channels'], o['members']),
+    'netsplit': lambda o, nick: traffic.netsplit(o['users'], o['channels']),
+    'replay': lambda o, nick: traffic.replay(o['log'], o['loops']),
+}
+
+# Result keys compared against a baseline, and whether a higher value is better
+_COMPARED = {'lines_per_sec': True, 'latency_p50_ms': False, 'latency_p99_ms': False, 'max_rss_mb': False}
+
+
+def _serve(options: dict, ports) -> None:
+    async def main():
+        # One iterator for all connections, so a reconnecting client picks up where it was dropped
+        lines = iter(SCENARIOS[options['scenario']](options, 'bench'))
+        server = await FakeIRCServer(traffic=lambda nick: lines, rate=options['rate'],
+                                     dropAfter=options['drop_every'], stamp=True,
+                                     sslContext=selfSignedContext() if options['tls'] else None).start()
+        ports.put(server.port)
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def _percentile(values: list, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def runClient(port: int, options: dict) -> dict:
+    """Connect one client to the server on port and measure it until the done marker"""
+    config = IRCSDKConfig(host='127.0.0.1', port=port, nick='bench', user='bench', realname='bench',
+                          ssl=options['tls'], allowAnySSL=True, sendRate=0, pingInterval=0, caps=[],
+                          autoReconnect=bool(options['drop_every']), reconnectDelay=0.01)
+    latencies = []
+    first = [None]
+    finished = threading.Event()
+    replyEvery = options['reply_every']
+    reconnects = [-1]
+
+    def track(irc):
+        def on_message(message):
+            rawTags = message.rawTags
+            if rawTags and rawTags.startswith(_TAG):
+                now = time.perf_counter_ns()
+                end = rawTags.find(';')
+                latencies.append(now - int(rawTags[len(_TAG):end] if end != -1 else rawTags[len(_TAG):]))
+                if first[0] is None:
+                    first[0] = now
+                if replyEvery and len(latencies) % replyEvery == 0:
+                    irc.privmsg('#bench', 'ack %d' % len(latencies))
+            elif message.command == 'PRIVMSG' and message.prefix == 'bench' and message.trailing == 'done':
+                first.append(time.perf_counter_ns())
+                finished.set()
+
+        def on_connecting(data):
+            reconnects[0] += 1
+        irc.event.on('message', on_message)
+        irc.event.on('connecting', on_connecting)
+
+    if options['client'] == 'asyncio':
+        def run():
+            async def main():
+                irc = AsyncIRCSDK(config)
+                track(irc)
+                task = asyncio.ensure_future(irc.connect())
+                while not finished.is_set() and not task.done():
+                    await asyncio.sleep(0.05)
+                task.cancel()
+            asyncio.run(main())
+        threading.Thread(target=run, daemon=True).start()
+    else:
+        irc = IRCSDK(config)
+        track(irc)
+        threading.Thread(target=irc.connect, daemon=True).start()
+
+    if not finished.wait(options['timeout']):
+        raise TimeoutError('no done marker after %s seconds (%d lines received)'
+                           % (options['timeout'], len(latencies)))
+    elapsed = (first[-1] - first[0]) / 1e9 if first[0] is not None else 0.0
+    latencies.sort()
+    return {
+        'scenario': options['scenario'],
+        'client': options['client'],
+        'tls': options['tls'],
+        'lines': len(latencies),
+        'seconds': elapsed,
+        'lines_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_p50_ms': _percentile(latencies, 0.50) / 1e6,
+        'latency_p99_ms': _percentile(latencies, 0.99) / 1e6,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None,
+        'reconnects': reconnects[0],
+    }
+
+
+def run(options: dict) -> dict:
+    """Start the server process, run the client against it and return the results"""
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(options, ports), daemon=True)
+    server.start()
+    try:
+        return runClient(ports.get(timeout=30), options)
+    finally:
+        server.terminate()
+        server.join()
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Descriptions of the results that are more than tolerance worse than the baseline"""
+    regressions = []
+    for key, higherIsBetter in _COMPARED.items():
+        new, old = result.get(key), baseline.get(key)
+        if not new or not old:
+            continue
+        change = (new - old) / old
+        if (-change if higherIsBetter else change) > tolerance:
+            regressions.append('%s: %.3f -> %.3f (%+.0f%%)' % (key, old, new, change * 100))
+    return regressions
+
+
+def parseArgs(argv=None) -> dict:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.harness.runner', description=__doc__.split('\n')[0])
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='privmsg')
+    parser.add_argument('--lines', type=int, default=100000, help='PRIVMSG lines (privmsg)')
+    parser.add_argument('--channels', type=int, default=10)
+    parser.add_argument('--users', type=int, default=1000, help='distinct senders (privmsg) or split users (netsplit)')
+    parser.add_argument('--members', type=int, default=500, help='nicks per channel (names)')
+    parser.add_argument('--log', help='raw IRC log to replay (replay)')
+    parser.add_argument('--loops', type=int, default=1, help='times to replay --log')
+    parser.add_argument('--rate', type=float, default=0.0, help='target lines per second, 0 for as fast as possible')
+    parser.add_argument('--tls', action='store_true', help='serve TLS with a generated self-signed certificate')
+    parser.add_argument('--client', choices=['blocking', 'asyncio'], default='blocking')
+    parser.add_argument('--drop-every', type=int, default=0, help='drop the connection every N lines')
+    parser.add_argument('--reply-every', type=int, default=0, help='send a PRIVMSG for every N lines received')
+    parser.add_argument('--timeout', type=float, default=300.0)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', help='results of an earlier --json run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression (default 0.2)')
+    args = parser.parse_args(argv)
+    if args.scenario == 'replay' and not args.log:
+        parser.error('--scenario replay needs --log')
+    return vars(args)
+
+
+def main(argv=None) -> int:
+    options = parseArgs(argv)
+    result = run(options)
+    print('%-9s %-9s %10s %12s %10s %10s %10s' % ('scenario', 'client', 'lines', 'lines/sec', 'p50 (ms)',
+                                                 'p99 (ms)', 'rss (MB)'))
+    print('%-9s %-9s %10d %12.0f %10.2f %10.2f %10s' % (
+        result['scenario'], result['client'] + ('+tls' if result['tls'] else ''), result['lines'],
+        result['lines_per_sec'], result['latency_p50_ms'], result['latency_p99_ms'],
+        '%.1f' % result['max_rss_mb'] if result['max_rss_mb'] is not None else '-'))
+    if result['reconnects']:
+        print('reconnects: %d' % result['reconnects'])
+    if options['json']:
+        with open(options['json'], 'w') as out:
+            json.dump(result, out, indent=2)
+    if options['baseline']:
+        with open(options['baseline']) as base:
+            regressions = compare(result, json.load(base), options['tolerance'])
+        for regression in regressions:
+            print('regression: ' + regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import asyncio
+import itertools
+import os
+import ssl
+import threading
+import time
+
+# Tag the server puts on traffic lines: perf_counter_ns() when their batch was written
+SENT_TAG = b'+pyircsdk/sent'
+
+# Self-signed certificate and key for localhost, 127.0.0.1 and ::1, valid until 2126
+CERTIFICATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'localhost.pem')
+
+
+class FakeIRCServer:
+    """Minimal asyncio IRC server for benchmarks and socket-level tests.
+
+    Each client is welcomed once it registers, then receives the lines of
+    ``traffic(nick)`` (default: ``messages`` PRIVMSG lines) followed by a
+    ``:bench PRIVMSG #bench :done`` marker. With ``caps`` it also answers CAP
+    LS/REQ/END and SASL (any credentials succeed); JOINs are echoed back and a
+    NickServ IDENTIFY is confirmed after ``servicesDelay``.
+
+    ``rate`` paces traffic to that many lines per second, ``dropAfter`` closes
+    a connection after that many traffic lines (a shared traffic iterator then
+    continues on the reconnect), ``stamp`` adds a SENT_TAG to every traffic
+    line and ``sslContext`` serves TLS. Lines clients send are counted in
+    ``received``.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, messages=1000, caps=None, motdLines=0, servicesDelay=0.0,
+                 traffic=None, rate=0.0, dropAfter=0, stamp=False, sslContext=None):
+        self.host = host
+        self.port = port
+        self.messages = messages
+        self.caps = caps
+        self.motdLines = motdLines
+        self.servicesDelay = servicesDelay
+        self.traffic = traffic
+        self.rate = rate
+        self.dropAfter = dropAfter
+        self.stamp = stamp
+        self.sslContext = sslContext
+        self.clients = 0
+        self.received = 0
+        self._writers = set()
+        self._loop = None
+        self._server = None
+
+    async def _register(self, reader, writer):
+        """Read lines until NICK, USER and (if started) CAP END arrived, returning the nick or None"""
+        nick = 'bot'
+        registered = set()
+        negotiating = False
+        while len(registered) < 2 or negotiating:
+            line = await reader.readline()
+            if not line:
+                return None
+            self.received += 1
+            words = line.rstrip(b'\r\n').split(b' ')
+            verb = words[0].upper()
+            if verb in (b'NICK', b'USER'):
+                registered.add(verb)
+                if verb == b'NICK':
+                    nick = words[1].decode()
+            elif verb == b'CAP' and self.caps is not None:
+                sub = words[1].upper() if len(words) > 1 else b''
+                if sub == b'LS':
+                    negotiating = True
+                    writer.write(b':fake.server CAP * LS :' + ' '.join(self.caps).encode() + b'\r\n')
+                elif sub == b'REQ':
+                    writer.write(b':fake.server CAP * ACK :' + b' '.join(words[2:]).lstrip(b':') + b'\r\n')
+                elif sub == b'END':
+                    negotiating = False
+            elif verb == b'AUTHENTICATE':
+                if words[1] in (b'PLAIN', b'EXTERNAL'):
+                    writer.write(b'AUTHENTICATE +\r\n')
+                else:
+                    writer.write((':fake.server 900 %s %s!u@h %s :You are now logged in\r\n' % (nick, nick, nick))
+                                 .encode())
+                    writer.write((':fake.server 903 %s :SASL authentication successful\r\n' % nick).encode())
+        return nick
+
+    def _lines(self, nick):
+        if self.traffic is not None:
+            return self.traffic(nick)
+        return itertools.repeat(b':user!user@host PRIVMSG #bench :benchmark payload line with some words\r\n',
+                                self.messages)
+
+    async def _stream(self, writer, lines) -> bool:
+        """Write lines in batches, returning False if the connection was dropped after dropAfter lines"""
+        loop = asyncio.get_running_loop()
+        size = max(1, min(100, int(self.rate // 100))) if self.rate else 100  # ~10ms of lines per batch
+        started = loop.time()
+        sent = 0
+        while True:
+            batch = list(itertools.islice(lines, size))
+            if not batch:
+                return True
+            if self.stamp:
+                tag = b'@%s=%d' % (SENT_TAG, time.perf_counter_ns())
+                batch = [tag + (b';' + line[1:] if line[:1] == b'@' else b' ' + line) for line in batch]
+            writer.write(b''.join(batch))
+            await writer.drain()
+            sent += len(batch)
+            if self.dropAfter and sent >= self.dropAfter:
+                writer.close()
+                return False
+            if self.rate:
+                delay = started + sent / self.rate - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+    async def _handle_client(self, reader, writer):
+        self.clients += 1
+        self._writers.add(writer)
+        try:
+            await self._serve(reader, writer)
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _serve(self, reader, writer):
+        nick = await self._register(reader, writer)
+        if nick is None:
+            return
+
+        writer.write((':fake.server 001 %s :Welcome\r\n' % nick).encode())
+        writer.write((':fake.server 005 %s CHANTYPES=# TARGMAX=JOIN: :are supported\r\n' % nick).encode())
+        for i in range(self.motdLines):
+            writer.write((':fake.server 372 %s :- message of the day line %d\r\n' % (nick, i)).encode())
+        writer.write((':fake.server 376 %s :End of /MOTD command.\r\n' % nick).encode())
+        if not await self._stream(writer, iter(self._lines(nick))):
+            return
+        writer.write(b':bench PRIVMSG #bench :done\r\n')
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            self.received += 1
+            words = line.rstrip(b'\r\n').split(b' ')
+            verb = words[0].upper()
+            if verb == b'JOIN':
+                for channel in words[1].decode().split(','):
+                    writer.write((':%s!u@h JOIN %s\r\n' % (nick, channel)).encode())
+            elif verb == b'PING':
+                writer.write(b':fake.server PONG fake.server ' + b' '.join(words[1:]) + b'\r\n')
+            elif verb == b'PRIVMSG' and words[1].lower() == b'nickserv':
+                await asyncio.sleep(self.servicesDelay)
+                writer.write((':NickServ!s@services NOTICE %s :You are now identified\r\n' % nick).encode())
+
+    def dropClients(self) -> None:
+        """Close every client connection, e.g. to make clients reconnect (call from the server's loop)"""
+        for writer in list(self._writers):
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port, backlog=4096,
+                                                  ssl=self.sslContext)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    def start_in_thread(self):
+        """Run the server on its own loop in a daemon thread, returning once listening"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        return self
+
+    def stop(self) -> None:
+        """Stop a server started with start_in_thread"""
+        if self._loop is not None:
+            def shutdown():
+                self._server.close()
+                self.dropClients()
+            self._loop.call_soon_threadsafe(shutdown)
+
+
+def selfSignedContext() -> ssl.SSLContext:
+    """Server SSLContext with the checked-in self-signed localhost certificate; for tests and benchmarks only"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(CERTIFICATE)
+    return context
@@ -0,0 +1,46 @@
+"""Traffic for FakeIRCServer: synthesized floods and replayed logs.
+
+Every generator lazily yields complete lines as bytes ending in CRLF, so a
+storm of millions of lines costs no memory up front.
+"""
+
+
+def privmsgStorm(count: int, channels: int = 10, users: int = 1000, text: str = 'storm payload line'):
+    """count PRIVMSG lines from users rotating across channels"""
+    text = text.encode('utf-8')
+    for i in range(count):
+        yield b':user%d!user@host PRIVMSG #chan%d :%s %d\r\n' % (i % users, i % channels, text, i)
+
+
+def namesFlood(nick: str, channels: int = 100, members: int = 500, perLine: int = 30):
+    """RPL_NAMREPLY/RPL_ENDOFNAMES for channels channels of members members, as after a mass join"""
+    nick = nick.encode('utf-8')
+    for c in range(channels):
+        names = [b'%suser%d' % (b'@' if m % 20 == 0 else b'+' if m % 7 == 0 else b'', m) for m in range(members)]
+        for start in range(0, members, perLine):
+            yield b':fake.server 353 %s = #chan%d :%s\r\n' % (nick, c, b' '.join(names[start:start + perLine]))
+        yield b':fake.server 366 %s #chan%d :End of /NAMES list.\r\n' % (nick, c)
+
+
+def netsplit(users: int = 2000, channels: int = 10, servers: bytes = b'hub.example.net leaf.example.net'):
+    """users QUIT with a netsplit reason, then rejoin (netjoin) and get their channel modes back"""
+    for u in range(users):
+        yield b':user%d!user@host QUIT :%s\r\n' % (u, servers)
+    leaf = servers.split()[-1]
+    for u in range(users):
+        yield b':user%d!user@host JOIN #chan%d\r\n' % (u, u % channels)
+    for c in range(channels):
+        ops = [b'user%d' % u for u in range(c, users, channels * 20)]
+        for start in range(0, len(ops), 4):
+            chunk = ops[start:start + 4]
+            yield b':%s MODE #chan%d +%s %s\r\n' % (leaf, c, b'o' * len(chunk), b' '.join(chunk))
+
+
+def replay(path: str, loops: int = 1):
+    """Lines of a raw IRC log (one protocol line per line, blank lines skipped), loops times over"""
+    for _ in range(loops):
+        with open(path, 'rb') as log:
+            for line in log:
+                line = line.rstrip(b'\r\n')
+                if line:
+                    yield line + b'\r\n'
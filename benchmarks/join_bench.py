@@ -0,0 +1,61 @@
+"""Time to full channel presence: one JOIN per channel against join_many batching.
+
+Usage: python benchmarks/join_bench.py [--channels 200] [--rate 2] [--burst 5] [--keyed 0.1]
+
+Replays the outgoing JOIN lines through the default TokenBucket on a virtual
+clock, so the reported times are what the flood control alone costs; the
+legacy figure adds the 0.5s sleep the old per-channel join loop used.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyircsdk.isupport import ISupport  # noqa: E402
+from pyircsdk.writer import TokenBucket  # noqa: E402
+
+LEGACY_SLEEP = 0.5
+
+
+def drain(lines, rate, burst, sleep=0.0):
+    """Virtual seconds until the last line leaves the bucket"""
+    bucket = TokenBucket(rate, burst)
+    now = bucket._updated
+    start = now
+    for _ in lines:
+        now += bucket.delay(now)
+        bucket.delay(now)
+        bucket.consume()
+        now += sleep
+    return now - start - sleep
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--channels', type=int, default=200)
+    parser.add_argument('--rate', type=float, default=2.0)
+    parser.add_argument('--burst', type=int, default=5)
+    parser.add_argument('--keyed', type=float, default=0.1, help='share of channels with a key')
+    args = parser.parse_args()
+
+    channels = ['#channel-%04d' % i for i in range(args.channels)]
+    step = int(1 / args.keyed) if args.keyed else 0
+    keys = [('key%d' % i if step and i % step == 0 else None) for i in range(args.channels)]
+    isupport = ISupport()
+
+    legacy = ['JOIN %s%s\r\n' % (channel, ' ' + key if key else '') for channel, key in zip(channels, keys)]
+    start = time.perf_counter()
+    batched = isupport.packJoin(channels, keys)
+    packing = time.perf_counter() - start
+
+    print('channels %d, rate %.1f/s, burst %d' % (args.channels, args.rate, args.burst))
+    print('legacy   %4d lines %10.1f s' % (len(legacy), drain(legacy, args.rate, args.burst, LEGACY_SLEEP)))
+    print('per-line %4d lines %10.1f s (bucket only)' % (len(legacy), drain(legacy, args.rate, args.burst)))
+    print('batched  %4d lines %10.1f s (packed in %.2f ms)' % (
+        len(batched), drain(batched, args.rate, args.burst), packing * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""ConnectionManager scaling: CPU and memory per session for 1..1000 sessions.
+
+Usage: python benchmarks/manager_bench.py [--sessions 1 10 100 1000] [--messages 200]
+
+The fake server runs in its own process; each session count is measured in a
+fresh client process so CPU time and peak RSS belong to the manager alone.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyircsdk import ConnectionManager, IRCSDKConfig  # noqa: E402
+
+
+def serve(messages, ports):
+    import asyncio
+    from benchmarks.harness import FakeIRCServer
+
+    async def main():
+        server = await FakeIRCServer(messages=messages).start()
+        ports.put(server.port)
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def child(port, sessions):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    manager = ConnectionManager()
+    received = [0]
+    remaining = [sessions]
+
+    def on_message(message):
+        if message.command == 'PRIVMSG':
+            if message.message == 'done':
+                remaining[0] -= 1
+                if not remaining[0]:
+                    manager.stop()
+            else:
+                received[0] += 1
+
+    for i in range(sessions):
+        session = manager.add(IRCSDKConfig(host='127.0.0.1', port=port, nick='bot%d' % i, user='bot',
+                                           realname='bench', ssl=False, sendRate=0))
+        session.event.on('message', on_message)
+
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        manager.run()
+    elapsed = time.perf_counter() - start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    print(json.dumps({
+        'sessions': sessions,
+        'messages': received[0],
+        'seconds': elapsed,
+        'cpu': usage.ru_utime + usage.ru_stime,
+        'max_rss_kb': usage.ru_maxrss,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--messages', type=int, default=200, help='messages per session')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--child', type=int)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        child(args.port, args.child)
+        return
+
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(args.messages, ports), daemon=True)
+    server.start()
+    port = ports.get()
+
+    def measure(sessions):
+        out = subprocess.run([sys.executable, __file__, '--child', str(sessions), '--port', str(port)],
+                             capture_output=True, text=True, check=True)
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+    # Interpreter start-up and imports are subtracted from the per-session figures
+    baseline = measure(0)
+    print('%-9s %10s %10s %14s %16s' % ('sessions', 'msgs/sec', 'seconds', 'cpu ms/session', 'rss KB/session'))
+    for sessions in args.sessions:
+        result = measure(sessions)
+        print('%-9d %10.0f %10.2f %14.2f %16.1f' % (
+            sessions, result['messages'] / result['seconds'], result['seconds'],
+            (result['cpu'] - baseline['cpu']) * 1000 / sessions,
+            (result['max_rss_kb'] - baseline['max_rss_kb']) / sessions))
+    server.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Cost of the metrics instrumentation on the receive path.
+
+Usage: python benchmarks/metrics_bench.py [--lines 50000] [--repeat 7]
+
+Pushes a PRIVMSG/PING/JOIN mix through IRCSDK.handle_raw_message in 4 KiB
+chunks three ways: with metrics disabled, with metrics enabled, and through
+an uninstrumented build of the same methods. That build is made here from
+the IRCSDK source by deleting every ``if self.metrics.enabled:`` block
+(keeping its else branch), so it tracks the real dispatch code. Event.emit
+needs no stripping: the timed version is only swapped in when enabled.
+
+Runs are interleaved and the best of ``--repeat`` is kept for each, so
+machine noise hits all three alike. The old estimate (guards x the cost of
+one ``timeit`` check) is printed last for comparison.
+"""
+import argparse
+import ast
+import inspect
+import os
+import sys
+import textwrap
+import time
+import timeit
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyircsdk import IRCSDK, IRCSDKConfig  # noqa: E402
+from pyircsdk import pyircsdk as sdkModule  # noqa: E402
+from pyircsdk.metrics import Metrics  # noqa: E402
+
+# IRCSDK methods on the receive path that hold metrics guards
+INSTRUMENTED = ('handle_raw_message', '_parseLine', '_send')
+
+
+class _StripGuards(ast.NodeTransformer):
+    def visit_If(self, node):
+        self.generic_visit(node)
+        test = node.test
+        if isinstance(test, ast.Attribute) and test.attr == 'enabled' and \
+                isinstance(test.value, ast.Attribute) and test.value.attr == 'metrics':
+            return node.orelse or ast.Pass()
+        return node
+
+
+def uninstrumented():
+    """IRCSDK subclass whose receive path methods have the metrics guards removed"""
+    namespace = {}
+    for name in INSTRUMENTED:
+        tree = _StripGuards().visit(ast.parse(textwrap.dedent(inspect.getsource(getattr(IRCSDK, name)))))
+        code = compile(ast.fix_missing_locations(tree), '<uninstrumented %s>' % name, 'exec')
+        scope = dict(vars(sdkModule))
+        exec(code, scope)
+        namespace[name] = scope[name]
+    return type('UninstrumentedIRCSDK', (IRCSDK,), namespace)
+
+
+def workload(count):
+    lines = []
+    for i in range(count):
+        kind = i % 10
+        if kind == 0:
+            lines.append('PING :server%d' % i)
+        elif kind == 1:
+            lines.append(':nick%d!user@host JOIN #channel' % i)
+        else:
+            lines.append(':nick%d!user@host PRIVMSG #channel :message number %d' % (i, i))
+    raw = ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+    return [raw[i:i + 4096] for i in range(0, len(raw), 4096)]
+
+
+def once(cls, enabled, chunks):
+    irc = cls(IRCSDKConfig(host='127.0.0.1', port=6667, ssl=False, metrics=enabled))
+    irc.irc = MagicMock()
+    irc.event.on('message', lambda message: None)
+    start = time.perf_counter()
+    for chunk in chunks:
+        irc.handle_raw_message(chunk)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+    chunks = workload(args.lines)
+    bare = uninstrumented()
+
+    runs = {'uninstrumented': (bare, False), 'disabled': (IRCSDK, False), 'enabled': (IRCSDK, True)}
+    best = dict.fromkeys(runs)
+    for _ in range(args.repeat):
+        for name, (cls, enabled) in runs.items():
+            elapsed = once(cls, enabled, chunks)
+            best[name] = elapsed if best[name] is None else min(best[name], elapsed)
+
+    base = best['uninstrumented']
+    for name in runs:
+        print('%-15s %.3f us/line (%+.1f%%)' % (name + ':', best[name] / args.lines * 1e6, (best[name] / base - 1) * 100))
+
+    metrics = Metrics(False)
+    number = 1000000
+    check = (timeit.timeit('if metrics.enabled: pass', globals={'metrics': metrics}, number=number)
+             - timeit.timeit('pass', number=number)) / number
+    guards = args.lines + len(chunks) + args.lines // 10  # per line, per chunk, per PONG sent
+    print('estimate:       %d checks x %.1f ns = %.2f%% of receive time'
+          % (guards, check * 1e9, max(check, 0) * guards / base * 100))
+
+
+if __name__ == '__main__':
+    main()
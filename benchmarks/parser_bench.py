@@ -0,0 +1,173 @@
+"""Line parser throughput and memory: the old split() parser, the eager IRCv3 parser and the pyircsdk.parser backends.
+
+Usage: python benchmarks/parser_bench.py [--lines 100000]
+
+Replays a mix of plain and IRCv3-tagged traffic and reports lines/sec and
+bytes allocated per line (tracemalloc) while keeping every parsed Message
+alive, once for handlers that only read ``command`` and once for handlers
+that read every field.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyircsdk.parser import BACKENDS  # noqa: E402
+
+SAMPLE = [
+    ':nick!user@host PRIVMSG #channel :Hello world, this is a line of chat',
+    '@time=2024-01-01T00:00:00.000Z;msgid=AB12 :nick!user@host PRIVMSG #channel :tagged line',
+    'PING :server.example.com',
+    ':server.example.com 353 nick = #channel :@op +voice regular user another',
+    ':nick!user@host JOIN #channel',
+    ':nick!user@host PART #channel :Leaving',
+]
+
+
+class LegacyMessage:
+    """The Message class as it was before __slots__"""
+
+    def __init__(self, data, prefix, command, params, trailing, messageFrom, messageTo, message):
+        self.data = data
+        self.prefix = prefix
+        self.messageFrom = messageFrom
+        self.messageTo = messageTo
+        self.command = command
+        self.message = message
+        self.params = params
+        self.trailing = trailing
+
+
+def legacy_parse(data):
+    """The split()-based IRCSDK.parse_message, minus the event emit"""
+    message = data.split()
+    trailing = ''
+    if data.startswith(':') and len(message) > 1:
+        prefix = message[0][1:]
+        command = message[1]
+        params = message[2:]
+    else:
+        prefix = None
+        command = message[0]
+        params = message[1:]
+    if params:
+        if params[0].startswith(':'):
+            trailing = params[0][1:]
+            params = params[1:]
+        else:
+            trailing = None
+    messageFrom = prefix.split('!')[0] if prefix else None
+    messageTo = params[0] if params else None
+    actualMessage = ' '.join(params[1:]) if len(params) > 1 else None
+    if actualMessage and actualMessage.startswith(':'):
+        actualMessage = actualMessage[1:]
+    return LegacyMessage(data, prefix, command, params, trailing, messageFrom, messageTo, actualMessage)
+
+
+class EagerMessage:
+    """The slotted Message class before its fields were derived lazily"""
+    __slots__ = ('data', 'prefix', 'messageFrom', 'messageTo', 'command', 'message', 'params', 'trailing',
+                 'rawTags', '_tags')
+
+    def __init__(self, data, prefix, command, params, trailing, messageFrom, messageTo, message, rawTags=None):
+        self.data = data
+        self.prefix = prefix
+        self.messageFrom = messageFrom
+        self.messageTo = messageTo
+        self.command = command
+        self.message = message
+        self.params = params
+        self.trailing = trailing
+        self.rawTags = rawTags
+        self._tags = None
+
+
+def eager_parse(data):
+    """pyircsdk.parser.parse before fields were derived lazily"""
+    rawTags = None
+    if data[:1] == '@':
+        end = data.find(' ')
+        rawTags = data[1:end]
+        line = data[end + 1:]
+    else:
+        line = data
+    colon = line.find(' :')
+    if colon == -1:
+        tokens = line.split()
+        trailing = None
+    else:
+        tokens = line[:colon].split()
+        trailing = line[colon + 2:]
+    if len(tokens) > 1 and tokens[0][:1] == ':':
+        prefix = tokens[0][1:]
+        command = tokens[1]
+        params = tokens[2:]
+    else:
+        prefix = None
+        command = tokens[0] if tokens else ''
+        params = tokens[1:]
+    messageFrom = prefix.split('!')[0] if prefix else None
+    messageTo = params[0] if params else None
+    if trailing is None:
+        actualMessage = ' '.join(params[1:]) if len(params) > 1 else None
+    elif params:
+        actualMessage = ' '.join(params[1:] + [trailing]) if len(params) > 1 else trailing
+    else:
+        actualMessage = None
+    return EagerMessage(data, prefix, command, params, trailing, messageFrom, messageTo, actualMessage, rawTags)
+
+
+def command_only(message):
+    return message.command
+
+
+def every_field(message):
+    return (message.command, message.prefix, message.params, message.trailing, message.messageFrom,
+            message.messageTo, message.message)
+
+
+def best_times(parsers, read, lines, repeat=7):
+    """Best time of each parser over the lines, with the parsers interleaved so a noisy machine hits them alike"""
+    best = {name: float('inf') for name, _ in parsers}
+    for _ in range(repeat):
+        for name, fn in parsers:
+            start = time.perf_counter()
+            for line in lines:
+                read(fn(line))
+            best[name] = min(best[name], time.perf_counter() - start)
+    return best
+
+
+def allocated(fn, read, lines):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [fn(line) for line in lines]
+    for message in kept:
+        read(message)
+    total = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return total / len(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=100000)
+    args = parser.parse_args()
+    # Copy each line so the corpus is not a handful of shared interned strings
+    lines = [''.join(SAMPLE[i % len(SAMPLE)]) for i in range(args.lines)]
+    parsers = [('legacy', legacy_parse), ('eager', eager_parse)] + list(BACKENDS.items())
+
+    print('%-8s %-8s %14s %16s' % ('parser', 'reads', 'lines/sec', 'bytes/line'))
+    for read in (command_only, every_field):
+        best = best_times(parsers, read, lines)
+        for name, fn in parsers:
+            print('%-8s %-8s %14.0f %16.1f' % (name, read.__name__.split('_')[0], len(lines) / best[name],
+                                               allocated(fn, read, lines)))
+
+
+if __name__ == '__main__':
+    main()
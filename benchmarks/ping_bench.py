@@ -0,0 +1,72 @@
+"""PONG latency behind module work: PING fast path against answering in line order.
+
+Usage: python benchmarks/ping_bench.py [--lines 500] [--work-us 20] [--rounds 50]
+
+Each round feeds one read of --lines PRIVMSG lines followed by a PING to an
+IRCSDK whose 'message' listener busy-waits --work-us microseconds, and times
+how long after the read the PONG is handed to the socket. 'in order' turns the
+fast path off, which is how PINGs were answered before it existed.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyircsdk.pyircsdk  # noqa: E402
+from pyircsdk import IRCSDK, IRCSDKConfig  # noqa: E402
+
+
+class Socket:
+    def __init__(self):
+        self.pongAt = None
+
+    def sendall(self, data):
+        if data.startswith(b'PONG') and self.pongAt is None:
+            self.pongAt = time.perf_counter()
+
+
+def measure(lines, workUs, rounds):
+    irc = IRCSDK(IRCSDKConfig(host='127.0.0.1', port=6667, nick='bench', ssl=False, sendRate=0))
+    work = workUs / 1e6
+
+    def busy(message):
+        end = time.perf_counter() + work
+        while time.perf_counter() < end:
+            pass
+    irc.event.on('message', busy)
+
+    data = b':nick!u@h PRIVMSG #bench :some chatter\r\n' * lines + b'PING :server\r\n'
+    delays = []
+    for _ in range(rounds):
+        irc.irc = Socket()
+        start = time.perf_counter()
+        irc.handle_raw_message(data)
+        delays.append(irc.irc.pongAt - start)
+    return statistics.median(delays)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=500)
+    parser.add_argument('--work-us', type=float, default=20)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    fast = measure(args.lines, args.work_us, args.rounds)
+    pingToken = pyircsdk.pyircsdk._pingToken
+    pyircsdk.pyircsdk._pingToken = lambda line: None
+    try:
+        inOrder = measure(args.lines, args.work_us, args.rounds)
+    finally:
+        pyircsdk.pyircsdk._pingToken = pingToken
+
+    print('%d lines ahead of the PING, %.0f us of listener work each' % (args.lines, args.work_us))
+    print('in order   %10.3f ms to PONG' % (inOrder * 1000))
+    print('fast path  %10.3f ms to PONG' % (fast * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Outgoing lines: str formatting + encode per call against the bytes-first send path.
+
+Usage: python benchmarks/send_bench.py [--lines 20000]
+
+Builds PRIVMSG lines the way IRCSDK did before (format a str, encode it, and
+take the split path for any text over a quarter of the line), through
+privmsg() with str text, and through privmsg() with pre-encoded bytes. Then
+drains a burst through the Writer over a socketpair and counts writes.
+"""
+import argparse
+import os
+import socket
+import sys
+import time
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyircsdk import IRCSDK, IRCSDKConfig  # noqa: E402
+from pyircsdk.text import splitText  # noqa: E402
+from pyircsdk.writer import PRIORITY_LOW, SendQueue, Writer  # noqa: E402
+
+
+def old_privmsg(irc, send, target, text):
+    """IRCSDK._sendText before the bytes-first path"""
+    longest = len(target.encode('utf-8'))
+    room = irc.isupport.linelen - irc._prefixLength() - len('PRIVMSG') - longest - 5
+    if len(text) * 4 <= room and '\n' not in text and '\r' not in text:
+        send(("%s %s :%s\r\n" % ('PRIVMSG', target, text)).encode('utf-8'))
+        return
+    for chunk in splitText(text, room):
+        for line in irc.isupport.packTargets('PRIVMSG', [target], chunk):
+            send(line.encode('utf-8'))
+
+
+def timed(fn, count, repeat=30):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(count):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best / count * 1e6
+
+
+class CountingSocket(socket.socket):
+    writes = 0
+
+    def sendall(self, data, *args):
+        CountingSocket.writes += 1
+        return super().sendall(data, *args)
+
+    def sendmsg(self, buffers, *args):
+        CountingSocket.writes += 1
+        return super().sendmsg(buffers, *args)
+
+
+def writes_per_line(lines):
+    left, right = socket.socketpair()
+    sock = CountingSocket(fileno=left.detach())
+    right.setblocking(False)
+    CountingSocket.writes = 0
+    queue = SendQueue(0, 5)
+    writer = Writer(sock, queue)
+    for i in range(lines):
+        queue.put(b'PRIVMSG #chan :broadcast line %d\r\n' % i, PRIORITY_LOW)
+    expected = sum(len(b'PRIVMSG #chan :broadcast line %d\r\n' % i) for i in range(lines))
+    writer.start()
+    received = 0
+    while received < expected:
+        try:
+            received += len(right.recv(1 << 20))
+        except BlockingIOError:
+            time.sleep(0.001)
+    writer.stop()
+    sock.close()
+    right.close()
+    return CountingSocket.writes / lines
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=20000)
+    args = parser.parse_args()
+
+    irc = IRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, nick='bot', user='bot', ssl=False))
+    irc.irc = MagicMock()
+    irc._sendNow = lambda data: None  # measure building, not the mock
+
+    print('%-10s %14s %14s %14s' % ('text', 'old (us/line)', 'str (us/line)', 'bytes (us/line)'))
+    for label, text in (('short', 'hello from the broadcast bot'), ('300 chars', 'x' * 300)):
+        encoded = text.encode('utf-8')
+        old = timed(lambda: old_privmsg(irc, irc._send, '#chan', text), args.lines)
+        new = timed(lambda: irc.privmsg('#chan', text), args.lines)
+        raw = timed(lambda: irc.privmsg(b'#chan', encoded), args.lines)
+        print('%-10s %14.3f %14.3f %14.3f' % (label, old, new, raw))
+
+    print('writer: %.3f writes per line for a 10000 line burst (was 1)' % writes_per_line(10000))
+
+
+if __name__ == '__main__':
+    main()
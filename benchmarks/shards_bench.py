@@ -0,0 +1,106 @@
+"""Throughput of a CPU-bound module inline versus sharded over worker processes.
+
+Usage: python benchmarks/shards_bench.py [--messages 2000] [--channels 64] [--work 20000] [--max-workers N]
+
+Feeds PRIVMSG lines for many channels through IRCSDK.handle_raw_message
+with a module that burns ``--work`` loop iterations of pure Python per
+message and replies once. Reports messages/sec with the module inline in
+this process and with ShardedRuntime at 1, 2, 4, ... workers (up to the
+core count), and the speedup over one worker.
+"""
+import argparse
+import os
+import sys
+import time
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyircsdk import IRCSDK, IRCSDKConfig, Module  # noqa: E402
+from pyircsdk.shards import ShardedRuntime  # noqa: E402
+
+
+class BusyModule(Module):
+    ircCommands = ('PRIVMSG',)
+    work = 20000
+
+    def handleCommand(self, message, command):
+        total = 0
+        for i in range(self.work):
+            total += i * i % 7
+        self.irc.privmsg(message.messageTo, 'done %d' % total)
+
+    def handleError(self, message, command, error):
+        pass
+
+
+def make_busy(irc, work):
+    module = BusyModule(irc, '', '')
+    module.work = work
+    return module
+
+
+def make_irc():
+    irc = IRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, nick='bench', user='bench'))
+    irc.replies = 0
+
+    def sink(data):
+        irc.replies += 1
+    irc._sendNow = sink
+    return irc
+
+
+def chunks(messages, channels):
+    lines = [b':nick!user@host PRIVMSG #channel-%d :work %d\r\n' % (i % channels, i) for i in range(messages)]
+    return [b''.join(lines[i:i + 64]) for i in range(0, len(lines), 64)]
+
+
+def run_inline(data, messages, work):
+    irc = make_irc()
+    make_busy(irc, work).startListening()
+    start = time.perf_counter()
+    for chunk in data:
+        irc.handle_raw_message(chunk)
+    return messages / (time.perf_counter() - start)
+
+
+def run_sharded(data, messages, work, workers):
+    irc = make_irc()
+    runtime = ShardedRuntime([partial(make_busy, work=work)], workers=workers, ircCommands=('PRIVMSG',))
+    runtime.attach(irc)
+    runtime.start()
+    try:
+        start = time.perf_counter()
+        for chunk in data:
+            irc.handle_raw_message(chunk)
+        while irc.replies < messages:
+            time.sleep(0.001)
+        return messages / (time.perf_counter() - start)
+    finally:
+        runtime.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--channels', type=int, default=64)
+    parser.add_argument('--work', type=int, default=20000, help='loop iterations per message')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    data = chunks(args.messages, args.channels)
+
+    print('cores %d, %d messages over %d channels, %d iterations each' % (
+        os.cpu_count() or 1, args.messages, args.channels, args.work))
+    print('%-8s %14s %10s' % ('workers', 'messages/sec', 'speedup'))
+    print('%-8s %14.0f %10s' % ('inline', run_inline(data, args.messages, args.work), '-'))
+    workers = 1
+    base = None
+    while workers <= args.max_workers:
+        rate = run_sharded(data, args.messages, args.work, workers)
+        base = base or rate
+        print('%-8d %14.0f %9.2fx' % (workers, rate, rate / base))
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Channel state tracker: NAMES/JOIN storm replay, lookup cost and memory.
+
+Usage: python benchmarks/state_bench.py [--users 50000] [--channels 500] [--per-user 3]
+
+Builds a network where every user sits in --per-user random channels, joins
+them all and replays the NAMES replies (353/366), then a storm of
+JOIN/PART/NICK/MODE/QUIT lines. Reports lines/sec (parse included), lookup
+time, and the tracker's memory against MEMORY_BUDGET.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyircsdk.parser import parse  # noqa: E402
+from pyircsdk.state import StateTracker  # noqa: E402
+
+# Stated budget: 50k users in 150k channel memberships stay under 40 MB
+MEMORY_BUDGET = 40 * 1024 * 1024
+NAMES_PER_LINE = 40
+
+
+def build(users, channels, perUser, rng):
+    nicks = ['User%d[%s]' % (i, rng.choice('abcdefgh')) for i in range(users)]
+    members = [[] for _ in range(channels)]
+    for nick in nicks:
+        for channel in rng.sample(range(channels), perUser):
+            prefix = rng.choice(('', '', '', '', '+', '@'))
+            members[channel].append(prefix + nick)
+
+    lines = [':server 001 bot :Welcome', ':server 005 bot CASEMAPPING=rfc1459 PREFIX=(ov)@+ :are supported']
+    for channel, names in enumerate(members):
+        lines.append(':bot!b@host JOIN #chan%d' % channel)
+        for start in range(0, len(names), NAMES_PER_LINE):
+            lines.append(':server 353 bot = #chan%d :%s' % (channel, ' '.join(names[start:start + NAMES_PER_LINE])))
+        lines.append(':server 366 bot #chan%d :End of /NAMES list.' % channel)
+    return nicks, lines
+
+
+def storm(nicks, channels, count, rng):
+    lines = []
+    for i in range(count):
+        nick = rng.choice(nicks)
+        channel = rng.randrange(channels)
+        kind = i % 5
+        if kind == 0:
+            lines.append(':%s!u@h JOIN #chan%d' % (nick, channel))
+        elif kind == 1:
+            lines.append(':%s!u@h PART #chan%d :bye' % (nick, channel))
+        elif kind == 2:
+            lines.append(':op!o@h MODE #chan%d +o-v %s %s' % (channel, nick, nick))
+        elif kind == 3:
+            lines.append(':%s!u@h NICK :%s_' % (nick, nick))
+        else:
+            lines.append(':%s!u@h QUIT :gone' % nick)
+    return lines
+
+
+def replay(state, lines):
+    start = time.perf_counter()
+    for line in lines:
+        state.handleMessage(parse(line))
+    return len(lines) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--channels', type=int, default=500)
+    parser.add_argument('--per-user', type=int, default=3)
+    parser.add_argument('--storm', type=int, default=100000)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    nicks, lines = build(args.users, args.channels, args.per_user, rng)
+    namesRate = replay(StateTracker(), lines)
+    state = StateTracker()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    replay(state, lines)
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    memberships = sum(len(channel.members) for channel in state.channels.values())
+
+    probes = [rng.choice(nicks).lower() for _ in range(100000)]
+    probeChannels = ['#CHAN%d' % rng.randrange(args.channels) for _ in probes]
+    timings = {}
+    for name, fn in (('isOn', state.isOn), ('modes', state.modes)):
+        start = time.perf_counter()
+        for nick, channel in zip(probes, probeChannels):
+            fn(nick, channel)
+        timings[name] = (time.perf_counter() - start) / len(probes)
+    start = time.perf_counter()
+    for nick in probes:
+        state.channelsOf(nick)
+    timings['channelsOf'] = (time.perf_counter() - start) / len(probes)
+
+    stormRate = replay(state, storm(nicks, args.channels, args.storm, rng))
+
+    print('users %d, channels %d, memberships %d' % (len(nicks), args.channels, memberships))
+    print('NAMES/JOIN replay   %12.0f lines/sec (%.0f names/sec)' % (namesRate, namesRate * memberships / len(lines)))
+    print('JOIN/PART/... storm %12.0f lines/sec' % stormRate)
+    for name, seconds in timings.items():
+        print('%-19s %12.0f ns' % (name, seconds * 1e9))
+    print('memory              %12.1f MB (%.0f bytes/user, budget %d MB) %s' % (
+        memory / 1048576, memory / len(nicks), MEMORY_BUDGET // 1048576,
+        'OK' if memory <= MEMORY_BUDGET * args.users / 50000 else 'OVER BUDGET'))
+
+
+if __name__ == '__main__':
+    main()
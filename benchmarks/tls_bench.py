@@ -0,0 +1,56 @@
+"""TLS reconnects: full handshakes against resumed sessions.
+
+Usage: python benchmarks/tls_bench.py [--rounds 200]
+
+Connects to a local TLS FakeIRCServer --rounds times, reading the welcome
+burst each time so TLS 1.3 session tickets arrive, once forgetting the
+session between connects and once letting ResumingContext offer it again.
+Reports the median and p99 handshake time and how many handshakes resumed.
+"""
+import argparse
+import os
+import socket
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import FakeIRCServer, selfSignedContext  # noqa: E402
+from pyircsdk.tls import clientContext  # noqa: E402
+
+
+def handshakes(port, rounds, resume):
+    context = clientContext(allowAnySSL=True)
+    times = []
+    resumed = 0
+    for _ in range(rounds):
+        if not resume:
+            context.forget('localhost')
+        sock = socket.create_connection(('127.0.0.1', port))
+        started = time.perf_counter()
+        sock = context.wrap_socket(sock, server_hostname='localhost')
+        times.append(time.perf_counter() - started)
+        resumed += sock.session_reused
+        sock.sendall(b'NICK bench\r\nUSER bench 0 * :bench\r\n')
+        sock.recv(4096)
+        context.remember('localhost', sock)
+        sock.close()
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.99)], resumed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    server = FakeIRCServer(messages=0, sslContext=selfSignedContext()).start_in_thread()
+    print('%-8s %12s %12s %8s' % ('mode', 'p50 (ms)', 'p99 (ms)', 'resumed'))
+    for mode, resume in (('full', False), ('resumed', True)):
+        p50, p99, resumed = handshakes(server.port, args.rounds, resume)
+        print('%-8s %12.2f %12.2f %8d' % (mode, p50 * 1000, p99 * 1000, resumed))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,9 @@ import sys
 from modules.hello.hello import HelloModule
 from modules.quit.quit import QuitModule
 from modules.urlparse.urlparse import URLParse
-from pyircsdk import IRCSDKConfig, IRCSDK, Module
+from pyircsdk import IRCSDKConfig, IRCSDK, Module, setupLogging
+
+setupLogging()
 
 irc = IRCSDK(IRCSDKConfig(host='irc.myelinbots.com',
                           port=6697,
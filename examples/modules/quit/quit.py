@@ -4,6 +4,8 @@ from pyircsdk import Module
 
 
 class QuitModule(Module):
+    ircCommands = ('PRIVMSG',)
+
     def __init__(self, irc):
         super().__init__(irc, "!", "quit")
 
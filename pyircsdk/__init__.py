@@ -1,5 +1,10 @@
 from .pyircsdk import IRCSDK
 from .pyircsdk import IRCSDKConfig
+from .asyncsdk import AsyncIRCSDK
+from .manager import ConnectionManager
 from .message import Message
 from .command import Module
 from .command import Command
+from .log import setupLogging
+from .linkpreview import LinkPreview
+from .shards import ShardedRuntime
@@ -0,0 +1,168 @@
+import asyncio
+import socket
+import threading
+import time
+
+from .event.event import AsyncEvent
+from .pyircsdk import IRCSDK, IRCSDKConfig
+from .writer import AsyncWriter
+
+
+class AsyncIRCSDK(IRCSDK):
+    """asyncio flavour of IRCSDK.
+
+    Protocol handling (PING, MOTD, NickServ, join errors, parsing) is shared
+    with IRCSDK; only the transport differs, so many bots can share one event
+    loop. Listeners may be plain functions or coroutine functions. Lines sent
+    and close() called from other threads (e.g. modules with executor =
+    'thread') are handed to the loop with call_soon_threadsafe.
+    """
+
+    eventClass = AsyncEvent
+
+    def __init__(self, config: IRCSDKConfig = None) -> None:
+        super().__init__(config)
+        self.reader: asyncio.StreamReader = None
+        self.irc: asyncio.StreamWriter = None
+        self._loop = None  # loop connect() runs on
+        self._loopThread = None
+
+    def _elsewhere(self) -> bool:
+        """True off the loop thread, where asyncio objects mustn't be touched (and the loop wouldn't wake up)"""
+        return self._loop is not None and self._loopThread != threading.get_ident()
+
+    def _send(self, data: bytes, priority: int = None) -> None:
+        if self._elsewhere():
+            self._loop.call_soon_threadsafe(IRCSDK._send, self, data, priority)
+            return
+        super()._send(data, priority)
+
+    def close(self) -> None:
+        if self._elsewhere():
+            self._loop.call_soon_threadsafe(IRCSDK.close, self)
+            return
+        super().close()
+
+    def _sendNow(self, data: bytes) -> None:
+        self.irc.write(data)
+
+    def _startWriter(self) -> None:
+        self.sendQueue.clear()
+        self._writer = AsyncWriter(self.irc, self.sendQueue)
+        self._writer.start()
+
+    def _schedule(self, delay: float, callback):
+        return asyncio.get_running_loop().call_later(delay, callback)
+
+    async def drain(self) -> None:
+        """Wait until the outgoing buffer has been flushed to the socket"""
+        await self.irc.drain()
+
+    async def connect(self, config: IRCSDKConfig = None) -> None:
+        if not config:
+            config = self.config
+
+        if not self.config:
+            raise ValueError('No config passed to connect')
+
+        self.log.info('Connecting: %s', config)
+        if self.config.metricsPort and self.metrics._server is None:
+            self.metrics.serve(self.config.metricsPort)
+
+        self._loop = asyncio.get_running_loop()
+        self._loopThread = threading.get_ident()
+        # Other bots may share this loop, so giving up returns instead of exiting
+        self._closing = False
+        while True:
+            host, port = self.reconnectPolicy.server
+            if await self._open(host, port):
+                await self.startRecv()
+                delay = self._handle_disconnect()
+            else:
+                delay = self._handle_connect_failed()
+            if delay is None:
+                return
+            await asyncio.sleep(delay)
+
+    async def try_connect(self, retries: int, wait_secs: float) -> None:
+        """Deprecated: connect() with up to retries attempts, wait_secs apart and without jitter"""
+        policy = self._legacyPolicy(retries, wait_secs)
+        try:
+            await self.connect()
+        finally:
+            self.reconnectPolicy = policy
+
+    async def _open(self, host: str, port: int) -> bool:
+        if self._connectStarted is None:
+            self._connectStarted = time.monotonic()
+        attempt = self.reconnectPolicy.failures + 1
+        self.event.emit('connecting', {'host': host, 'port': port, 'attempt': attempt})
+        self.log.info('Connecting to %s:%s (attempt %d)', host, port, attempt)
+
+        try:
+            if self.config.ssl:
+                await asyncio.wait_for(self._openTLS(host, port), self.config.connectionTimeout or 10)
+            else:
+                self.reader, self.irc = await asyncio.wait_for(asyncio.open_connection(host, port),
+                                                               self.config.connectionTimeout or 10)
+        except (OSError, asyncio.TimeoutError) as e:
+            self.log.warning('Connection failed: %s', e)
+            return False
+
+        self.log.info('Connected to host %s:%s', host, port)
+        self._register()
+        return True
+
+    async def _openTLS(self, host: str, port: int) -> None:
+        """Connect, then handshake over the connected socket so the handshake can be timed on its own"""
+        loop = asyncio.get_running_loop()
+        addresses = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        sock = error = None
+        for family, type_, proto, _, address in addresses:
+            sock = socket.socket(family, type_, proto)
+            sock.setblocking(False)
+            try:
+                await loop.sock_connect(sock, address)
+                break
+            except OSError as e:
+                sock.close()
+                sock, error = None, e
+            except BaseException:
+                sock.close()
+                raise
+        if sock is None:
+            raise error or OSError('getaddrinfo returned no addresses for %s' % host)
+        try:
+            started = time.perf_counter()
+            self.reader, self.irc = await asyncio.open_connection(sock=sock, ssl=self.sslContext,
+                                                                  server_hostname=host)
+        except BaseException:
+            sock.close()
+            raise
+        self._tlsConnected(host, started)
+
+    def _sslObject(self):
+        return self.irc.get_extra_info('ssl_object') if self.irc is not None else None
+
+    async def startRecv(self) -> None:
+        """Read until the connection drops; reconnecting is left to connect()"""
+        while True:
+            alive, wait = self._keepalive(time.monotonic())
+            if not alive:
+                break
+            try:
+                # Flush pending writes (and yield to other connections) before reading
+                await self.irc.drain()
+                data = await asyncio.wait_for(self.reader.read(65536), wait)
+            except asyncio.TimeoutError:
+                continue
+            except OSError as e:
+                self.log.warning('Connection error: %s', e)
+                break
+            if not data:
+                self.log.warning('Connection closed by the remote host.')
+                break
+            self.event.emit('raw', data)
+
+        self._stopWriter()
+        self.irc.close()
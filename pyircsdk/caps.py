@@ -0,0 +1,232 @@
+import base64
+
+from .writer import PRIORITY_HIGH
+
+# Requested whenever the server offers them; none changes the shape of the lines the SDK relies on
+DEFAULT_CAPS = ('multi-prefix', 'server-time', 'message-tags', 'account-tag', 'cap-notify', 'away-notify')
+
+_SASL_CHUNK = 400
+_REQ_LENGTH = 400  # bytes of capability names per CAP REQ line
+_SASL_FAILURES = {
+    '902': 'Nick is locked',
+    '904': 'Authentication failed',
+    '905': 'Authentication message too long',
+    '906': 'Authentication aborted',
+}
+
+
+class CapNegotiator:
+    """IRCv3 capability negotiation (CAP LS 302 / REQ / END) and SASL for one connection.
+
+    ``available`` maps the capabilities the server offers to their values
+    ('' when they have none) and ``enabled`` holds the acknowledged ones;
+    both follow CAP NEW/DEL once registered. ``account`` is the account
+    SASL logged us into, or None. Emits ``caps`` with this object whenever
+    ``enabled`` changes and ``sasl`` with the outcome of authentication.
+    """
+
+    def __init__(self, irc) -> None:
+        self.irc = irc
+        self.available = {}
+        self.enabled = set()
+        self.account = None
+        self.negotiating = False
+        self._lsDone = False
+        self._pendingReqs = 0
+        self._mechanism = None
+        self._handlers = {
+            'CAP': self._cap,
+            'AUTHENTICATE': self._authenticate,
+            '001': self._welcome,
+            '421': self._unknownCommand,
+            '900': self._loggedIn,
+            '903': self._saslSuccess,
+            '907': self._saslSuccess,  # already authenticated
+        }
+        for code in _SASL_FAILURES:
+            self._handlers[code] = self._saslFailure
+
+    def has(self, name: str) -> bool:
+        return name in self.enabled
+
+    @property
+    def wanted(self) -> list:
+        """Capabilities to request when offered: config.caps (default DEFAULT_CAPS), plus sasl when configured"""
+        config = getattr(self.irc, 'config', None)
+        caps = list(DEFAULT_CAPS if config is None or config.caps is None else config.caps)
+        if self._saslMechanism() and 'sasl' not in caps:
+            caps.append('sasl')
+        return caps
+
+    def reset(self) -> None:
+        self.available = {}
+        self.enabled = set()
+        self.account = None
+        self.negotiating = False
+        self._lsDone = False
+        self._pendingReqs = 0
+        self._mechanism = None
+
+    def start(self) -> None:
+        """Open negotiation before NICK/USER, which makes the server hold registration until CAP END"""
+        self.reset()
+        if not self.wanted:
+            return
+        self.negotiating = True
+        self._send('CAP LS 302')
+
+    def request(self, caps: list) -> None:
+        """Ask for capabilities, in as many CAP REQ lines as needed"""
+        line = []
+        size = 0
+        for cap in caps:
+            if line and size + len(cap) + 1 > _REQ_LENGTH:
+                self._req(line)
+                line = []
+                size = 0
+            line.append(cap)
+            size += len(cap) + 1
+        if line:
+            self._req(line)
+
+    def handle(self, command: str, params: list, trailing: str = None) -> None:
+        """Feed one received line; IRCSDK calls this for every line before emitting it"""
+        handler = self._handlers.get(command)
+        if handler is not None:
+            handler(command, params if trailing is None else params + [trailing])
+
+    def handleMessage(self, message) -> None:
+        # Only CAP, AUTHENTICATE and the SASL numerics need the params derived
+        if message.command in self._handlers:
+            self.handle(message.command, message.params, message.trailing)
+
+    def _req(self, caps: list) -> None:
+        self._pendingReqs += 1
+        self._send('CAP REQ :' + ' '.join(caps))
+
+    def _send(self, line: str) -> None:
+        self.irc._send((line + '\r\n').encode('utf-8'), PRIORITY_HIGH)
+
+    def _cap(self, command, args) -> None:
+        if len(args) < 3:
+            return
+        subcommand = args[1].upper()
+        more = len(args) > 3 and args[2] == '*'
+        caps = args[-1].split()
+        if subcommand == 'LS':
+            self._offered(caps)
+            if not more and not self._lsDone:
+                self._lsDone = True
+                wanted = [cap for cap in self.wanted if cap in self.available]
+                if wanted:
+                    self.request(wanted)
+                else:
+                    self._finish()
+        elif subcommand == 'ACK':
+            for cap in caps:
+                if cap.startswith('-'):
+                    self.enabled.discard(cap[1:])
+                else:
+                    self.enabled.add(cap)
+            self.irc.event.emit('caps', self)
+            self._answered()
+        elif subcommand == 'NAK':
+            self.irc.log.info('Server refused capabilities: %s', ' '.join(caps))
+            self._answered()
+        elif subcommand == 'NEW':
+            self._offered(caps)
+            wanted = [cap for cap in self.wanted if cap in caps and cap != 'sasl' and cap not in self.enabled]
+            if wanted:
+                self.request(wanted)
+        elif subcommand == 'DEL':
+            for cap in caps:
+                self.available.pop(cap, None)
+            if self.enabled.intersection(caps):
+                self.enabled.difference_update(caps)
+                self.irc.event.emit('caps', self)
+
+    def _offered(self, caps: list) -> None:
+        for cap in caps:
+            name, _, value = cap.partition('=')
+            self.available[name] = value
+
+    def _answered(self) -> None:
+        self._pendingReqs = max(0, self._pendingReqs - 1)
+        if not self.negotiating or self._pendingReqs:
+            return
+        mechanism = self._saslMechanism()
+        if mechanism and 'sasl' in self.enabled and self._mechanism is None:
+            offered = self.available.get('sasl')
+            if offered and mechanism not in offered.split(','):
+                self._saslDone(False, 'Server does not offer SASL %s (only %s)' % (mechanism, offered))
+                return
+            self._mechanism = mechanism
+            self._send('AUTHENTICATE ' + mechanism)
+            return
+        if self._mechanism is None:
+            self._finish()
+
+    def _saslMechanism(self):
+        config = getattr(self.irc, 'config', None)
+        if config is None:
+            return None
+        mechanism = (config.saslMechanism or '').upper()
+        if mechanism == 'EXTERNAL':
+            return mechanism
+        if mechanism in ('', 'PLAIN') and config.saslPassword:
+            return 'PLAIN'
+        return None
+
+    def _authenticate(self, command, args) -> None:
+        if self._mechanism is None or args[:1] != ['+']:
+            return
+        if self._mechanism == 'EXTERNAL':
+            self._send('AUTHENTICATE +')
+            return
+        config = self.irc.config
+        username = config.saslUsername or config.nick
+        payload = '%s\0%s\0%s' % (username, username, config.saslPassword)
+        payload = base64.b64encode(payload.encode('utf-8')).decode()
+        for start in range(0, len(payload), _SASL_CHUNK):
+            self._send('AUTHENTICATE ' + payload[start:start + _SASL_CHUNK])
+        if len(payload) % _SASL_CHUNK == 0:
+            self._send('AUTHENTICATE +')
+
+    def _loggedIn(self, command, args) -> None:
+        if len(args) > 2:
+            self.account = args[2]
+
+    def _saslSuccess(self, command, args) -> None:
+        if self._mechanism is not None:
+            self._saslDone(True, None)
+
+    def _saslFailure(self, command, args) -> None:
+        if self._mechanism is not None:
+            self._saslDone(False, _SASL_FAILURES[command])
+
+    def _saslDone(self, success: bool, reason) -> None:
+        mechanism = self._mechanism or self._saslMechanism()
+        self._mechanism = None
+        if success:
+            self.irc.log.info('SASL %s authentication successful', mechanism)
+        else:
+            self.account = None
+            self.irc.log.warning('SASL %s authentication failed: %s', mechanism, reason)
+        self.irc.event.emit('sasl', {'success': success, 'mechanism': mechanism, 'account': self.account,
+                                     'reason': reason})
+        self._finish()
+
+    def _finish(self) -> None:
+        if self.negotiating:
+            self.negotiating = False
+            self._send('CAP END')
+
+    def _welcome(self, command, args) -> None:
+        # Registered: either negotiation ended or the server doesn't do CAP at all
+        self.negotiating = False
+        self._mechanism = None
+
+    def _unknownCommand(self, command, args) -> None:
+        if len(args) > 1 and args[1].upper() == 'CAP':
+            self.negotiating = False
+
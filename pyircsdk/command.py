@@ -1,5 +1,9 @@
+import inspect
+import time
 from abc import abstractmethod
 
+from .workers import HandlerPool
+
 
 class Command:
     def __init__(self):
@@ -13,19 +17,77 @@ class Command:
 
 
 class Module:
+    # IRC commands (e.g. ('PRIVMSG',)) to receive through the router. When a
+    # command name is set, only messages starting with fantasy + command are
+    # delivered. None receives every message, as before the router existed.
+    ircCommands = None
+
+    # Run handlers off the receive thread: None (inline), 'thread' or 'process'.
+    # See HandlerPool for how the other settings apply.
+    executor = None
+    workers = 4
+    maxQueue = 100
+    overflow = 'drop_oldest'  # or 'drop_newest', 'block'
+    handlerTimeout = None  # seconds
+    orderByChannel = True
+
     def __init__(self, irc, fantasy, command):
         self.irc = irc
         self.command = command
         self.fantasy = fantasy
+        self._listener = None
+        self.pool = None
 
     def startListening(self):
-        self.irc.event.on('message', lambda x: self.handleMessage(x))
+        if self.executor is not None and self.pool is None:
+            self.pool = HandlerPool(self, self.executor, self.workers, self.maxQueue, self.overflow,
+                                    self.handlerTimeout, self.orderByChannel)
+        if self.ircCommands is None:
+            self._listener = self.irc.event.on('message', lambda x: self.handleMessage(x))
+        else:
+            self.irc.router.add(self, self.ircCommands, self.fantasy + self.command if self.command else None)
+
+    def stopListening(self):
+        if self._listener is not None:
+            self.irc.event.off(self._listener)
+            self._listener = None
+        self.irc.router.remove(self)
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
 
     def handleMessage(self, x):
+        return self.dispatchCommand(x, self.messageToCommandWithArgs(x))
+
+    def dispatchCommand(self, x, command):
+        """Handle an already tokenized command, on the worker pool if the module has one"""
+        if self.pool is not None:
+            self.pool.submit(x, command)
+            return None
+        return self.runCommand(x, command)
+
+    def runCommand(self, x, command):
+        metrics = getattr(self.irc, 'metrics', None)
+        started = time.perf_counter() if metrics is not None and metrics.enabled else None
         try:
-            self.handleCommand(x, self.messageToCommandWithArgs(x))
+            result = self.handleCommand(x, command)
         except Exception as e:
-            self.handleError(x, self.messageToCommandWithArgs(x), e)
+            self.handleError(x, command, e)
+            return None
+        finally:
+            if started is not None:
+                metrics.observe('handler_seconds', time.perf_counter() - started,
+                                (('module', type(self).__name__),))
+        # async handleCommand: hand the coroutine back so AsyncEvent can schedule it
+        if inspect.isawaitable(result):
+            return self._awaitCommand(x, command, result)
+        return None
+
+    async def _awaitCommand(self, message, command, awaitable):
+        try:
+            await awaitable
+        except Exception as e:
+            self.handleError(message, command, e)
 
     def messageToCommandWithArgs(self, message):
         command = Command()
@@ -39,4 +101,12 @@ class Module:
 
     @abstractmethod
     def handleError(self, message, command, error):
+        pass
+
+    @classmethod
+    def processCommand(cls, message, command):
+        """With executor = 'process', runs in a worker process; the result goes to handleResult"""
+        pass
+
+    def handleResult(self, message, command, result):
         pass
\ No newline at end of file
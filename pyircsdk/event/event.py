@@ -1,24 +1,339 @@
+import asyncio
+import fnmatch
+import functools
+import inspect
+import itertools
+import logging
+import re
+import time
+from collections import deque
+from types import MappingProxyType
+
+_RANGE = re.compile(r'^(\d+)-(\d+)$')
+
+
+class Listener:
+    """Handle of one subscription, returned by Event.on/once and accepted by Event.off"""
+
+    __slots__ = ('name', 'callback', 'priority', 'seq', 'call', 'breaker', 'failures', 'disabledUntil')
+
+    def __init__(self, name, callback, priority, seq, breaker=True) -> None:
+        self.name = name
+        self.callback = callback
+        self.priority = priority
+        self.seq = seq
+        self.call = callback  # what emit runs: the callback, or a wrapper for once()
+        self.breaker = breaker  # may be disabled by the circuit breaker
+        self.failures = None  # monotonic times of recent failures
+        self.disabledUntil = None
+
+    def __repr__(self):
+        return '<Listener %s %r priority=%d>' % (self.name, self.callback, self.priority)
+
+
+def _matcher(name):
+    """Predicate for a wildcard ('join_*', '4??') or numeric range ('400-599') name, None for a plain name"""
+    match = _RANGE.match(name)
+    if match:
+        low, high = int(match.group(1)), int(match.group(2))
+        return lambda event: event.isdigit() and low <= int(event) <= high
+    if any(char in name for char in '*?['):
+        return lambda event: fnmatch.fnmatchcase(event, name)
+    return None
+
+
 class Event:
+    """Named events with prioritised listeners.
+
+    Listeners run highest ``priority`` first, in subscription order within a
+    priority. A name may be a wildcard ('*', 'nickserv_*', '4??') or a
+    numeric range ('400-599'), matching every event emitted under a fitting
+    name. The listeners of each emitted name are resolved once into a tuple
+    and cached until a subscription changes, so emit iterates a snapshot:
+    listeners added or removed during an emit take effect from the next one.
+
+    A listener that raises doesn't stop the others: the exception is logged
+    and emitted as ``error``. A listener failing (or, with a latency budget,
+    running late) ``maxFailures`` times within ``failureWindow`` seconds is
+    switched off for ``cooldown`` seconds, see setBreaker.
+    """
+
+    maxFailures = 5  # 0 disables the circuit breaker
+    failureWindow = 60.0
+    cooldown = 30.0
+    latencyBudget = None  # seconds a synchronous listener call may take
+
     def __init__(self):
-        self.listeners = {}
+        self._subscriptions = {}  # name or pattern -> {seq: Listener}
+        self._byCallback = {}  # (name, callback) -> {seq: Listener}, so remove() doesn't scan
+        self._patterns = {}  # pattern -> predicate over event names
+        self._resolved = {}  # event name -> tuple of callables, in call order
+        self._disabled = {}  # Listener -> monotonic time it comes back
+        self._seq = itertools.count()
+        self.metrics = None
+        self.log = logging.getLogger('pyircsdk')
+
+    @property
+    def listeners(self):
+        """Read-only snapshot of the callbacks subscribed under each plain name, in call order.
+
+        Subscribe and unsubscribe with on/once/off/remove; the snapshot (a
+        mapping of tuples) can't be changed in place.
+        """
+        return MappingProxyType({name: tuple(listener.callback for listener in _ordered(subscriptions.values()))
+                                 for name, subscriptions in self._subscriptions.items()
+                                 if name not in self._patterns})
 
     def emit(self, name, data):
-        if name in self.listeners:
-            for callback in self.listeners[name]:
+        if self._disabled:
+            self._reenable()
+        callbacks = self._resolved.get(name)
+        if callbacks is None:
+            callbacks = self._resolve(name)
+        for callback in callbacks:
+            try:
                 callback(data)
+            except Exception as e:
+                self._failed(name, callback, data, e)
 
-    def on(self, name, callback):
-        if name not in self.listeners:
-            self.listeners[name] = []
-        self.listeners[name].append(callback)
+    def hasListeners(self, name) -> bool:
+        """Whether emitting name would call anything, counting wildcard and range listeners"""
+        callbacks = self._resolved.get(name)
+        if callbacks is None:
+            callbacks = self._resolve(name)
+        return bool(callbacks)
 
-    def remove(self, name, callback):
-        if name in self.listeners:
+    def _invoke(self, callback, data, name=None):
+        callback(data)
+
+    def _resolve(self, name):
+        listeners = list(self._subscriptions.get(name, {}).values())
+        for pattern, matches in self._patterns.items():
+            if matches(name):
+                listeners.extend(self._subscriptions[pattern].values())
+        callbacks = tuple(listener.call for listener in _ordered(listeners) if listener.disabledUntil is None)
+        self._resolved[name] = callbacks
+        return callbacks
+
+    def enableMetrics(self, metrics):
+        """Time emits per event and per listener (swaps in _emitTimed, so emit stays untouched when off)"""
+        self.metrics = metrics
+        self._metricLabels = {}
+        self.emit = self._emitTimed
+
+    def setBreaker(self, maxFailures: int = None, failureWindow: float = None, cooldown: float = None,
+                   latencyBudget: float = None) -> None:
+        """Tune the circuit breaker; a latency budget times every call, like enableMetrics"""
+        if maxFailures is not None:
+            self.maxFailures = maxFailures
+        if failureWindow is not None:
+            self.failureWindow = failureWindow
+        if cooldown is not None:
+            self.cooldown = cooldown
+        if latencyBudget is not None:
+            self.latencyBudget = latencyBudget
+            self.emit = self._emitTimed
+
+    def _emitTimed(self, name, data):
+        if self._disabled:
+            self._reenable()
+        callbacks = self._resolved.get(name)
+        if callbacks is None:
+            callbacks = self._resolve(name)
+        if not callbacks:
+            return
+        clock = time.perf_counter
+        metrics = self.metrics
+        budget = self.latencyBudget
+        cache = self._metricLabels if metrics is not None else None
+        started = clock()
+        for callback in callbacks:
+            before = clock()
             try:
-                self.listeners[name].remove(callback)
-            except ValueError:
-                pass
+                self._invoke(callback, data, name)
+            except Exception as e:
+                self._failed(name, callback, data, e)
+            elapsed = clock() - before
+            if budget is not None and elapsed > budget:
+                self._failed(name, callback, data, None, elapsed)
+            if metrics is not None:
+                labels = cache.get((name, callback))
+                if labels is None:
+                    label = getattr(callback, '__qualname__', None) or repr(callback)
+                    labels = cache[(name, callback)] = (('event', name), ('listener', label))
+                metrics.observe('listener_seconds', elapsed, labels)
+        if metrics is not None:
+            metrics.observe('emit_seconds', clock() - started, (('event', name),))
+
+    def _failed(self, name, callback, data, error, elapsed=None):
+        """Report a listener that raised (or overran the latency budget) and count it against its breaker"""
+        label = getattr(callback, '__qualname__', None) or repr(callback)
+        listener = self._listenerFor(name, callback)
+        if error is not None:
+            self.log.error('Listener %s for %s raised %r', label, name, error, exc_info=error)
+            if self.metrics is not None:
+                self.metrics.inc('listener_errors_total', 1, (('event', name),))
+            if name != 'error':
+                self.emit('error', {'event': name, 'listener': listener, 'error': error, 'data': data})
+        else:
+            self.log.warning('Listener %s for %s took %.3fs (budget %.3fs)', label, name, elapsed, self.latencyBudget)
+        if listener is None or not listener.breaker or not self.maxFailures:
+            return
+        now = time.monotonic()
+        if listener.failures is None:
+            listener.failures = deque()
+        failures = listener.failures
+        failures.append(now)
+        while failures[0] <= now - self.failureWindow:
+            failures.popleft()
+        if len(failures) >= self.maxFailures and listener.disabledUntil is None:
+            self._disable(listener, now)
+
+    def _listenerFor(self, name, callback):
+        """Subscription of callback that emitting name ran, None once it is gone (as once() listeners are)"""
+        keys = [name]
+        keys.extend(pattern for pattern, matches in self._patterns.items() if matches(name))
+        for key in keys:
+            try:
+                listeners = self._byCallback.get((key, callback))
+            except TypeError:  # unhashable callback: look through this event's own subscriptions
+                listeners = {seq: listener for seq, listener in self._subscriptions.get(key, {}).items()
+                             if listener.call is callback}
+            if listeners:
+                return next(iter(listeners.values()))
+        return None
+
+    def _disable(self, listener: Listener, now: float) -> None:
+        listener.disabledUntil = self._disabled[listener] = now + self.cooldown
+        listener.failures.clear()
+        self._changed(listener.name)
+        self.log.warning('Disabling listener %r for %ss after %d failures in %ss', listener, self.cooldown,
+                         self.maxFailures, self.failureWindow)
+        self.emit('listener_disabled', listener)
+
+    def _reenable(self) -> None:
+        now = time.monotonic()
+        for listener, until in list(self._disabled.items()):
+            if until <= now:
+                del self._disabled[listener]
+                listener.disabledUntil = None
+                self._changed(listener.name)
+                self.log.info('Re-enabling listener %r', listener)
+                self.emit('listener_enabled', listener)
+
+    def on(self, name, callback, priority: int = 0, breaker: bool = True) -> Listener:
+        """Subscribe callback to name (or a wildcard/range), returning the handle for off().
+
+        With breaker=False the listener is never switched off by the circuit breaker.
+        """
+        listener = Listener(name, callback, priority, next(self._seq), breaker)
+        subscriptions = self._subscriptions.get(name)
+        if subscriptions is None:
+            subscriptions = self._subscriptions[name] = {}
+            matches = _matcher(name)
+            if matches is not None:
+                self._patterns[name] = matches
+        subscriptions[listener.seq] = listener
+        try:
+            self._byCallback.setdefault((name, callback), {})[listener.seq] = listener
+        except TypeError:
+            pass  # unhashable callback: remove() falls back to a scan
+        self._changed(name)
+        return listener
+
+    def once(self, name, callback, priority: int = 0) -> Listener:
+        """Like on(), but the listener is removed before its first call"""
+        listener = self.on(name, callback, priority)
+
+        @functools.wraps(callback)
+        def call(data):
+            if self.off(listener):
+                return callback(data)
+        listener.call = call
+        self._changed(name)
+        return listener
+
+    def off(self, listener: Listener) -> bool:
+        """Remove a subscription by its handle, returning False if it was already gone"""
+        subscriptions = self._subscriptions.get(listener.name)
+        if subscriptions is None or subscriptions.pop(listener.seq, None) is None:
+            return False
+        self._unindex(listener)
+        self._disabled.pop(listener, None)
+        self._changed(listener.name)
+        if not subscriptions:
+            del self._subscriptions[listener.name]
+            self._patterns.pop(listener.name, None)
+        return True
+
+    def remove(self, name, callback):
+        """Remove the first subscription of callback to name"""
+        try:
+            listeners = self._byCallback.get((name, callback))
+        except TypeError:
+            listeners = {listener.seq: listener for listener in self._subscriptions.get(name, {}).values()
+                         if listener.callback == callback}
+        if listeners:
+            self.off(next(iter(listeners.values())))
 
     def remove_all(self, name):
-        if name in self.listeners:
-            self.listeners[name] = []
+        if name in self._subscriptions:
+            self._changed(name)
+            for listener in self._subscriptions.pop(name).values():
+                self._unindex(listener)
+                self._disabled.pop(listener, None)
+            self._patterns.pop(name, None)
+
+    def _unindex(self, listener: Listener) -> None:
+        try:
+            key = (listener.name, listener.callback)
+            listeners = self._byCallback.get(key)
+        except TypeError:
+            return
+        if listeners is not None:
+            listeners.pop(listener.seq, None)
+            if not listeners:
+                del self._byCallback[key]
+
+    def _changed(self, name):
+        if name in self._patterns:
+            self._resolved.clear()  # a pattern may feed any resolved name
+        else:
+            self._resolved.pop(name, None)
+
+
+def _ordered(listeners):
+    return sorted(listeners, key=lambda listener: (-listener.priority, listener.seq))
+
+
+class AsyncEvent(Event):
+    """Event that schedules awaitables returned by listeners on the running loop"""
+
+    def __init__(self):
+        super().__init__()
+        self._tasks = set()
+
+    def emit(self, name, data):
+        if self._disabled:
+            self._reenable()
+        callbacks = self._resolved.get(name)
+        if callbacks is None:
+            callbacks = self._resolve(name)
+        for callback in callbacks:
+            try:
+                self._invoke(callback, data, name)
+            except Exception as e:
+                self._failed(name, callback, data, e)
+
+    def _invoke(self, callback, data, name=None):
+        result = callback(data)
+        if inspect.isawaitable(result):
+            task = asyncio.ensure_future(result)
+            # keep a strong reference until the handler finishes
+            self._tasks.add(task)
+            task.add_done_callback(lambda task: self._taskDone(task, name, callback, data))
+
+    def _taskDone(self, task, name, callback, data):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self._failed(name, callback, data, task.exception())
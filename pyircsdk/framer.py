@@ -0,0 +1,200 @@
+import codecs
+import select
+
+# 512 bytes for the RFC 1459 message plus 8191 bytes of IRCv3 message tags
+MAX_LINE_LENGTH = 8191 + 512
+
+
+class LineFramer:
+    """Incremental splitter turning received bytes into decoded IRC lines.
+
+    Bytes are accumulated in a bytearray and scanned once per chunk. The run
+    of complete lines is decoded straight from a memoryview of the buffer, so
+    no intermediate bytes objects are created; only when that run is not
+    valid in ``encoding`` is it decoded line by line. Lines end with \\n (an
+    optional preceding \\r is dropped) and empty lines are skipped.
+
+    Lines that are not valid in ``encoding`` are decoded with ``fallback``,
+    which is either a codec name (e.g. ``latin-1``) or an error handler for
+    ``encoding`` (e.g. ``surrogateescape`` or ``replace``). Lines longer than
+    ``maxLength`` bytes are discarded and counted in ``dropped``.
+    """
+
+    def __init__(self, encoding: str = None, fallback: str = None, maxLength: int = None) -> None:
+        self.encoding = encoding or 'utf-8'
+        self.maxLength = maxLength or MAX_LINE_LENGTH
+        self.buffer = bytearray()
+        self.dropped = 0
+        self._scanned = 0  # bytes of buffer already searched for a newline
+        self._discarding = False  # inside an over-long line, skip to the next newline
+
+        fallback = fallback or 'latin-1'
+        try:
+            codecs.lookup_error(fallback)
+            self._fallbackEncoding, self._fallbackErrors = self.encoding, fallback
+        except LookupError:
+            codecs.lookup(fallback)
+            self._fallbackEncoding, self._fallbackErrors = fallback, 'strict'
+
+    def reset(self) -> None:
+        self.buffer.clear()
+        self._scanned = 0
+        self._discarding = False
+
+    def pending(self) -> bytes:
+        """Bytes of the current incomplete line"""
+        return bytes(self.buffer)
+
+    def feed(self, data) -> list:
+        """Append received bytes and return the complete lines they finish"""
+        buffer = self.buffer
+        buffer += data
+        last = buffer.rfind(b'\n', self._scanned)
+
+        if last == -1:
+            lines = []
+        else:
+            with memoryview(buffer) as view:
+                try:
+                    # Fast path: the whole block of complete lines is valid in one C-level decode
+                    text = str(view[:last], self.encoding)
+                except UnicodeDecodeError:
+                    lines = self._splitLines(view, last)
+                else:
+                    lines = self._checkLines(text.split('\n'), len(text) == last)
+            del buffer[:last + 1]
+
+        if len(buffer) > self.maxLength:
+            # No newline in sight: drop what we have and skip the rest of the line
+            buffer.clear()
+            if not self._discarding:
+                self.dropped += 1
+            self._discarding = True
+        self._scanned = len(buffer)
+        return lines
+
+    def _checkLines(self, split: list, ascii: bool) -> list:
+        if self._discarding:
+            self._discarding = False
+            split[0] = ''
+        maxLength = self.maxLength
+        lines = []
+        for line in split:
+            if line[-1:] == '\r':
+                line = line[:-1]
+            if not line:
+                continue
+            if len(line) > maxLength or (not ascii and len(line) * 4 > maxLength
+                                         and len(line.encode(self.encoding)) > maxLength):
+                self.dropped += 1
+                continue
+            lines.append(line)
+        return lines
+
+    def _splitLines(self, view, last: int) -> list:
+        """Decode line by line so only the offending lines use the fallback"""
+        buffer = self.buffer
+        lines = []
+        start = 0
+        while start <= last:
+            end = buffer.find(b'\n', start, last + 1)
+            stop = end - 1 if end > start and buffer[end - 1] == 13 else end
+            if self._discarding:
+                self._discarding = False
+            elif stop - start > self.maxLength:
+                self.dropped += 1
+            elif stop > start:
+                lines.append(self._decode(view[start:stop]))
+            start = end + 1
+        return lines
+
+    def _decode(self, line) -> str:
+        try:
+            return str(line, self.encoding)
+        except UnicodeDecodeError:
+            return str(line, self._fallbackEncoding, self._fallbackErrors)
+
+
+class RecvBuffer:
+    """Reusable buffer for socket.recv_into that adapts its size to the traffic.
+
+    fill() reads into the same bytearray on every call and keeps reading
+    while the socket has more ready, so a burst arrives as one batch for the
+    framer instead of one 4 KiB chunk per wakeup. A batch that fills the
+    buffer doubles it (up to ``maxSize``); ``shrinkAfter`` batches in a row
+    using under an eighth of it halve it again (down to ``minSize``).
+    """
+
+    def __init__(self, size: int = 16384, minSize: int = 4096, maxSize: int = 1 << 20,
+                 shrinkAfter: int = 64) -> None:
+        self.minSize = minSize
+        self.maxSize = maxSize
+        self.shrinkAfter = shrinkAfter
+        self._small = 0  # consecutive batches using under an eighth of the buffer
+        self.eof = False  # the last batch ended with the peer closing; the next fill() returns b''
+        self._allocate(size)
+
+    def _allocate(self, size: int) -> None:
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+
+    @property
+    def size(self) -> int:
+        return len(self.buffer)
+
+    def fill(self, sock, ready=None) -> bytes:
+        """Read one batch from sock, b'' when the peer closed the connection.
+
+        The first read may block, so call this once the socket is readable.
+        After it, reading continues until the buffer is full, the socket
+        would block (non-blocking sockets) or ``ready()`` returns false
+        (blocking sockets). Errors after the first read end the batch; the
+        next call raises them. A close after the first read ends the batch and
+        sets ``eof``, as the socket may never look readable again (a TLS
+        close_notify is consumed with the data). A full buffer can leave
+        decrypted TLS bytes in the SSL object, so check its pending() before
+        waiting for the socket again.
+        """
+        if self.eof:
+            self.eof = False
+            return b''
+        view = self.view
+        size = len(view)
+        total = 0
+        while total < size:
+            try:
+                received = sock.recv_into(view[total:])
+            except OSError:
+                if total:
+                    break
+                raise
+            if not received:
+                self.eof = total > 0
+                break
+            total += received
+            if ready is not None and not ready():
+                break
+        data = bytes(view[:total])
+        self._adapt(total, size)
+        return data
+
+    def _adapt(self, total: int, size: int) -> None:
+        if total == size and size < self.maxSize:
+            self._small = 0
+            self._allocate(min(size * 2, self.maxSize))
+        elif total < size // 8 and size > self.minSize:
+            self._small += 1
+            if self._small >= self.shrinkAfter:
+                self._small = 0
+                self._allocate(max(size // 2, self.minSize))
+        else:
+            self._small = 0
+
+
+def readable(sock):
+    """ready() for RecvBuffer.fill on a blocking socket: decrypted TLS bytes pending, or readable without waiting"""
+    pending = getattr(sock, 'pending', None)
+
+    def ready() -> bool:
+        return bool(pending and pending()) or bool(select.select([sock], [], [], 0)[0])
+    return ready
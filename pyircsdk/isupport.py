@@ -0,0 +1,154 @@
+import re
+import string
+
+_UPPER = string.ascii_uppercase.encode()
+_LOWER = string.ascii_lowercase.encode()
+
+# Byte tables: folding the UTF-8 encoding only touches ASCII, as these mappings require
+CASEMAPPINGS = {
+    'ascii': bytes.maketrans(_UPPER, _LOWER),
+    'rfc1459': bytes.maketrans(_UPPER + b'[]\\~', _LOWER + b'{}|^'),
+    'strict-rfc1459': bytes.maketrans(_UPPER + b'[]\\', _LOWER + b'{}|'),
+}
+
+_ESCAPE = re.compile(r'\\x([0-9A-Fa-f]{2})')
+
+# Commands that take a comma-separated target list even when the server doesn't say
+_LIST_COMMANDS = ('JOIN', 'PART')
+
+
+def folder(casemapping: str = 'rfc1459'):
+    """Function lower-casing nicks and channel names the way a server with this CASEMAPPING compares them"""
+    table = CASEMAPPINGS.get(casemapping, CASEMAPPINGS['rfc1459'])
+
+    def fold(name: str) -> str:
+        return name.encode('utf-8', 'surrogatepass').translate(table).decode('utf-8', 'surrogatepass')
+    return fold
+
+
+def casefold(name: str, casemapping: str = 'rfc1459') -> str:
+    return folder(casemapping)(name)
+
+
+class ISupport:
+    """The RPL_ISUPPORT (005) tokens of one connection.
+
+    ``tokens`` holds the raw values ('' for tokens without one); the common
+    ones are parsed once per update into attributes, with the usual defaults
+    until (or unless) the server advertises them.
+    """
+
+    def __init__(self) -> None:
+        self.tokens = {}
+        self._parse()
+
+    def update(self, tokens) -> None:
+        """Apply the tokens of one 005 line (the parameters after our nick)"""
+        for token in tokens:
+            if token[:1] == '-':
+                self.tokens.pop(token[1:], None)
+                continue
+            name, _, value = token.partition('=')
+            self.tokens[name] = _ESCAPE.sub(lambda match: chr(int(match.group(1), 16)), value)
+        self._parse()
+
+    def clear(self) -> None:
+        self.tokens = {}
+        self._parse()
+
+    def get(self, name: str, default=None):
+        return self.tokens.get(name, default)
+
+    def _parse(self) -> None:
+        tokens = self.tokens
+        self.network = tokens.get('NETWORK')
+        self.casemapping = tokens.get('CASEMAPPING') or 'rfc1459'
+        self.fold = folder(self.casemapping)
+        self.chantypes = tokens.get('CHANTYPES', '#&+!')
+
+        self.prefix = ('ov', '@+')  # (modes, prefixes), highest rank first
+        prefix = tokens.get('PREFIX')
+        if prefix is not None and prefix.startswith('('):
+            modes, _, prefixes = prefix[1:].partition(')')
+            if len(modes) == len(prefixes):
+                self.prefix = (modes, prefixes)
+
+        self.chanmodes = ('beI', 'k', 'l', 'imnpst')  # list, always a parameter, parameter when set, flag
+        chanmodes = tokens.get('CHANMODES')
+        if chanmodes is not None and chanmodes.count(',') >= 2:
+            self.chanmodes = tuple((chanmodes.split(',') + [''])[:4])
+
+        self.linelen = _int(tokens.get('LINELEN'), 512)
+        self.nicklen = _int(tokens.get('NICKLEN'), None)
+        self.channellen = _int(tokens.get('CHANNELLEN'), None)
+        self.maxtargets = _int(tokens.get('MAXTARGETS'), None)
+        self.targmax = {}  # command -> limit, None for no limit
+        for entry in tokens.get('TARGMAX', '').split(','):
+            command, _, limit = entry.partition(':')
+            if command:
+                self.targmax[command.upper()] = _int(limit, None)
+
+    def maxTargets(self, command: str):
+        """How many targets one command line may carry, or None for no limit beyond LINELEN"""
+        command = command.upper()
+        if command in self.targmax:
+            return self.targmax[command]
+        if command in ('PRIVMSG', 'NOTICE') and self.maxtargets is not None:
+            return self.maxtargets
+        return None if command in _LIST_COMMANDS else 1
+
+    def packTargets(self, command: str, targets: list, text: str = None) -> list:
+        """Lines sending command to targets, as many per line as the target limit and LINELEN allow"""
+        limit = self.maxTargets(command) or len(targets)
+        suffix = '' if text is None else ' :' + text
+        # 'COMMAND ' + targets + suffix + '\r\n'
+        room = self.linelen - len(command) - 3 - len(suffix.encode('utf-8'))
+        lines = []
+        batch = []
+        size = 0
+        for target in targets:
+            length = len(target.encode('utf-8'))
+            if batch and (len(batch) >= limit or size + 1 + length > room):
+                lines.append('%s %s%s\r\n' % (command, ','.join(batch), suffix))
+                batch = []
+            size = length if not batch else size + 1 + length
+            batch.append(target)
+        if batch:
+            lines.append('%s %s%s\r\n' % (command, ','.join(batch), suffix))
+        return lines
+
+    def packJoin(self, channels: list, keys: list = None) -> list:
+        """JOIN lines for channels, keys[i] being the key of channels[i] (or None); keyed channels go first"""
+        keys = keys or [None] * len(channels)
+        pairs = list(zip(channels, keys))
+        pairs = [pair for pair in pairs if pair[1]] + [pair for pair in pairs if not pair[1]]
+        limit = self.maxTargets('JOIN') or len(pairs)
+        room = self.linelen - len('JOIN \r\n')
+        lines = []
+        batch = []
+        size = -1
+        for channel, key in pairs:
+            # Every channel and key costs its length plus a ',' (or the ' ' before the keys)
+            length = len(channel.encode('utf-8')) + 1 + (len(key.encode('utf-8')) + 1 if key else 0)
+            if batch and (len(batch) >= limit or size + length > room):
+                lines.append(_joinLine(batch))
+                batch = []
+                size = -1
+            batch.append((channel, key))
+            size += length
+        if batch:
+            lines.append(_joinLine(batch))
+        return lines
+
+
+def _joinLine(batch: list) -> str:
+    keys = [key for _, key in batch if key]
+    channels = ','.join(channel for channel, _ in batch)
+    return 'JOIN %s %s\r\n' % (channels, ','.join(keys)) if keys else 'JOIN %s\r\n' % channels
+
+
+def _int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
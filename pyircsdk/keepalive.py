@@ -0,0 +1,60 @@
+class Keepalive:
+    """Client-initiated PING keepalive for one connection.
+
+    After ``pingInterval`` seconds without receiving anything (default 60, 0
+    to disable) the client sends a PING; if still nothing has arrived
+    ``pingTimeout`` seconds later (default 30) the connection is considered
+    dead. A PONG answering our PING gives the round-trip time in ``rtt``.
+    The older ``nodataTimeout`` still works: when set without pingInterval
+    it is split evenly between the two.
+    """
+
+    TOKEN_PREFIX = 'pyircsdk-'
+
+    def __init__(self, config=None) -> None:
+        interval = getattr(config, 'pingInterval', None)
+        timeout = getattr(config, 'pingTimeout', None)
+        nodata = getattr(config, 'nodataTimeout', None)
+        if interval is None and nodata:
+            interval = timeout = nodata / 2
+        self.interval = 60.0 if interval is None else interval
+        self.timeout = 30.0 if timeout is None else timeout
+        self.lastReceived = 0.0
+        self.pingSent = None  # when our outstanding PING went out
+        self.token = None
+        self.rtt = None
+        self._count = 0
+
+    def reset(self, now: float) -> None:
+        self.lastReceived = now
+        self.pingSent = None
+        self.token = None
+
+    def check(self, now: float) -> tuple:
+        """('ping', 'dead' or None, seconds until the next check or None when disabled)"""
+        if not self.interval:
+            return None, None
+        idle = now - self.lastReceived
+        if idle < self.interval:
+            return None, self.interval - idle
+        if idle >= self.interval + self.timeout:
+            return 'dead', None
+        wait = self.interval + self.timeout - idle
+        if self.pingSent is None or self.pingSent < self.lastReceived:
+            return 'ping', wait
+        return None, wait
+
+    def ping(self, now: float) -> str:
+        """Token for a new PING sent now"""
+        self._count += 1
+        self.token = '%s%d' % (self.TOKEN_PREFIX, self._count)
+        self.pingSent = now
+        return self.token
+
+    def pong(self, token: str, now: float):
+        """Round-trip time if token answers our outstanding PING, else None"""
+        if token != self.token or self.token is None:
+            return None
+        self.token = None
+        self.rtt = now - self.pingSent
+        return self.rtt
@@ -0,0 +1,360 @@
+import codecs
+import html
+import ipaddress
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from .command import Module
+from .writer import TokenBucket
+
+_URL = re.compile(r'https?://[^\s<>"\']+', re.IGNORECASE)
+_TITLE = re.compile(rb'<title[^>]*>(.*?)</title\s*>', re.IGNORECASE | re.DOTALL)
+_TITLE_END = re.compile(rb'</title', re.IGNORECASE)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+_CONTROL = re.compile('[\x00-\x1f\x7f]')
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+_MISSING = object()
+
+
+def normalizeUrl(url: str):
+    """Canonical form of an http(s) URL for caching, or None if it isn't one.
+
+    Trailing sentence punctuation (and an unbalanced ')') is dropped, scheme
+    and host are lowercased, default ports, credentials and the fragment are
+    removed, and an empty path becomes '/'.
+    """
+    url = url.rstrip('.,;:!?\'"')
+    if url.endswith(')') and url.count('(') < url.count(')'):
+        url = url[:-1]
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not host:
+        return None
+    netloc = '[%s]' % host if ':' in host else host
+    if port is not None and port != _DEFAULT_PORTS[scheme]:
+        netloc += ':%d' % port
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+
+def extractTitle(body: bytes, charset: str = None, maxLength: int = 300):
+    """Text of the first <title> in an HTML prefix, unescaped and on one line, or None"""
+    match = _TITLE.search(body)
+    if not match:
+        return None
+    if not charset:
+        meta = _META_CHARSET.search(body)
+        charset = meta.group(1).decode('ascii') if meta else 'utf-8'
+    try:
+        codecs.lookup(charset)
+    except LookupError:
+        charset = 'utf-8'
+    title = ' '.join(html.unescape(match.group(1).decode(charset, 'replace')).split())
+    title = _CONTROL.sub('', title)[:maxLength]
+    return title or None
+
+
+class TTLCache:
+    """LRU cache of at most ``maxSize`` entries that expire ``ttl`` seconds after being stored. Not thread safe."""
+
+    def __init__(self, maxSize: int = 1024, ttl: float = 3600.0, clock=time.monotonic) -> None:
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires, value), least recently used first
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        if entry[0] <= self.clock():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value, ttl: float = None) -> None:
+        self._entries[key] = (self.clock() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxSize:
+            self._entries.popitem(last=False)
+
+
+def _connectAny(addresses: list, timeout, source=None) -> socket.socket:
+    """Socket connected to the first of addresses that accepts, like socket.create_connection without DNS"""
+    error = None
+    for address in addresses:
+        try:
+            return socket.create_connection(address, timeout, source)
+        except OSError as e:
+            error = e
+    raise error
+
+
+class ConnectionPool:
+    """Idle keep-alive HTTP(S) connections, at most ``perHost`` per (scheme, host, port)"""
+
+    def __init__(self, perHost: int = 2, timeout: float = 5.0, sslContext=None) -> None:
+        self.perHost = perHost
+        self.timeout = timeout
+        self.sslContext = sslContext
+        self._idle = {}  # (scheme, host, port) -> deque of connections
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, addresses: list = None):
+        """(connection, reused) for key, an idle one if there is one.
+
+        A new connection goes to one of ``addresses`` ((ip, port) pairs) when
+        given, instead of resolving the host again; Host and SNI still use it.
+        """
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, host, port = key
+        if scheme == 'https':
+            connection = HTTPSConnection(host, port, timeout=self.timeout, context=self.sslContext)
+        else:
+            connection = HTTPConnection(host, port, timeout=self.timeout)
+        if addresses:
+            connection._create_connection = lambda _, timeout, source: _connectAny(addresses, timeout, source)
+        return connection, False
+
+    def put(self, key: tuple, connection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            if len(idle) < self.perHost:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+class TitleFetcher:
+    """Fetches page titles on a thread pool, with a TTL+LRU cache and coalescing.
+
+    fetch(url) returns a Future of the title (None when there is none or the
+    fetch failed). Only the first ``maxBytes`` of a page are read, stopping
+    at ``</title>``. Concurrent fetches of the same normalized URL share one
+    request; titles are cached for ``ttl`` seconds and failures for
+    ``errorTtl``. Hosts resolving to private, loopback or link-local
+    addresses are refused unless ``allowPrivate`` is set.
+    """
+
+    def __init__(self, workers: int = 4, maxBytes: int = 32768, timeout: float = 5.0, cacheSize: int = 1024,
+                 ttl: float = 3600.0, errorTtl: float = 300.0, maxRedirects: int = 3, allowPrivate: bool = False,
+                 userAgent: str = 'pyircsdk-linkpreview', sslContext=None) -> None:
+        self.maxBytes = maxBytes
+        self.errorTtl = errorTtl
+        self.maxRedirects = maxRedirects
+        self.allowPrivate = allowPrivate
+        self.headers = {'User-Agent': userAgent, 'Accept': 'text/html,application/xhtml+xml',
+                        'Accept-Encoding': 'identity'}
+        self.cache = TTLCache(cacheSize, ttl)
+        self.pool = ConnectionPool(workers, timeout, sslContext)
+        self.requests = 0  # fetches that went to the network
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pyircsdk-linkpreview')
+        self._inflight = {}  # url -> Future
+        self._lock = threading.Lock()
+
+    def fetch(self, url: str) -> Future:
+        url = normalizeUrl(url)
+        with self._lock:
+            title = self.cache.get(url, _MISSING) if url else None
+            if title is not _MISSING:
+                future = Future()
+                future.set_result(title)
+                return future
+            future = self._inflight.get(url)
+            if future is None:
+                future = self._inflight[url] = Future()
+                self.requests += 1
+                self._executor.submit(self._complete, url, future)
+            return future
+
+    def _complete(self, url: str, future: Future) -> None:
+        try:
+            title = self.title(url)
+        except Exception:  # network, HTTP, address or encoding trouble: no title
+            title = None
+        with self._lock:
+            self.cache.put(url, title, None if title is not None else self.errorTtl)
+            del self._inflight[url]
+        future.set_result(title)
+
+    def title(self, url: str):
+        """Fetch url (following redirects) on this thread and return its title or None"""
+        for _ in range(self.maxRedirects + 1):
+            parts = urlsplit(url)
+            scheme = parts.scheme.lower()
+            if scheme not in _DEFAULT_PORTS:
+                return None
+            key = (scheme, parts.hostname, parts.port or _DEFAULT_PORTS[scheme])
+            # Connect to the very addresses checked, so a second lookup can't rebind the host to a private one
+            addresses = None if self.allowPrivate else self._checkPublic(key[1], key[2])
+            connection, response = self._request(key, urlunsplit(('', '', parts.path or '/', parts.query, '')),
+                                                 addresses)
+            if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                self._read(key, connection, response, stopAtTitle=False)
+                url = urljoin(url, response.getheader('Location'))
+                continue
+            contentType = response.getheader('Content-Type', '')
+            if response.status != 200 or not any(kind in contentType for kind in ('text/html', 'xhtml')):
+                connection.close()
+                return None
+            charset = None
+            if 'charset=' in contentType:
+                charset = contentType.split('charset=', 1)[1].split(';')[0].strip(' "\'')
+            return extractTitle(self._read(key, connection, response, stopAtTitle=True), charset)
+        return None
+
+    def _request(self, key: tuple, path: str, addresses: list = None) -> tuple:
+        while True:
+            connection, reused = self.pool.get(key, addresses)
+            try:
+                connection.request('GET', path, headers=self.headers)
+                return connection, connection.getresponse()
+            except (OSError, HTTPException):
+                connection.close()
+                if not reused:
+                    raise
+                # The server closed this idle connection; try the next one, or a fresh one
+
+    def _read(self, key: tuple, connection, response, stopAtTitle: bool) -> bytes:
+        """Read up to maxBytes of the body, returning the connection to the pool if it was read to the end"""
+        body = bytearray()
+        while len(body) < self.maxBytes:
+            chunk = response.read(min(8192, self.maxBytes - len(body)))
+            if not chunk:
+                break
+            # Only the new chunk (and a tag split across chunks) needs looking at
+            start = max(0, len(body) - 8)
+            body += chunk
+            if stopAtTitle and _TITLE_END.search(body, start):
+                break
+        if response.isclosed() and not response.will_close:
+            self.pool.put(key, connection)
+        else:
+            connection.close()
+        return bytes(body)
+
+    @staticmethod
+    def _checkPublic(host: str, port: int) -> list:
+        """(ip, port) of every address host resolves to, raising ValueError if any of them isn't public"""
+        addresses = []
+        for family, _, _, _, address in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP):
+            ip = ipaddress.ip_address(address[0].split('%')[0])
+            if not ip.is_global:
+                raise ValueError('%s resolves to non-public address %s' % (host, ip))
+            addresses.append((str(ip), address[1]))
+        return addresses
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.pool.close()
+
+
+class LinkPreview(Module):
+    """Replies with the title of links posted in channels or private messages.
+
+    Up to ``maxUrls`` links per message are looked up with a TitleFetcher
+    (shared between modules when passed in), so the receive thread never
+    waits on the network. Each channel gets ``channelBurst`` previews at once,
+    refilled at ``channelRate`` per second; links beyond that are ignored.
+    Replies are sent from the fetcher's threads, which every client hands to
+    its own writer or event loop.
+    """
+
+    ircCommands = ('PRIVMSG',)
+    maxUrls = 3
+    channelRate = 0.2
+    channelBurst = 3
+    format = 'Title: %s'
+    pruneInterval = 60.0  # seconds between sweeps of idle rate limit buckets
+
+    def __init__(self, irc, fetcher: TitleFetcher = None) -> None:
+        super().__init__(irc, '', '')
+        self._ownsFetcher = fetcher is None
+        self.fetcher = fetcher or TitleFetcher()
+        self._buckets = {}  # (connection, folded target) -> TokenBucket
+        self._nextPrune = time.monotonic() + self.pruneInterval
+        self._lock = threading.Lock()
+
+    def handleCommand(self, message, command):
+        text = message.trailing
+        if not text or 'http' not in text.lower() or not message.params:
+            return
+        irc = self.irc  # module.irc changes per message when shared by a ConnectionManager
+        target = message.params[0]
+        if target[:1] not in (irc.isupport.chantypes or '#'):
+            target = message.messageFrom  # a private message: answer the sender
+        urls = []
+        for match in _URL.finditer(text):
+            url = normalizeUrl(match.group())
+            if url and url not in urls:
+                urls.append(url)
+                if len(urls) == self.maxUrls:
+                    break
+        for url in urls:
+            if not self._allow(irc, target):
+                break
+            self.fetcher.fetch(url).add_done_callback(lambda future: self._reply(irc, target, future))
+
+    def _allow(self, irc, target: str) -> bool:
+        key = (id(irc), irc.casefold(target))
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._nextPrune:
+                self._prune(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.channelRate, self.channelBurst)
+            if bucket.delay(now):
+                return False
+            bucket.consume()
+            return True
+
+    def _prune(self, now: float) -> None:
+        """Forget buckets that have refilled completely, as a new one would be the same (called with the lock held)"""
+        self._nextPrune = now + self.pruneInterval
+        for key, bucket in list(self._buckets.items()):
+            if not bucket.delay(now) and bucket.tokens >= bucket.burst:
+                del self._buckets[key]
+
+    def _reply(self, irc, target: str, future) -> None:
+        if future.cancelled():
+            return
+        try:
+            title = future.result()
+            if title:
+                irc.privmsg(target, self.format % title)
+        except Exception as e:
+            # Runs on the fetcher's thread, where nobody else would see it
+            irc.log.warning('Link preview failed: %s', e)
+
+    def handleError(self, message, command, error):
+        self.irc.log.warning('Link preview failed: %s', error)
+
+    def stopListening(self):
+        super().stopListening()
+        if self._ownsFetcher:
+            self.fetcher.close()
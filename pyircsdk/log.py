@@ -0,0 +1,83 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+
+LOGGER_NAME = 'pyircsdk'
+FIELDS = ('network', 'channel', 'command')
+DEFAULT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+# Libraries stay quiet unless the application configures logging
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+
+_queueHandler = None
+_listener = None
+
+
+class ConnectionLogger(logging.LoggerAdapter):
+    """Logger for one connection.
+
+    Records carry a ``network`` field, plus ``channel`` and ``command`` when
+    passed in ``extra``. The underlying logger is ``pyircsdk.<host>``, so
+    levels can be set per network.
+    """
+
+    def __init__(self, network: str = None, level=None) -> None:
+        logger = logging.getLogger(LOGGER_NAME)
+        if network:
+            logger = logger.getChild(network)
+        if level is not None:
+            logger.setLevel(level)
+        super().__init__(logger, {'network': network, 'channel': None, 'command': None})
+
+    def process(self, msg, kwargs):
+        extra = kwargs.get('extra')
+        kwargs['extra'] = {**self.extra, **extra} if extra else self.extra
+        return msg, kwargs
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formatter appending the structured fields that are set, e.g. ``network=libera channel=#test``"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = ' '.join('%s=%s' % (name, value) for name in FIELDS
+                          if (value := getattr(record, name, None)) is not None)
+        return text + ' ' + fields if fields else text
+
+
+def setupLogging(level=logging.INFO, handler: logging.Handler = None) -> logging.handlers.QueueListener:
+    """Send pyircsdk records through a queue to handler (stderr by default).
+
+    The connection threads only put records on the queue; formatting and
+    writing happen on the QueueListener's thread. Calling it again replaces
+    the previous setup.
+    """
+    global _queueHandler, _listener
+    stopLogging()
+    if handler is None:
+        handler = logging.StreamHandler()
+        handler.setFormatter(StructuredFormatter(DEFAULT_FORMAT))
+
+    records = queue.SimpleQueue()
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    _queueHandler = logging.handlers.QueueHandler(records)
+    logger.addHandler(_queueHandler)
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stopLogging() -> None:
+    """Flush queued records and remove the handler installed by setupLogging"""
+    global _queueHandler, _listener
+    if _queueHandler is not None:
+        logging.getLogger(LOGGER_NAME).removeHandler(_queueHandler)
+        _queueHandler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stopLogging)
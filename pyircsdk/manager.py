@@ -0,0 +1,488 @@
+import errno
+import heapq
+import itertools
+import logging
+import selectors
+import socket
+import ssl
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .log import LOGGER_NAME
+from .outbound import QUIT, buildLine
+from .pyircsdk import IRCSDK, IRCSDKConfig
+
+_RESOLVING, _CONNECTING, _HANDSHAKE, _CONNECTED, _CLOSING, _WAITING, _DONE = range(7)
+
+# Seconds a closing session may take to write QUIT and what is left in its buffer
+CLOSE_TIMEOUT = 1.0
+
+
+class _Timer:
+    __slots__ = ('when', 'callback', 'session', 'cancelled')
+
+    def __init__(self, when, callback, session=None):
+        self.when = when
+        self.callback = callback
+        self.session = session  # whose connection an error in callback costs
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class _QueueWriter:
+    """Writer stand-in that lets the manager drain the send queue when the socket is writable"""
+
+    def __init__(self, session):
+        self.session = session
+
+    def put(self, data: bytes, priority: int) -> None:
+        self.session.sendQueue.put(data, priority)
+        self.session.manager._flush(self.session)
+
+    def stop(self) -> None:
+        pass
+
+
+class ManagedIRCSDK(IRCSDK):
+    """IRCSDK session whose socket is driven by a ConnectionManager instead of startRecv"""
+
+    def __init__(self, manager, config: IRCSDKConfig) -> None:
+        super().__init__(config)
+        self.manager = manager
+        self.irc = None
+        self._state = _WAITING
+        self._outbuf = bytearray()
+        self._timer = None  # pending connect timeout, retry, send-queue refill or close deadline
+        self._resolving = None  # Future of the address lookup of the current attempt
+        self._addresses = deque()  # resolved addresses of the current attempt not tried yet
+        self._handshakeStarted = None
+
+    def connect(self, config: IRCSDKConfig = None) -> None:
+        self.manager._connect(self)
+
+    def _send(self, data: bytes, priority: int = None) -> None:
+        if self.manager._elsewhere():
+            # The manager thread owns the socket and the send queue
+            self.manager.callSoon(IRCSDK._send, self, data, priority)
+            return
+        super()._send(data, priority)
+
+    def close(self) -> None:
+        if self.manager._elsewhere():
+            self.manager.callSoon(ManagedIRCSDK.close, self)
+            return
+        self._closing = True
+        self._stopWriter()
+        self._outbuf += buildLine(QUIT, trailing=self.config.nick)
+        self.manager._disconnect(self)
+
+    def _sendNow(self, data: bytes) -> None:
+        self._outbuf += data
+        self.manager._flush(self)
+
+    def _startWriter(self) -> None:
+        self.sendQueue.clear()
+        self._writer = _QueueWriter(self)
+
+    def _schedule(self, delay: float, callback):
+        return self.manager.callLater(delay, callback, self)
+
+
+class _BoundModule:
+    """Routes a shared module's commands with module.irc pointing at the session they came from"""
+
+    def __init__(self, module, session):
+        self.module = module
+        self.session = session
+
+    def dispatchCommand(self, message, command):
+        self.module.irc = self.session
+        return self.module.dispatchCommand(message, command)
+
+
+class ConnectionManager:
+    """Runs many IRCSDK sessions on one selector (epoll on Linux) in one thread.
+
+    Every session keeps its own Event bus, send queue and reconnect state.
+    Modules added with addModule are shared by all sessions; while a module
+    handles a message, ``module.irc`` is the session the message arrived on.
+
+    Nothing blocks the selector thread: host names are resolved on a small
+    thread pool and QUIT is flushed as the socket allows. Sends and close()
+    may be called from any thread; off the manager thread they are handed
+    over with callSoon(). An exception from a callback or timer drops the
+    connection of the session it belongs to (which reconnects as its policy
+    allows) and leaves the other sessions running.
+    """
+
+    def __init__(self) -> None:
+        self.selector = selectors.DefaultSelector()
+        self.sessions = []
+        self.modules = []
+        self._timers = []
+        self._sequence = itertools.count()
+        self._running = False
+        self._thread = None  # ident of the thread in run()
+        self._calls = deque()  # (callback, args) handed over by callSoon
+        self._wakeup, self._wakeupWriter = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._wakeupWriter.setblocking(False)
+        self.selector.register(self._wakeup, selectors.EVENT_READ, None)
+        self._resolver = None  # ThreadPoolExecutor for getaddrinfo, started on the first host name
+
+    def add(self, config: IRCSDKConfig) -> ManagedIRCSDK:
+        session = ManagedIRCSDK(self, config)
+        self.sessions.append(session)
+        for module in self.modules:
+            self._bindModule(session, module)
+        if self._running:
+            self.callSoon(self._connect, session)
+        return session
+
+    def addModule(self, module) -> None:
+        if module.executor is not None:
+            # module.irc is swapped per message, which workers would race on
+            raise ValueError('Shared modules must handle messages inline (executor = None)')
+        self.modules.append(module)
+        for session in self.sessions:
+            self._bindModule(session, module)
+
+    def _bindModule(self, session, module) -> None:
+        if module.ircCommands is None:
+            def listener(message):
+                module.irc = session
+                return module.handleMessage(message)
+            session.event.on('message', listener)
+        else:
+            trigger = module.fantasy + module.command if module.command else None
+            session.router.add(_BoundModule(module, session), module.ircCommands, trigger)
+
+    def callLater(self, delay: float, callback, session: ManagedIRCSDK = None) -> _Timer:
+        timer = _Timer(time.monotonic() + delay, callback, session)
+        heapq.heappush(self._timers, (timer.when, next(self._sequence), timer))
+        return timer
+
+    def callSoon(self, callback, *args) -> None:
+        """Run callback(*args) on the manager thread at its next wakeup; safe to call from any thread.
+
+        When the first argument is a session, an exception from callback only drops that session's connection.
+        """
+        self._calls.append((callback, args))
+        if self._elsewhere():
+            try:
+                self._wakeupWriter.send(b'\0')
+            except OSError:
+                pass  # already full of wakeups
+
+    def _elsewhere(self) -> bool:
+        """True when run() is serving on another thread than the calling one"""
+        return self._thread is not None and self._thread != threading.get_ident()
+
+    def stop(self) -> None:
+        self._running = False
+        if self._elsewhere():
+            try:
+                self._wakeupWriter.send(b'\0')
+            except OSError:
+                pass
+
+    def run(self) -> None:
+        """Connect every session and serve them until all are closed or stop() is called"""
+        self._running = True
+        self._thread = threading.get_ident()
+        try:
+            self._serve()
+        finally:
+            self._thread = None
+
+    def _serve(self) -> None:
+        for session in self.sessions:
+            if session._state == _WAITING:
+                self._connect(session)
+
+        nextIdleCheck = time.monotonic() + 1
+        while self._running and any(session._state != _DONE for session in self.sessions):
+            timeout = 1.0
+            if self._calls:
+                timeout = 0.0
+            elif self._timers:
+                timeout = min(timeout, max(0.0, self._timers[0][0] - time.monotonic()))
+            for key, mask in self.selector.select(timeout):
+                if key.data is None:
+                    self._drainWakeups()
+                else:
+                    self._ready(key.data, mask)
+            calls = self._calls
+            for _ in range(len(calls)):
+                callback, args = calls.popleft()
+                session = args[0] if args and isinstance(args[0], ManagedIRCSDK) else None
+                self._guarded(session, callback, *args)
+
+            now = time.monotonic()
+            while self._timers and self._timers[0][0] <= now:
+                timer = heapq.heappop(self._timers)[2]
+                if not timer.cancelled:
+                    self._guarded(timer.session, timer.callback)
+            if now >= nextIdleCheck:
+                nextIdleCheck = now + 1
+                self._checkIdle(now)
+
+        for session in self.sessions:
+            if session.irc is not None or session._resolving is not None:
+                self._close(session)
+        self._running = False
+
+    def _guarded(self, session, callback, *args) -> None:
+        """Run callback(*args), dropping only session's connection if it raises"""
+        try:
+            callback(*args)
+        except Exception as e:
+            if session is None:
+                logging.getLogger(LOGGER_NAME).exception('Error in a ConnectionManager callback')
+                return
+            session.log.exception('Error in a callback, dropping the connection')
+            try:
+                if session._state in (_CONNECTED, _CLOSING):
+                    self._closed(session)
+                elif session._state != _DONE:
+                    self._connectFailed(session, e)
+            except Exception:
+                session.log.exception('Error while dropping the connection, giving up on it')
+                self._close(session)
+                session._state = _DONE
+
+    def _drainWakeups(self) -> None:
+        try:
+            while self._wakeup.recv(4096):
+                pass
+        except OSError:
+            pass
+
+    def _connect(self, session: ManagedIRCSDK) -> None:
+        config = session.config
+        host, port = session.reconnectPolicy.server
+        if session._connectStarted is None:
+            session._connectStarted = time.monotonic()
+        attempt = session.reconnectPolicy.failures + 1
+        session.event.emit('connecting', {'host': host, 'port': port, 'attempt': attempt})
+        session.log.info('Connecting to %s:%s (attempt %d)', host, port, attempt)
+        session._state = _RESOLVING
+        session._outbuf.clear()
+        # The timeout covers the lookup as well as the TCP and TLS handshakes
+        session._timer = self.callLater(config.connectionTimeout or 10,
+                                        lambda: self._connectFailed(session, socket.timeout('timed out')), session)
+        try:
+            # Addresses resolve right here, without touching DNS
+            addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM, flags=socket.AI_NUMERICHOST)
+        except socket.gaierror:
+            if self._resolver is None:
+                self._resolver = ThreadPoolExecutor(4, thread_name_prefix='pyircsdk-resolve')
+            future = session._resolving = self._resolver.submit(socket.getaddrinfo, host, port,
+                                                                type=socket.SOCK_STREAM)
+            future.add_done_callback(lambda future: self.callSoon(self._resolved, session, future))
+            return
+        session._addresses = deque(addresses)
+        self._open(session)
+
+    def _resolved(self, session: ManagedIRCSDK, future) -> None:
+        if future is not session._resolving:
+            return  # the attempt timed out or the session was closed meanwhile
+        session._resolving = None
+        try:
+            addresses = future.result()
+        except OSError as e:
+            self._connectFailed(session, e)
+            return
+        session._addresses = deque(addresses)
+        self._open(session)
+
+    def _open(self, session: ManagedIRCSDK, error: OSError = None) -> None:
+        """Start a non-blocking connect to the next resolved address, failing the attempt once none are left"""
+        while True:
+            if not session._addresses:
+                self._connectFailed(session, error or OSError('getaddrinfo returned no addresses'))
+                return
+            family, kind, proto, _, sockaddr = session._addresses.popleft()
+            try:
+                sock = socket.socket(family, kind, proto)
+            except OSError as e:
+                error = e  # e.g. no IPv6 on this host
+                continue
+            sock.setblocking(False)
+            err = sock.connect_ex(sockaddr)
+            if err in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                break
+            sock.close()
+            error = OSError(err, 'Connection failed')
+        if session.config.ssl:
+            sock = session.sslContext.wrap_socket(sock, server_hostname=session.reconnectPolicy.server[0],
+                                                  do_handshake_on_connect=False)
+
+        session.irc = sock
+        session._state = _CONNECTING
+        self.selector.register(sock, selectors.EVENT_WRITE, session)
+
+    def _connectFailed(self, session: ManagedIRCSDK, error) -> None:
+        session.log.warning('Connection failed: %s', error)
+        self._close(session)
+        self._retry(session, session._handle_connect_failed())
+
+    def _retry(self, session: ManagedIRCSDK, delay) -> None:
+        if delay is None:
+            session._state = _DONE
+        else:
+            session._state = _WAITING
+            session._timer = self.callLater(delay, lambda: self._connect(session), session)
+
+    def _ready(self, session: ManagedIRCSDK, mask: int) -> None:
+        if session._state == _CONNECTING:
+            err = session.irc.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if err:
+                # Like socket.create_connection, try the other addresses before counting a failed attempt
+                self._dropSocket(session)
+                self._open(session, OSError(err, 'Connection failed'))
+            elif session.config.ssl:
+                session._state = _HANDSHAKE
+                session._handshakeStarted = time.perf_counter()
+                self._handshake(session)
+            else:
+                self._connected(session)
+        elif session._state == _HANDSHAKE:
+            self._handshake(session)
+        elif session._state == _CONNECTED:
+            if mask & selectors.EVENT_READ:
+                self._read(session)
+            if mask & selectors.EVENT_WRITE and session._state == _CONNECTED:
+                self._flush(session)
+        elif session._state == _CLOSING:
+            self._flush(session)
+
+    def _handshake(self, session: ManagedIRCSDK) -> None:
+        try:
+            session.irc.do_handshake()
+        except ssl.SSLWantReadError:
+            self.selector.modify(session.irc, selectors.EVENT_READ, session)
+        except ssl.SSLWantWriteError:
+            self.selector.modify(session.irc, selectors.EVENT_WRITE, session)
+        except OSError as e:
+            self._connectFailed(session, e)
+        else:
+            session._tlsConnected(session.reconnectPolicy.server[0], session._handshakeStarted)
+            self._connected(session)
+
+    def _connected(self, session: ManagedIRCSDK) -> None:
+        session._timer.cancel()
+        session._timer = None
+        session._state = _CONNECTED
+        self.selector.modify(session.irc, selectors.EVENT_READ, session)
+        session.log.info('Connected to host %s:%s', *session.reconnectPolicy.server)
+        session._register()
+
+    def _read(self, session: ManagedIRCSDK) -> None:
+        sock = session.irc
+        while True:
+            try:
+                # drains the non-blocking socket, so the framer gets one batch per buffer
+                data = session._recvBuffer.fill(sock)
+            except (BlockingIOError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                return
+            except OSError as e:
+                session.log.warning('Connection error: %s', e)
+                self._disconnect(session)
+                return
+            if not data:
+                session.log.warning('Connection closed by the remote host.')
+                self._disconnect(session)
+                return
+            try:
+                session.event.emit('raw', data)
+            except Exception:
+                # Don't let one session's handler take down every other session
+                session.log.exception('Error handling received data')
+                self._disconnect(session)
+                return
+            if session._state != _CONNECTED:
+                return
+
+    def _flush(self, session: ManagedIRCSDK) -> None:
+        """Move sendable lines from the queue to the socket, waiting for writability or tokens as needed"""
+        if session.irc is None:
+            return
+        if session._writer is not None:
+            now = time.monotonic()
+            while True:
+                data, delay = session.sendQueue.pop(now)
+                if data is None:
+                    break
+                session._outbuf += data
+            if delay and session._timer is None:
+                def refill():
+                    session._timer = None
+                    self._flush(session)
+                session._timer = self.callLater(delay, refill, session)
+
+        if session._outbuf and session._state in (_CONNECTED, _CLOSING):
+            try:
+                sent = session.irc.send(session._outbuf)
+                del session._outbuf[:sent]
+            except (BlockingIOError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                pass
+            except OSError:
+                if session._state != _CLOSING:
+                    return  # the read side sees the broken connection
+                session._outbuf.clear()
+            if session._state == _CLOSING:
+                if not session._outbuf:
+                    self._closed(session)
+                return
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if session._outbuf else 0)
+            self.selector.modify(session.irc, events, session)
+
+    def _checkIdle(self, now: float) -> None:
+        for session in self.sessions:
+            if session._state == _CONNECTED and not session._keepalive(now)[0]:
+                self._disconnect(session)
+
+    def _close(self, session: ManagedIRCSDK) -> None:
+        if session._timer is not None:
+            session._timer.cancel()
+            session._timer = None
+        if session._resolving is not None:
+            session._resolving.cancel()
+            session._resolving = None
+        session._addresses.clear()
+        self._dropSocket(session)
+
+    def _dropSocket(self, session: ManagedIRCSDK) -> None:
+        if session.irc is not None:
+            try:
+                self.selector.unregister(session.irc)
+            except (KeyError, ValueError):
+                pass
+            session.irc.close()
+            session.irc = None
+
+    def _disconnect(self, session: ManagedIRCSDK) -> None:
+        if session._state == _CLOSING:
+            return
+        if session._outbuf and session.irc is not None and session._state == _CONNECTED:
+            # Get QUIT and other pending lines out as the socket takes them, closing when done or at the deadline
+            session._state = _CLOSING
+            session._stopWriter()
+            if session._timer is not None:
+                session._timer.cancel()
+            session._timer = self.callLater(CLOSE_TIMEOUT, lambda: self._closed(session), session)
+            self.selector.modify(session.irc, selectors.EVENT_WRITE, session)
+            self._flush(session)
+            return
+        self._closed(session)
+
+    def _closed(self, session: ManagedIRCSDK) -> None:
+        session._outbuf.clear()
+        session._stopWriter()
+        self._close(session)
+        self._retry(session, session._handle_disconnect())
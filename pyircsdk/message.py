@@ -1,14 +1,179 @@
+from .tags import parseTags
+
+_UNSET = object()  # a derived field that hasn't been computed yet (None is a valid value)
+
 
 class Message:
-    def __init__(self, data, prefix, command, params, trailing, messageFrom, messageTo, message):
+    """One IRC line.
+
+    parse() only slices out the command and records where the prefix,
+    params and trailing parameter are in the raw line. Every other field is
+    derived on first access and cached, so a handler that only looks at
+    ``command`` costs almost nothing.
+    """
+
+    __slots__ = ('data', 'command', 'rawTags', '_tags', '_prefixStart', '_prefixEnd', '_paramsStart', '_colon',
+                 '_prefix', '_params', '_trailing', '_messageFrom', '_messageTo', '_message', '_source')
+
+    def __init__(self, data, prefix, command, params, trailing, messageFrom, messageTo, message, rawTags=None):
         self.data = data
-        self.prefix = prefix
-        self.messageFrom = messageFrom
-        self.messageTo = messageTo
         self.command = command
-        self.message = message
-        self.params = params
-        self.trailing = trailing
+        self.rawTags = rawTags  # Unparsed IRCv3 tags (without the leading '@'), or None
+        self._tags = None
+        self._prefix = prefix
+        self._params = params
+        self._trailing = trailing
+        self._messageFrom = messageFrom
+        self._messageTo = messageTo
+        self._message = message
+        self._source = _UNSET
+
+    @classmethod
+    def fromLine(cls, data: str, rawTags, prefixStart: int, prefixEnd: int, command: str, paramsStart: int, colon: int):
+        """Message of a raw line, given the offsets found by parse().
+
+        The prefix is data[prefixStart:prefixEnd] (none when prefixEnd < 1),
+        the middle params are data[paramsStart:colon] and the trailing param
+        follows ' :' at colon (none when colon is -1).
+        """
+        message = cls.__new__(cls)
+        message.data = data
+        message.command = command
+        message.rawTags = rawTags
+        message._tags = None
+        message._prefixStart = prefixStart
+        message._prefixEnd = prefixEnd
+        message._paramsStart = paramsStart
+        message._colon = colon
+        message._prefix = message._params = message._trailing = _UNSET
+        message._messageFrom = message._messageTo = message._message = message._source = _UNSET
+        return message
+
+    @property
+    def prefix(self):
+        """'nick!user@host' or a server name, or None"""
+        prefix = self._prefix
+        if prefix is _UNSET:
+            prefix = self._prefix = self.data[self._prefixStart:self._prefixEnd] if self._prefixEnd > 0 else None
+        return prefix
+
+    @prefix.setter
+    def prefix(self, value):
+        self._prefix = value
+        self._messageFrom = self._source = _UNSET
+
+    @property
+    def params(self) -> list:
+        """Middle parameters, without the trailing one"""
+        params = self._params
+        if params is _UNSET:
+            end = self._colon if self._colon != -1 else len(self.data)
+            params = self._params = self.data[self._paramsStart:end].split()
+        return params
+
+    @params.setter
+    def params(self, value):
+        self._params = value
+        self._messageTo = self._message = _UNSET
+
+    @property
+    def allParams(self) -> list:
+        """Middle parameters followed by the trailing one, if any"""
+        trailing = self.trailing
+        return self.params if trailing is None else self.params + [trailing]
+
+    @property
+    def trailing(self):
+        """The parameter after ' :', or None"""
+        trailing = self._trailing
+        if trailing is _UNSET:
+            trailing = self._trailing = self.data[self._colon + 2:] if self._colon != -1 else None
+        return trailing
+
+    @trailing.setter
+    def trailing(self, value):
+        self._trailing = value
+        self._message = _UNSET
+
+    @property
+    def messageFrom(self):
+        """Prefix up to the first '!', usually the sender's nick"""
+        messageFrom = self._messageFrom
+        if messageFrom is _UNSET:
+            prefix = self.prefix
+            messageFrom = self._messageFrom = prefix.split('!')[0] if prefix else None
+        return messageFrom
+
+    @messageFrom.setter
+    def messageFrom(self, value):
+        self._messageFrom = value
+
+    @property
+    def messageTo(self):
+        """First param, e.g. the channel or nick a PRIVMSG was sent to"""
+        messageTo = self._messageTo
+        if messageTo is _UNSET:
+            params = self.params
+            messageTo = self._messageTo = params[0] if params else None
+        return messageTo
+
+    @messageTo.setter
+    def messageTo(self, value):
+        self._messageTo = value
+
+    @property
+    def message(self):
+        """Everything after the target, e.g. the text of a PRIVMSG or a numeric"""
+        message = self._message
+        if message is _UNSET:
+            params = self.params
+            trailing = self.trailing
+            if len(params) > 1:
+                message = ' '.join(params[1:] if trailing is None else params[1:] + [trailing])
+            else:
+                message = trailing if params else None
+            self._message = message
+        return message
+
+    @message.setter
+    def message(self, value):
+        self._message = value
+
+    @property
+    def nick(self):
+        return self._splitSource()[0]
+
+    @property
+    def user(self):
+        return self._splitSource()[1]
+
+    @property
+    def host(self):
+        return self._splitSource()[2]
+
+    def _splitSource(self) -> tuple:
+        """(nick, user, host) of a 'nick[!user][@host]' prefix, None for the missing parts"""
+        if self._source is _UNSET:
+            prefix = self.prefix
+            if not prefix:
+                self._source = (None, None, None)
+            else:
+                rest, at, host = prefix.partition('@')
+                nick, bang, user = rest.partition('!')
+                self._source = (nick, user if bang else None, host if at else None)
+        return self._source
+
+    @property
+    def tags(self) -> dict:
+        """IRCv3 message tags, parsed and unescaped on first access"""
+        if self._tags is None:
+            self._tags = parseTags(self.rawTags) if self.rawTags else {}
+        return self._tags
+
+    def __reduce__(self):
+        # Derive every field, so a copy or a pickle sent to a worker process doesn't carry the sentinel
+        return (Message, (self.data, self.prefix, self.command, self.params, self.trailing, self.messageFrom,
+                          self.messageTo, self.message, self.rawTags))
 
     def __str__(self):
         return f'Message: {self.data}, Prefix: {self.prefix}, Message From: {self.messageFrom}, Message To: {self.messageTo}, Command: {self.command}, Params: {self.params}, Trailing: {self.trailing}'
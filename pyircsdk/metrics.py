@@ -0,0 +1,156 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; fine enough for per-line parse times, coarse enough for handshakes
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+HELP = {
+    'bytes_received_total': 'Bytes read from the server',
+    'lines_received_total': 'Lines read from the server',
+    'bytes_sent_total': 'Bytes handed to the connection',
+    'lines_sent_total': 'Lines handed to the connection',
+    'reconnects_total': 'Reconnects after a lost connection',
+    'parse_seconds': 'Time to parse one line',
+    'emit_seconds': 'Time for Event.emit to run all listeners of an event',
+    'listener_seconds': 'Time spent in one event listener',
+    'handler_seconds': 'Time spent in a module handler',
+    'motd_seconds': 'Time from starting to connect to the end of the MOTD',
+    'tls_handshake_seconds': 'Time for the TLS handshake of a connection',
+    'tls_resumed_total': 'TLS handshakes that resumed an earlier session',
+    'send_queue_depth': 'Lines waiting in the send queue',
+    'send_queue_wait_seconds_max': 'Longest time a line waited in the send queue',
+}
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        return {'buckets': dict(zip(self.buckets + (float('inf'),), self.counts)), 'sum': self.sum,
+                'count': self.count}
+
+
+class Metrics:
+    """Counters, histograms and gauges for one connection.
+
+    Instrumented code checks ``enabled`` (or is swapped in only when enabled),
+    so a disabled Metrics costs next to nothing. Labels are passed as a tuple
+    of (name, value) pairs.
+    """
+
+    def __init__(self, enabled: bool = False, prefix: str = 'pyircsdk_') -> None:
+        self.enabled = enabled
+        self.prefix = prefix
+        self.counters = {}  # (name, labels) -> number
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.gauges = {}  # name -> callable returning the current value
+        self._lock = threading.Lock()
+        self._server = None
+
+    def inc(self, name: str, value=1, labels: tuple = ()) -> None:
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: tuple = ()) -> None:
+        key = (name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def gauge(self, name: str, read) -> None:
+        self.gauges[name] = read
+
+    def snapshot(self) -> dict:
+        """Current values, e.g. {'counters': {'lines_received_total': 10, ...}, ...}"""
+        with self._lock:
+            return {
+                'counters': {_key(name, labels): value for (name, labels), value in self.counters.items()},
+                'histograms': {_key(name, labels): h.snapshot() for (name, labels), h in self.histograms.items()},
+                'gauges': {name: read() for name, read in self.gauges.items()},
+            }
+
+    def exposition(self) -> str:
+        """Render in the Prometheus text exposition format"""
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                lines.append('# HELP %s%s %s' % (self.prefix, name, HELP.get(name, name)))
+                lines.append('# TYPE %s%s %s' % (self.prefix, name, kind))
+
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                header(name, 'counter')
+                lines.append('%s%s%s %s' % (self.prefix, name, _labels(labels), value))
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                header(name, 'histogram')
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('%s%s_bucket%s %d' % (self.prefix, name, _labels(labels + (('le', le),)),
+                                                       cumulative))
+                lines.append('%s%s_sum%s %r' % (self.prefix, name, _labels(labels), histogram.sum))
+                lines.append('%s%s_count%s %d' % (self.prefix, name, _labels(labels), histogram.count))
+        for name, read in sorted(self.gauges.items()):
+            header(name, 'gauge')
+            lines.append('%s%s %s' % (self.prefix, name, read()))
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Serve exposition() over HTTP on a daemon thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.exposition().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='pyircsdk-metrics', daemon=True).start()
+        return self._server
+
+    def stopServing(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, _escape(value)) for name, value in labels)
+
+
+def _key(name: str, labels: tuple) -> str:
+    return name + _labels(labels)
@@ -0,0 +1,46 @@
+# Pre-encoded pieces of outgoing lines, so a line is one join of buffers
+CRLF = b'\r\n'
+SPACE = b' '
+TRAILING = b' :'
+PRIVMSG = b'PRIVMSG'
+NOTICE = b'NOTICE'
+JOIN = b'JOIN'
+NICK = b'NICK'
+USER = b'USER'
+PASS = b'PASS'
+PONG = b'PONG'
+QUIT = b'QUIT'
+
+
+def encode(value) -> bytes:
+    """UTF-8 bytes of a str; bytes and bytearrays are returned as they are"""
+    return value.encode('utf-8') if isinstance(value, str) else value
+
+
+def hasLineBreak(data) -> bool:
+    """True if data holds CR, LF or NUL, which would end an IRC line early"""
+    # Searching for an int is a plain memchr, much cheaper than a bytes needle or a regex
+    return 10 in data or 13 in data or 0 in data
+
+
+def checkLine(line: bytes) -> bytes:
+    """Return line if its only CR and LF are the terminating CRLF, else raise ValueError"""
+    if line.count(10) != 1 or line.count(13) != 1 or 0 in line or not line.endswith(CRLF):
+        raise ValueError('CR, LF and NUL are not allowed inside an IRC line: %r' % line)
+    return line
+
+
+def buildLine(command, *params, trailing=None) -> bytes:
+    """One CRLF-terminated line: command, space separated params and an optional trailing param.
+
+    Arguments may be str (UTF-8 encoded here) or already encoded bytes. The
+    assembled line is checked for CR, LF and NUL once, so no argument can
+    smuggle in a second command.
+    """
+    parts = [encode(command)]
+    for param in params:
+        parts += (SPACE, encode(param))
+    if trailing is not None:
+        parts += (TRAILING, encode(trailing))
+    parts.append(CRLF)
+    return checkLine(b''.join(parts))
@@ -0,0 +1,77 @@
+import os
+import re
+import warnings
+
+from .message import Message
+
+# Tags, prefix and command of a line written the usual way: single spaces, no empty tags
+_HEAD = re.compile(r'(?:@([^ ]+) )?(?::([^ ]+) )?([^ :@][^ ]*)')
+
+
+def parsePython(data: str):
+    """Parse one IRC line into a Message.
+
+    Follows the IRCv3 grammar: ['@' tags ' '] [':' prefix ' '] command
+    *(' ' middle) [' :' trailing]. Only the command is sliced out here; tags,
+    prefix, params and the fields derived from them are computed when a
+    handler first reads them.
+    """
+    rawTags = None
+    start = 0
+    first = data[:1]
+    if first == '@':
+        start = data.find(' ') + 1
+        if not start:
+            return Message(data, None, '', [], None, None, None, None, data[1:])
+        rawTags = data[1:start - 1]
+        first = data[start:start + 1]
+
+    # ' :' can only start the trailing parameter: tags and prefix contain no spaces
+    colon = data.find(' :', start)
+    end = colon if colon != -1 else len(data)
+
+    prefixStart = prefixEnd = 0
+    if first == ':':
+        space = data.find(' ', start, end)
+        if space != -1:
+            commandStart = space + 1
+            while commandStart < end and data[commandStart] == ' ':
+                commandStart += 1
+            if commandStart < end:  # a lone ':word' is the command, not a prefix
+                prefixStart, prefixEnd = start + 1, space
+                start = commandStart
+    elif first == ' ':
+        while data.startswith(' ', start):
+            start += 1
+    commandEnd = data.find(' ', start, end)
+    if commandEnd == -1:
+        commandEnd = end
+
+    return Message.fromLine(data, rawTags, prefixStart, prefixEnd, data[start:commandEnd], commandEnd, colon)
+
+
+def parseRegex(data: str):
+    """parsePython() with the tags, prefix and command found by one C-level regex match.
+
+    Lines the pattern doesn't cover (runs of spaces, a lone ':word', empty
+    tags) go to parsePython, so both backends give the same Message.
+    """
+    match = _HEAD.match(data)
+    if match is None:
+        return parsePython(data)
+    commandEnd = match.end()
+    return Message.fromLine(data, match.group(1), match.start(2), match.end(2), match.group(3), commandEnd,
+                            data.find(' :', commandEnd))
+
+
+# Line parsers by name, selected with the PYIRCSDK_PARSER environment variable when pyircsdk is imported
+BACKENDS = {
+    'python': parsePython,
+    're': parseRegex,
+}
+BACKEND = os.environ.get('PYIRCSDK_PARSER') or 'python'
+if BACKEND not in BACKENDS:
+    warnings.warn('PYIRCSDK_PARSER must be one of %s, not %r; using python' % (', '.join(BACKENDS), BACKEND),
+                  RuntimeWarning)
+    BACKEND = 'python'
+parse = BACKENDS[BACKEND]
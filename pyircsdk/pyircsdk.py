@@ -1,12 +1,41 @@
+import logging
 import select
 import socket
 import ssl
 import threading
 import time
-from dataclasses import dataclass
+import warnings
+from dataclasses import dataclass, replace
 
+from .caps import CapNegotiator
 from .event.event import Event
+from .framer import MAX_LINE_LENGTH, LineFramer, RecvBuffer, readable
+from .isupport import ISupport
+from .keepalive import Keepalive
+from .log import ConnectionLogger
 from .message import Message
+from .metrics import Metrics
+from .outbound import (CRLF, JOIN, NICK, PASS, PONG, PRIVMSG, QUIT, SPACE, TRAILING, USER, buildLine, checkLine,
+                       encode, hasLineBreak)
+from .parser import parse
+from .reconnect import ReconnectPolicy
+from .router import Router
+from .state import StateTracker
+from .text import splitText
+from .tls import clientContext, sharedContext
+from .writer import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, SendQueue, Writer, linePriority
+
+# Numerics of the welcome burst; the first line after them means registration is complete
+_WELCOME_BURST = ('001', '002', '003', '004', '005')
+
+# JOIN error numerics, logged and emitted as 'join_error'
+_JOIN_ERRORS = {
+    '471': 'Channel is full (+l)',
+    '473': 'Channel is invite-only (+i)',
+    '474': 'You are banned from this channel (+b)',
+    '475': 'Bad channel key (+k)',
+    '477': 'You need to register with services first',
+}
 
 @dataclass
 class IRCSDKConfig:
@@ -23,11 +52,36 @@ class IRCSDKConfig:
     nickservPassword: str
     nickservWait: bool  # Wait for NickServ confirmation before joining channels
     nickservTimeout: int  # Seconds to wait for NickServ before joining anyway (default: 10)
-    nodataTimeout: int
+    nodataTimeout: int  # Superseded by pingInterval/pingTimeout; when set alone, split evenly between them
+    pingInterval: float  # Seconds without incoming data before we PING the server, 0 to disable (default: 60)
+    pingTimeout: float  # Seconds to wait for any reply to that PING before dropping the connection (default: 30)
     connectionTimeout: int
     allowAnySSL: bool
+    sslCertfile: str  # Client certificate (PEM, may include the key) for CertFP or SASL EXTERNAL
+    sslKeyfile: str  # Key of sslCertfile when kept in a separate file
+    sslShareContext: bool  # Use one SSLContext, and TLS session cache, per process for these settings
     autoReconnect: bool  # Automatically reconnect on disconnect
-    reconnectDelay: int  # Seconds to wait before reconnecting
+    reconnectDelay: float  # Base of the jittered exponential reconnect backoff in seconds (default: 5)
+    reconnectMaxDelay: float  # Cap of the reconnect backoff in seconds (default: 300)
+    connectRetries: int  # Failed attempts in a row before giving up, 0 for no limit (default: 5)
+    servers: list  # 'host:port' entries (or (host, port) pairs) to rotate through instead of host/port
+    encoding: str  # Encoding of received lines (default: utf-8)
+    encodingFallback: str  # Codec or error handler for lines that fail to decode (default: latin-1)
+    maxLineLength: int  # Received lines longer than this many bytes are dropped (default: 8703)
+    sendRate: float  # Outgoing lines per second once the burst is used up, e.g. 2 (default: 0, unpaced)
+    sendBurst: int  # Lines that may be sent back to back when sendRate is set (default: 5)
+    metrics: bool  # Collect counters and histograms, see IRCSDK.getMetrics (default: False)
+    metricsPort: int  # Serve Prometheus text metrics on 127.0.0.1:metricsPort while connected
+    logLevel: int  # Level of this connection's logger, pyircsdk.<host> (default: inherited)
+    trackState: bool  # Keep channel membership in IRCSDK.state (default: False)
+    listenerMaxFailures: int  # Failures within listenerFailureWindow that switch a listener off, 0 never (default: 5)
+    listenerFailureWindow: float  # Seconds failures are counted over (default: 60)
+    listenerCooldown: float  # Seconds a switched off listener stays off (default: 30)
+    listenerBudget: float  # Seconds a listener call may take before it counts as a failure (default: no limit)
+    caps: list  # IRCv3 capabilities to request when offered (default: caps.DEFAULT_CAPS, [] for none)
+    saslMechanism: str  # 'PLAIN' (default when a password is set) or 'EXTERNAL' (client certificate)
+    saslUsername: str  # SASL account name (default: nick)
+    saslPassword: str  # SASL PLAIN password; NickServ identification is skipped when SASL succeeds
 
     def __init__(self,  **kwargs):
         for k in self.__dataclass_fields__:
@@ -46,152 +100,387 @@ class IRCSDKConfig:
 
 
 class IRCSDK:
+    eventClass = Event
+
     def __init__(self, config: IRCSDKConfig = None) -> None:
-        self.event: Event = Event()
-        self._recv_buffer = ''
+        self.event: Event = self.eventClass()
+        self.router: Router = Router(self)
+        self._framer = LineFramer()
+        self._recvBuffer = RecvBuffer()
+        self._targets = {}  # target as passed -> its validated UTF-8 bytes
+        self._room = (None, 0)  # (LINELEN, verb length) -> _textRoom()
+        self.sendQueue = SendQueue()
+        self._writer = None
         self._pending_channels = []  # Channels waiting to join after NickServ
         self._nickserv_identified = False
         self._nickserv_timer = None
+        self._connectStarted = None
+        self._closing = False
+        self._recvThread = None  # ident of the thread in startRecv
+        self.reconnectPolicy = None
+        self.isupport = ISupport()
+        self.state = None
+        self.caps = CapNegotiator(self)
+        self.keepalive = Keepalive(config)
+        self._welcome = False
+        self._autoJoined = False
+        self._tlsHost = None  # server whose TLS session is kept after the first read
+        self.metrics = Metrics()
+        self.log = ConnectionLogger()
+        self.event.log = self.log
         if config:
             self.config = config
+            self.reconnectPolicy = ReconnectPolicy(config)
+            self.log = self.event.log = ConnectionLogger(config.host, config.logLevel)
+            self.event.setBreaker(config.listenerMaxFailures, config.listenerFailureWindow, config.listenerCooldown,
+                                  config.listenerBudget)
+            self._framer = LineFramer(config.encoding, config.encodingFallback, config.maxLineLength)
+            self.sendQueue = SendQueue(config.sendRate, config.sendBurst)
+            if config.metrics or config.metricsPort:
+                self.enableMetrics()
+            if config.trackState:
+                self.state = StateTracker(self)
             if self.config.ssl:
-                self.sslContext = ssl.create_default_context()
-                if self.config.allowAnySSL:
-                    self.sslContext.check_hostname = False
-                    self.sslContext.verify_mode = ssl.CERT_NONE
+                # Resumes the last TLS session of a server on reconnect
+                makeContext = sharedContext if self.config.sslShareContext else clientContext
+                self.sslContext = makeContext(bool(self.config.allowAnySSL), self.config.sslCertfile,
+                                              self.config.sslKeyfile)
+
+    def privmsg(self, receiver, msg) -> None:
+        """Send msg (str, or UTF-8 bytes sent as they are) to receiver"""
+        # Fast path: one join of pre-encoded pieces when the text fits a single line
+        target = self._targets.get(receiver) or self._target(receiver)
+        body = msg.encode('utf-8') if isinstance(msg, str) else msg
+        if len(body) + len(target) <= self._textRoom() and not (10 in body or 13 in body or 0 in body):
+            self._send(b''.join((PRIVMSG, SPACE, target, TRAILING, body, CRLF)), PRIORITY_LOW)
+            return
+        self._sendText(PRIVMSG, (receiver,), msg)
 
-    def privmsg(self, receiver: str, msg: str) -> None:
-        command = "PRIVMSG %s :%s\r\n" % (receiver, msg)
-        self.irc.send(command.encode('utf-8'))
+    def privmsg_many(self, targets: list, text) -> None:
+        """Send text to every target, packing targets per TARGMAX/MAXTARGETS and splitting long or multi-line text"""
+        self._sendText(PRIVMSG, targets, text)
 
-    def sendRaw(self, msg: str) -> None:
-        self.irc.send(msg.encode('utf-8'))
+    def _sendText(self, verb: bytes, targets, text) -> None:
+        if not targets:
+            return
+        encoded = [self._target(target) for target in targets]
+        body = encode(text)
+        room = self._textRoom(len(verb)) - max(map(len, encoded))
+        if len(encoded) == 1 and len(body) <= room and not hasLineBreak(body):
+            self._send(b''.join((verb, SPACE, encoded[0], TRAILING, body, CRLF)), PRIORITY_LOW)
+            return
+        if not isinstance(text, str):
+            text = bytes(body).decode('utf-8', 'replace')
+        command = verb.decode('ascii')
+        names = [target.decode('utf-8') for target in encoded]
+        # splitText took out CR and LF, but a NUL would still end a line; check them all before sending any
+        lines = [checkLine(line.encode('utf-8')) for chunk in splitText(text, room)
+                 for line in self.isupport.packTargets(command, names, chunk)]
+        for line in lines:
+            self._send(line, PRIORITY_LOW)
+
+    def _target(self, target) -> bytes:
+        """UTF-8 bytes of a message target, checked once per distinct target"""
+        data = self._targets.get(target)
+        if data is None:
+            data = encode(target)
+            if not data or hasLineBreak(data) or 32 in data:
+                raise ValueError('Invalid message target %r' % (target,))
+            if len(self._targets) >= 1024:
+                self._targets.clear()
+            self._targets[target] = data
+        return data
+
+    def _textRoom(self, verbLength: int = 7) -> int:
+        """Bytes left for target and text of a verbLength verb once the server relays it"""
+        # The server sends ':nick!user@host VERB target :text\r\n', which must fit LINELEN
+        key = (self.isupport.linelen, verbLength)
+        if self._room[0] != key:
+            self._room = (key, key[0] - self._prefixLength() - verbLength - 5)
+        return self._room[1]
+
+    def _prefixLength(self) -> int:
+        """Room the server needs for ':nick!~user@host ' when relaying our lines"""
+        config = getattr(self, 'config', None)
+        nick = config.nick if config and config.nick else ''
+        user = config.user if config and config.user else ''
+        return len(nick) + len(user) + 68  # ':', '!', '~', '@', ' ' and a 63 byte host
+
+    def sendRaw(self, msg) -> None:
+        """Send msg as it is, CRLF included; str is UTF-8 encoded, bytes are not copied"""
+        self._send(encode(msg))
+
+    def sendCommand(self, command, *params, trailing=None, priority: int = None) -> None:
+        """Send one command built from str or already encoded bytes arguments, see outbound.buildLine"""
+        self._send(buildLine(command, *params, trailing=trailing), priority)
 
     def close(self) -> None:
-        message = "QUIT :%s\r\n" % self.config.nick
-        self.irc.send(message.encode('utf-8'))
-        self.irc.close()
+        # QUIT jumps the queue; anything still waiting is dropped
+        self._closing = True
+        self._stopWriter()
+        self._sendNow(buildLine(QUIT, trailing=self.config.nick))
+        if self._recvThread is not None and self._recvThread != threading.get_ident():
+            # Wake startRecv from select() at once; it closes the socket itself on the way out
+            try:
+                self.irc.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        else:
+            self.irc.close()
 
     def sendPassword(self, password: str) -> None:
-        message = f"PASS {password}\r\n"
-        self.irc.send(message.encode('utf-8'))
+        self._send(buildLine(PASS, password))
+
+    def enableMetrics(self) -> None:
+        self.metrics.enabled = True
+        self.event.enableMetrics(self.metrics)
+        self.metrics.gauge('send_queue_depth', lambda: self.sendQueue.depth)
+        self.metrics.gauge('send_queue_wait_seconds_max', lambda: self.sendQueue.waitMax)
+
+    def getMetrics(self) -> dict:
+        """Snapshot of this connection's counters, histograms and gauges"""
+        return self.metrics.snapshot()
+
+    def _send(self, data: bytes, priority: int = None) -> None:
+        """Queue encoded bytes for the writer, or write them directly when it isn't running"""
+        if self.metrics.enabled:
+            self.metrics.inc('lines_sent_total')
+            self.metrics.inc('bytes_sent_total', len(data))
+        if self._writer is None:
+            self._sendNow(data)
+            return
+        self._writer.put(data, linePriority(data) if priority is None else priority)
+
+    def _sendNow(self, data: bytes) -> None:
+        """Write encoded bytes to the connection (overridden by transports)"""
+        self.irc.sendall(data)
+
+    def _startWriter(self) -> None:
+        self.sendQueue.clear()
+        self._writer = Writer(self.irc, self.sendQueue)
+        self._writer.start()
+
+    def _stopWriter(self) -> None:
+        if self._writer is not None:
+            self._writer.stop()
+            self._writer = None
+
+    def _schedule(self, delay: float, callback):
+        """Run callback after delay seconds, returning a handle with cancel()"""
+        timer = threading.Timer(delay, callback)
+        timer.daemon = True
+        timer.start()
+        return timer
 
     def connect(self, config: IRCSDKConfig = None) -> None:
+        """Connect and serve, reconnecting as reconnectPolicy allows.
+
+        Returns once close() is called, the connection drops without
+        autoReconnect, or the retries run out; it never exits the process.
+        """
         if not config:
             config = self.config
 
         if not self.config:
             raise ValueError('No config passed to connect')
 
-        print(config)
-        self.try_connect(5, 5)
+        self.log.info('Connecting: %s', config)
+        if self.config.metricsPort and self.metrics._server is None:
+            self.metrics.serve(self.config.metricsPort)
+
+        self._closing = False
+        while True:
+            host, port = self.reconnectPolicy.server
+            if self._open(host, port):
+                self.startRecv()
+                delay = self._handle_disconnect()
+            else:
+                delay = self._handle_connect_failed()
+            if delay is None:
+                return
+            time.sleep(delay)
+
+    def try_connect(self, retries: int, wait_secs: float) -> None:
+        """Deprecated: connect() with up to retries attempts, wait_secs apart and without jitter"""
+        policy = self._legacyPolicy(retries, wait_secs)
+        try:
+            self.connect()
+        finally:
+            self.reconnectPolicy = policy
+
+    def _legacyPolicy(self, retries: int, wait_secs: float) -> ReconnectPolicy:
+        """Warn about try_connect and switch to its fixed policy, returning the one to restore"""
+        warnings.warn('try_connect() is deprecated, use connect() with connectRetries and reconnectDelay',
+                      DeprecationWarning, stacklevel=3)
+        policy = self.reconnectPolicy
+        config = replace(self.config, connectRetries=retries, reconnectDelay=wait_secs, reconnectMaxDelay=wait_secs)
+        self.reconnectPolicy = ReconnectPolicy(config, rand=lambda: 1.0)
+        return policy
 
     def _setup_listeners(self) -> None:
         """Set up event listeners (only called once per connection)"""
         self.event.remove_all('raw')
         self.event.remove_all('connected')
 
-        self.event.on('raw', self.handle_raw_message)
+        self.event.on('raw', self.handle_raw_message, breaker=False)
 
         def on_connected(data):
-            self.nickServIdentify(self.config.nickservFormat, self.config.nickservPassword)
+            if self._autoJoined:
+                return  # joined at registration, identified by SASL if at all
 
-            # Determine channels to join
-            channels_to_join = []
-            if self.config.channels:
-                channels_to_join = self.config.channels
-            elif self.config.channel:
-                channels_to_join = [self.config.channel]
+            self.nickServIdentify(self.config.nickservFormat, self.config.nickservPassword)
+            channels_to_join = self._autoJoinChannels()
 
             # If nickservWait is enabled and we have a NickServ password, defer joining
             if self.config.nickservWait and self.config.nickservPassword:
                 self._pending_channels = channels_to_join
                 timeout = self.config.nickservTimeout or 10
-                print(f"Waiting for NickServ identification before joining channels (timeout: {timeout}s)...")
+                self.log.info('Waiting for NickServ identification before joining channels (timeout: %ss)', timeout)
 
                 # Start timeout timer to join anyway if NickServ doesn't respond
                 def nickserv_timeout():
                     if self._pending_channels and not self._nickserv_identified:
-                        print(f"NickServ timeout after {timeout}s - joining channels anyway")
+                        self.log.warning('NickServ timeout after %ss - joining channels anyway', timeout)
                         self.event.emit('nickserv_timeout', timeout)
                         self._join_channels(self._pending_channels)
                         self._pending_channels = []
 
-                self._nickserv_timer = threading.Timer(timeout, nickserv_timeout)
-                self._nickserv_timer.daemon = True
-                self._nickserv_timer.start()
+                self._nickserv_timer = self._schedule(timeout, nickserv_timeout)
             else:
                 self._join_channels(channels_to_join)
 
-        self.event.on('connected', on_connected)
+        self.event.on('connected', on_connected, breaker=False)
 
     def _join_channels(self, channels: list) -> None:
-        """Join a list of channels with delay between joins"""
-        for i, channel in enumerate(channels):
-            if i > 0:
-                time.sleep(0.5)  # Delay between joins to prevent flood protection
-            self.join(channel)
-
-    def try_connect(self, retries, wait_secs):
-        for attempt in range(retries):
-            self.irc = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.join_many(channels)
+
+    def _autoJoinChannels(self) -> list:
+        if self.config.channels:
+            return self.config.channels
+        if self.config.channel:
+            return [self.config.channel]
+        return []
+
+    def _handle_registered(self) -> None:
+        """The welcome burst is over: join right away unless NickServ has to identify us first"""
+        self.event.emit('registered', self.caps)
+        config = getattr(self, 'config', None)
+        if config is not None and (self.caps.account or not config.nickservPassword):
+            self._autoJoined = True
+            self._join_channels(self._autoJoinChannels())
+
+    def _open(self, host: str, port: int) -> bool:
+        """Connect to host:port and register, returning False if the connection could not be made"""
+        if self._connectStarted is None:
+            self._connectStarted = time.monotonic()
+        attempt = self.reconnectPolicy.failures + 1
+        self.event.emit('connecting', {'host': host, 'port': port, 'attempt': attempt})
+        self.log.info('Connecting to %s:%s (attempt %d)', host, port, attempt)
+
+        sock = None
+        try:
+            # create_connection tries each address getaddrinfo returns, IPv6 included
+            sock = socket.create_connection((host, port), self.config.connectionTimeout or 10)
             if self.config.ssl:
-                self.irc = self.sslContext.wrap_socket(self.irc, server_hostname=self.config.host)
-            self.irc.settimeout(self.config.connectionTimeout or 10)
-
-            try:
-                print(f"Attempt {attempt + 1} of {retries}")
-                self.irc.connect((self.config.host, self.config.port))
-                print("Connection successful!")
-                self.irc.settimeout(None)
-
-                print('Connected to host %s:%s' % (self.config.host, self.config.port))
-
-                self._setup_listeners()
-                self._recv_buffer = ''
-
-                if self.config.password:
-                    self.sendPassword(self.config.password)
-
-                self.setUser(self.config.user, self.config.realname)
-                self.setNick(self.config.nick)
-
-                self.startRecv()
-                return
-            except socket.error as e:
-                print(f"Connection failed: {e}")
-                self.irc.close()
-                if attempt < retries - 1:
-                    print(f"Waiting for {wait_secs} seconds before retrying...")
-                    time.sleep(wait_secs)
-
-        print("Maximum retry attempts reached, connection failed.")
-        exit(1)
+                started = time.perf_counter()
+                sock = self.sslContext.wrap_socket(sock, server_hostname=host)
+                self.irc = sock
+                self._tlsConnected(host, started)
+        except OSError as e:
+            self.log.warning('Connection failed: %s', e)
+            if sock is not None:
+                sock.close()
+            return False
+        self.irc = sock
+        self.irc.settimeout(None)
+
+        self.log.info('Connected to host %s:%s', host, port)
+        self._register()
+        return True
+
+    def _sslObject(self):
+        """SSLSocket or SSLObject of the connection, None without TLS"""
+        return self.irc if isinstance(self.irc, ssl.SSLSocket) else None
+
+    def _tlsConnected(self, host: str, started: float) -> None:
+        """Record a finished TLS handshake that began at perf_counter() started"""
+        elapsed = time.perf_counter() - started
+        resumed = self._sslObject().session_reused
+        if self.metrics.enabled:
+            self.metrics.observe('tls_handshake_seconds', elapsed)
+            if resumed:
+                self.metrics.inc('tls_resumed_total')
+        self.log.debug('TLS handshake with %s took %.1f ms%s', host, elapsed * 1000, ' (resumed)' if resumed else '')
+        self._tlsHost = host
+
+    def _rememberTLSSession(self) -> None:
+        # By the first read the server has sent its TLS 1.3 session tickets
+        sslobj = self._sslObject()
+        if sslobj is not None:
+            self.sslContext.remember(self._tlsHost, sslobj)
+        self._tlsHost = None
+
+    def _register(self) -> None:
+        """Start a fresh session on a new connection and send PASS/USER/NICK"""
+        self._setup_listeners()
+        self._framer.reset()
+        self._recvBuffer.eof = False
+        self._room = (None, 0)  # the nick or user may have changed
+        self._startWriter()
+        self._welcome = False
+        self._autoJoined = False
+        self.keepalive.reset(time.monotonic())
+        self.caps.start()
+
+        if self.config.password:
+            self.sendPassword(self.config.password)
+
+        self.setUser(self.config.user, self.config.realname)
+        self.setNick(self.config.nick)
 
     def startRecv(self) -> None:
-        while True:
-            ready = select.select([self.irc], [], [], self.config.nodataTimeout or 120)
-            if ready[0]:
+        # A batch that fills the buffer can leave decrypted bytes in the SSL object, which select() can't see
+        sslobj = self._sslObject()
+        pending = sslobj.pending if sslobj is not None else None
+        self._recvThread = threading.get_ident()
+        while not self._closing:  # close() from a listener shuts the socket under us
+            alive, wait = self._keepalive(time.monotonic())
+            if not alive:
+                break
+            if self._recvBuffer.eof or (pending is not None and pending()) or \
+                    select.select([self.irc], [], [], wait)[0]:
                 try:
-                    data = self.irc.recv(4096)
+                    # everything already readable, so the framer gets one batch per wakeup
+                    data = self._recvBuffer.fill(self.irc, readable(self.irc))
                     if not data:
-                        print("Connection closed by the remote host.")
+                        if not self._closing:
+                            self.log.warning('Connection closed by the remote host.')
                         break
                     self.event.emit('raw', data)
 
                 except OSError as e:
-                    print(e)
-                    break
-            else:
-                if self.config.nodataTimeout and self.config.nodataTimeout > 0:
-                    print("No data received for %s seconds, quiting..." % str(self.config.nodataTimeout))
+                    self.log.warning('Connection error: %s', e)
                     break
 
+        self._recvThread = None
+        self._stopWriter()
         self.irc.close()
-        self._handle_disconnect()
 
-    def _handle_disconnect(self) -> None:
-        """Handle disconnection - either reconnect or exit"""
+    def _keepalive(self, now: float) -> tuple:
+        """Send a keepalive PING when one is due.
+
+        Returns (False, None) once the connection looks dead, else (True, seconds until the next look or None).
+        """
+        action, wait = self.keepalive.check(now)
+        if action == 'dead':
+            self.log.warning('No data received for %.0f seconds, quitting...', now - self.keepalive.lastReceived)
+            return False, None
+        if action == 'ping':
+            self._send(b'PING :%s\r\n' % self.keepalive.ping(now).encode(), PRIORITY_HIGH)
+        return True, wait
+
+    def _handle_disconnect(self):
+        """Reset session state after a lost connection, returning the wait before reconnecting or None to stop"""
         # Cancel any pending NickServ timer
         if self._nickserv_timer:
             self._nickserv_timer.cancel()
@@ -199,72 +488,163 @@ class IRCSDK:
 
         self.event.emit('disconnected', 'Connection lost')
 
-        if self.config.autoReconnect:
-            delay = self.config.reconnectDelay or 5
-            print(f"Auto-reconnect enabled. Reconnecting in {delay} seconds...")
-            time.sleep(delay)
-            # Reset state for reconnection
-            self._recv_buffer = ''
-            self._pending_channels = []
-            self._nickserv_identified = False
-            self.try_connect(5, 5)
-        else:
-            exit(1)
+        self._framer.reset()
+        self._pending_channels = []
+        self._nickserv_identified = False
+        self._welcome = False
+        self._autoJoined = False
+        self.caps.reset()
+        self.isupport.clear()  # the next server may advertise something else
+        delay = None if self._closing else self.reconnectPolicy.disconnected()
+        if delay is not None:
+            self.log.info('Auto-reconnect enabled. Reconnecting in %.2f seconds...', delay)
+            if self.metrics.enabled:
+                self.metrics.inc('reconnects_total')
+            self._emitReconnecting(delay)
+        return delay
+
+    def _handle_connect_failed(self):
+        """Return the wait before the next attempt, or give up with connect_failed and return None"""
+        delay = None if self._closing else self.reconnectPolicy.failed()
+        if delay is None:
+            self.log.error('Maximum retry attempts reached, connection failed.')
+            self.event.emit('connect_failed', 'Maximum retry attempts reached')
+            return None
+        self.log.info('Waiting for %.2f seconds before retrying...', delay)
+        self._emitReconnecting(delay)
+        return delay
+
+    def _emitReconnecting(self, delay: float) -> None:
+        host, port = self.reconnectPolicy.server
+        self.event.emit('reconnecting', {'host': host, 'port': port, 'delay': delay})
 
     def join(self, channel: str) -> None:
-        # Validate channel name
+        channel = self._checkChannel(channel)
+        if channel:
+            self._send(b''.join((JOIN, SPACE, channel.encode('utf-8'), CRLF)))
+
+    def join_many(self, channels: list, keys=None) -> None:
+        """Join channels with as few JOIN lines as TARGMAX and LINELEN allow.
+
+        keys is a list matching channels, or a dict of channel -> key. A key
+        with a space, comma or line break raises ValueError before anything
+        is sent, as it would shift every key after it.
+        """
+        if isinstance(keys, dict):
+            keys = [keys.get(channel) for channel in channels]
+        keys = keys or [None] * len(channels)
+        for key in keys:
+            if key and (' ' in key or ',' in key or hasLineBreak(key.encode('utf-8'))):
+                raise ValueError('Invalid channel key %r' % (key,))
+        pairs = [(self._checkChannel(channel), key) for channel, key in zip(channels, keys)]
+        pairs = [(channel, key) for channel, key in pairs if channel]
+        lines = self.isupport.packJoin([channel for channel, _ in pairs], [key for _, key in pairs])
+        lines = [checkLine(line.encode('utf-8')) for line in lines]
+        for line in lines:
+            self._send(line)
+
+    def casefold(self, name: str) -> str:
+        """Fold a nick or channel name per the server's CASEMAPPING, for comparing names"""
+        return self.isupport.fold(name)
+
+    def _checkChannel(self, channel: str):
+        """Validate a channel name against CHANTYPES and CHANNELLEN, returning it (maybe prefixed) or None"""
         if not channel:
-            print(f"Warning: Empty channel name, skipping join")
-            return
-        if not channel.startswith(('#', '&', '+', '!')):
-            print(f"Warning: Channel '{channel}' doesn't start with #, &, +, or ! - adding # prefix")
-            channel = '#' + channel
-        if ' ' in channel or ',' in channel:
-            print(f"Error: Invalid channel name '{channel}' - contains spaces or commas")
-            self.event.emit('join_error', {
-                'channel': channel,
-                'code': 'INVALID',
-                'reason': 'Channel name contains invalid characters'
-            })
-            return
-
-        buffer = "JOIN %s\r\n" % channel
-        self.irc.send(buffer.encode('utf-8'))
+            self.log.warning('Empty channel name, skipping join')
+            return None
+        chantypes = self.isupport.chantypes or '#'
+        if channel[0] not in chantypes:
+            prefix = '#' if '#' in chantypes else chantypes[0]
+            self.log.warning("Channel '%s' doesn't start with one of %s - adding %s prefix", channel,
+                             ', '.join(chantypes), prefix, extra={'channel': channel, 'command': 'JOIN'})
+            channel = prefix + channel
+        if ' ' in channel or ',' in channel or '\x07' in channel or \
+                hasLineBreak(channel.encode('utf-8')):
+            reason = 'Channel name contains invalid characters'
+        elif self.isupport.channellen and len(channel) > self.isupport.channellen:
+            reason = 'Channel name is longer than %d characters' % self.isupport.channellen
+        else:
+            return channel
+        self.log.error("Invalid channel name '%s' - %s", channel, reason,
+                       extra={'channel': channel, 'command': 'JOIN'})
+        self.event.emit('join_error', {
+            'channel': channel,
+            'code': 'INVALID',
+            'reason': reason
+        })
+        return None
 
     def setUser(self, user: str, realname: str) -> None:
-        command = "USER %s 0 * :%s\r\n" % (user, realname)
-        self.irc.send(command.encode('utf-8'))
+        self._send(buildLine(USER, user, b'0', b'*', trailing=realname))
 
     def setNick(self, nick: str) -> None:
-        command = "NICK %s\r\n" % nick
-        self.irc.send(command.encode('utf-8'))
+        self._send(buildLine(NICK, nick))
 
     def nickServIdentify(self, fmt: str, password: str) -> None:
         if not password:
             return
-        formatted = fmt % password
-        command = "PRIVMSG %s\r\n" % formatted
-        self.irc.send(command.encode('utf-8'))
+        self._send(buildLine(PRIVMSG, fmt % password), PRIORITY_NORMAL)
 
     def handle_raw_message(self, data: bytes) -> None:
-        self._recv_buffer += data.decode('utf-8')
-
-        while '\r\n' in self._recv_buffer:
-            line, self._recv_buffer = self._recv_buffer.split('\r\n', 1)
+        self.keepalive.lastReceived = time.monotonic()
+        if self._tlsHost is not None:
+            self._rememberTLSSession()
+        lines = self._framer.feed(data)
+        if self.metrics.enabled:
+            self.metrics.inc('bytes_received_total', len(data))
+            self.metrics.inc('lines_received_total', len(lines))
+
+        # Fast path: answer the batch's PINGs before any line reaches a listener
+        fastPing = b'PING' in data
+        if fastPing:
+            for line in lines:
+                token = _pingToken(line)
+                if token is not None:
+                    self._pong(token)
+
+        for line in lines:
             if line:
-                message, prefix, command, params, trailing = self.parse_message(line)
-
-                if command == 'PING':
-                    print('PING', trailing)
-                    self.sendRaw('PONG ' + trailing + '\r\n')
+                # Only read the fields a branch needs: Message derives them on first access
+                message = self._parseLine(line)
+                command = message.command
+
+                if command == 'PING' and not (fastPing and _pingToken(line) is not None):
+                    # Tagged, or split so that no single read held 'PING'
+                    trailing = message.trailing
+                    self._pong(trailing if trailing is not None else ' '.join(message.params))
+                elif command == 'PONG' and self.keepalive.token is not None:
+                    trailing = message.trailing
+                    params = message.params
+                    token = trailing if trailing is not None else (params[-1] if params else '')
+                    rtt = self.keepalive.pong(token, time.monotonic())
+                    if rtt is not None:
+                        if self.metrics.enabled:
+                            self.metrics.observe('ping_rtt_seconds', rtt)
+                        self.event.emit('latency', rtt)
+
+                self.caps.handleMessage(message)
+                if command == '001':
+                    self._welcome = True
+                elif self._welcome and command not in _WELCOME_BURST:
+                    self._welcome = False
+                    self._handle_registered()
+
+                if command == '005':
+                    self._handle_isupport(message.params[1:])
 
                 if command == '376' or command == '422':
+                    if self._connectStarted is not None:
+                        if self.metrics.enabled:
+                            self.metrics.observe('motd_seconds', time.monotonic() - self._connectStarted)
+                        self._connectStarted = None
+                    if self.reconnectPolicy is not None:
+                        self.reconnectPolicy.registered()
                     self.event.emit('connected', 'End of /MOTD command.')
 
                 # NickServ identification confirmation
-                if command == 'NOTICE' and prefix and 'nickserv' in prefix.lower():
+                if command == 'NOTICE' and message.prefix and 'nickserv' in message.prefix.lower():
                     # Check for common identification success messages
-                    full_message = ' '.join(params).lower() if params else ''
+                    full_message = ' '.join(message.params + [message.trailing or '']).lower()
                     if 'you are now identified' in full_message or 'you are identified' in full_message:
                         if not self._nickserv_identified:
                             self._nickserv_identified = True
@@ -272,58 +652,66 @@ class IRCSDK:
                             if self._nickserv_timer:
                                 self._nickserv_timer.cancel()
                                 self._nickserv_timer = None
-                            print("NickServ identification successful")
+                            self.log.info('NickServ identification successful')
                             self.event.emit('nickserv_identified', True)
                             if self._pending_channels:
                                 self._join_channels(self._pending_channels)
                                 self._pending_channels = []
 
                 # JOIN error codes
-                join_errors = {
-                    '471': 'Channel is full (+l)',
-                    '473': 'Channel is invite-only (+i)',
-                    '474': 'You are banned from this channel (+b)',
-                    '475': 'Bad channel key (+k)',
-                    '477': 'You need to register with services first',
-                }
-                if command in join_errors:
+                if command in _JOIN_ERRORS:
+                    params = message.params
                     channel = params[1] if len(params) > 1 else 'unknown'
+                    self.log.warning('Cannot join %s: %s', channel, _JOIN_ERRORS[command],
+                                     extra={'channel': channel, 'command': command})
                     self.event.emit('join_error', {
                         'channel': channel,
                         'code': command,
-                        'reason': join_errors[command]
+                        'reason': _JOIN_ERRORS[command]
                     })
 
-    def parse_message(self, data: str) -> tuple:
-        message = data.split()
-        prefix = ''
-        command = ''
-        params = []
-        trailing = ''
-
-        if data.startswith(':') and len(message) > 1:
-            prefix = message[0][1:]
-            command = message[1]
-            params = message[2:]
-        else:
-            prefix = None
-            command = message[0]
-            params = message[1:]
-
-        if params:
-            if params[0].startswith(':'):
-                trailing = params[0][1:]
-                params = params[1:]
-            else:
-                trailing = None
+    def _pong(self, token: str) -> None:
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug('PING %s', token, extra={'command': 'PING'})
+        self._send(b''.join((PONG, SPACE, token.encode('utf-8'), CRLF)), PRIORITY_HIGH)
 
-        messageFrom = prefix.split('!')[0] if prefix else None
-        messageTo = params[0] if params else None
-        actualMessage = ' '.join(params[1:]) if len(params) > 1 else None
-        if actualMessage and actualMessage.startswith(':'):
-            actualMessage = actualMessage[1:]
+    def _handle_isupport(self, tokens: list) -> None:
+        self.isupport.update(tokens)
+        config = getattr(self, 'config', None)
+        if not (config and config.maxLineLength):
+            # Room for LINELEN plus IRCv3 tags
+            self._framer.maxLength = max(MAX_LINE_LENGTH, self.isupport.linelen + 8191)
+        self.event.emit('isupport', self.isupport)
 
-        self.event.emit('message',
-                        Message(data, prefix, command, params, trailing, messageFrom, messageTo, actualMessage))
-
-        return data, prefix, command, params, trailing
+    def parse_message(self, data: str) -> tuple:
+        message = self._parseLine(data)
+        return data, message.prefix, message.command, message.params, message.trailing
+
+    def _parseLine(self, data: str) -> Message:
+        """Parse one line and emit it to 'message' (and numerics under their own name) listeners"""
+        if self.metrics.enabled:
+            started = time.perf_counter()
+            message = parse(data)
+            self.metrics.observe('parse_seconds', time.perf_counter() - started)
+        else:
+            message = parse(data)
+        self.event.emit('message', message)
+        command = message.command
+        if command.isdigit() and self.event.hasListeners(command):
+            # numerics also go out under their own name, for listeners like on('400-599', ...)
+            self.event.emit(command, message)
+        return message
+
+
+def _pingToken(line: str):
+    """Token of an untagged 'PING token' or ':server PING token' line, None for anything else"""
+    if line[:5] == 'PING ':
+        token = line[5:]
+    elif line[:1] == ':':
+        rest = line.partition(' ')[2]
+        if rest[:5] != 'PING ':
+            return None
+        token = rest[5:]
+    else:
+        return None
+    return token[1:] if token[:1] == ':' else token
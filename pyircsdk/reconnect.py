@@ -0,0 +1,83 @@
+import random
+
+
+class Backoff:
+    """Exponential backoff with full jitter.
+
+    The n-th delay in a row is drawn uniformly from [0, min(cap, base * 2**n)],
+    so clients dropped together don't all come back at the same moment.
+    """
+
+    def __init__(self, base: float = 5.0, cap: float = 300.0, rand=random.random) -> None:
+        self.base = base
+        self.cap = cap
+        self.rand = rand
+        self.attempt = 0
+
+    def next(self) -> float:
+        ceiling = min(self.cap, self.base * 2 ** min(self.attempt, 32))
+        self.attempt += 1
+        return self.rand() * ceiling
+
+    def reset(self) -> None:
+        self.attempt = 0
+
+
+def parseServer(entry, defaultPort: int) -> tuple:
+    """(host, port) from 'host:port', '[v6addr]:port', a bare host or a (host, port) pair"""
+    if not isinstance(entry, str):
+        host, port = entry
+        return host, int(port)
+    if entry.startswith('['):
+        host, _, rest = entry[1:].partition(']')
+        return host, int(rest[1:]) if rest.startswith(':') else defaultPort
+    if entry.count(':') == 1:
+        host, port = entry.split(':')
+        return host, int(port)
+    return entry, defaultPort
+
+
+class ReconnectPolicy:
+    """Decides which server to try next and how long to wait first.
+
+    Servers from ``config.servers`` (or ``config.host``/``config.port``) are
+    tried in rotation, moving on after each failed attempt and after each
+    dropped connection, so a server that keeps accepting and then dropping
+    the client doesn't hold it while the others are up. Waits come from a
+    Backoff based on ``reconnectDelay`` and capped at ``reconnectMaxDelay``,
+    which starts over once a connection registers. After ``connectRetries``
+    failed attempts in a row (default 5, 0 for no limit) the client gives up.
+    """
+
+    def __init__(self, config, rand=random.random) -> None:
+        self.config = config
+        self.servers = [parseServer(entry, config.port) for entry in config.servers or ()] \
+            or [(config.host, config.port)]
+        self.backoff = Backoff(5.0 if config.reconnectDelay is None else config.reconnectDelay,
+                               config.reconnectMaxDelay or 300.0, rand)
+        self.failures = 0
+        self._index = 0
+
+    @property
+    def server(self) -> tuple:
+        return self.servers[self._index]
+
+    def failed(self):
+        """Record a failed attempt, returning the wait before the next one or None to give up"""
+        self.failures += 1
+        self._index = (self._index + 1) % len(self.servers)
+        retries = 5 if self.config.connectRetries is None else self.config.connectRetries
+        if retries and self.failures >= retries:
+            return None
+        return self.backoff.next()
+
+    def registered(self) -> None:
+        self.failures = 0
+        self.backoff.reset()
+
+    def disconnected(self):
+        """Wait before reconnecting after a lost connection, or None when autoReconnect is off"""
+        if not self.config.autoReconnect:
+            return None
+        self._index = (self._index + 1) % len(self.servers)
+        return self.backoff.next()
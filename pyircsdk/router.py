@@ -0,0 +1,71 @@
+from .command import Command
+
+
+class Router:
+    """Routes parsed messages to the modules registered for them.
+
+    Modules are indexed by IRC command (e.g. ``PRIVMSG``) and, optionally, by
+    the first word of the message text (the fantasy prefix + command, e.g.
+    ``!quit``). Each message is tokenized at most once and only the matching
+    modules are called, so dispatch cost does not grow with the number of
+    loaded modules.
+    """
+
+    def __init__(self, irc):
+        self.irc = irc
+        self.byCommand = {}  # IRC command -> [module]
+        self.byTrigger = {}  # IRC command -> {trigger -> [module]}
+        self._listening = False
+
+    def add(self, module, ircCommands, trigger: str = None) -> None:
+        """Route ircCommands to module, only when the text starts with trigger if given"""
+        if not self._listening:
+            self.irc.event.on('message', self.dispatch, breaker=False)
+            self._listening = True
+
+        for ircCommand in ircCommands:
+            ircCommand = ircCommand.upper()
+            if trigger:
+                self.byTrigger.setdefault(ircCommand, {}).setdefault(trigger, []).append(module)
+            else:
+                self.byCommand.setdefault(ircCommand, []).append(module)
+
+    def remove(self, module) -> None:
+        for modules in self.byCommand.values():
+            if module in modules:
+                modules.remove(module)
+        for triggers in self.byTrigger.values():
+            for modules in triggers.values():
+                if module in modules:
+                    modules.remove(module)
+
+    def dispatch(self, message):
+        modules = self.byCommand.get(message.command)
+        triggers = self.byTrigger.get(message.command)
+        if not modules and not triggers:
+            return None
+
+        command = None
+        if message.message is not None:
+            command = Command().parse(message.message.split(' '))
+            if triggers:
+                matched = triggers.get(command.command)
+                if matched:
+                    modules = modules + matched if modules else matched
+        if not modules:
+            return None
+
+        pending = None
+        for module in modules:
+            result = module.dispatchCommand(message, command)
+            if result is not None:
+                pending = pending or []
+                pending.append(result)
+        if pending:
+            return _awaitAll(pending)
+        return None
+
+
+async def _awaitAll(awaitables):
+    for awaitable in awaitables:
+        await awaitable
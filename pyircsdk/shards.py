@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from multiprocessing.connection import wait
+
+from .asyncsdk import AsyncIRCSDK
+from .log import LOGGER_NAME
+from .manager import ManagedIRCSDK
+from .parser import parse
+from .pyircsdk import IRCSDK, IRCSDKConfig
+from .writer import linePriority
+
+# Lines every worker needs, whichever shard their channel is on: our nick and the server's limits
+_STATE_COMMANDS = ('001', '005')
+
+
+class _ShardIRC(IRCSDK):
+    """Worker-side stand-in for one connection: modules use its usual send methods, the lines go back to the parent"""
+
+    def __init__(self, connection: int, config: IRCSDKConfig, outbox: list) -> None:
+        super().__init__(config)
+        self.connection = connection
+        self._outbox = outbox
+
+    def _send(self, data: bytes, priority: int = None) -> None:
+        self._outbox.append((self.connection, linePriority(data) if priority is None else priority, bytes(data)))
+
+    def applyState(self, message) -> None:
+        if message.command == '001' and message.params:
+            self.config.nick = message.params[0]
+            self._room = (None, 0)
+        elif message.command == '005':
+            self._handle_isupport(message.params[1:])
+
+
+def _workerMain(factories: list, inbox, outbox) -> None:
+    """Worker process: rebuild each record's Message, run the modules and send their lines back in one batch"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent decides when workers stop
+    sessions = {}  # connection id -> _ShardIRC
+    lines = []
+    while True:
+        try:
+            data = inbox.recv_bytes()
+        except EOFError:
+            return
+        if not data:
+            return
+        for record in data.decode('utf-8', 'surrogatepass').split('\n'):
+            kind = record[0]
+            if kind == 'C':
+                header, nick, user, host = record[1:].split(' ', 3)
+                irc = sessions[int(header)] = _ShardIRC(int(header), IRCSDKConfig(host=host, port=0, nick=nick,
+                                                                                     user=user), lines)
+                for factory in factories:
+                    factory(irc).startListening()
+            elif kind == 'S':
+                header, line = record[1:].split(' ', 1)
+                irc = sessions[int(header)]
+                irc.applyState(parse(line))
+            else:
+                header, line = record.split(' ', 1)
+                sessions[int(header)]._parseLine(line)
+        if lines:
+            outbox.send(lines)
+            lines.clear()
+
+
+class ShardedRuntime:
+    """Runs modules in worker processes, so CPU-heavy handlers are not capped at one core by the GIL.
+
+    ``factories`` are picklable callables (usually Module subclasses or
+    functools.partial of them) that each worker calls with its own stand-in
+    for every attached connection, e.g. ``partial(MyModule, fantasy='!',
+    command='hi')``. Messages of attached connections (only ``ircCommands``
+    when given) are sharded by connection and channel, or by sender for
+    private messages, so one channel is always handled by the same worker
+    and in order. They travel as batches of raw lines over a pipe and are
+    parsed again, lazily, in the worker. Lines the modules send come back
+    to the owning connection's writer.
+
+    Module instances live in the workers, one set per connection per
+    worker, and share no state with this process or with each other. At
+    most ``maxPending`` records wait per worker; beyond that messages are
+    dropped and counted in ``dropped``. Replies that can't be handed to
+    their connection, e.g. because it just dropped, are logged and counted
+    in ``failed``.
+    """
+
+    def __init__(self, factories: list, workers: int = None, ircCommands: tuple = None, maxPending: int = 10000,
+                 context: str = None) -> None:
+        self.factories = list(factories)
+        self.workers = workers or os.cpu_count() or 1
+        self.ircCommands = frozenset(ircCommands) if ircCommands is not None else None
+        self.maxPending = maxPending
+        self.forwarded = 0
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+        self._context = multiprocessing.get_context(context)
+        self._connections = []  # connection id -> (irc, function taking a batch of (priority, line))
+        self._pending = [[] for _ in range(self.workers)]  # records waiting for each worker
+        self._cond = threading.Condition()
+        self._processes = []
+        self._inboxes = []
+        self._outboxes = []
+        self._threads = []
+        self._running = False
+
+    def attach(self, irc) -> int:
+        """Forward irc's messages to the workers and route their replies back to it, returning its id.
+
+        An AsyncIRCSDK must be attached from its event loop. ConnectionManager
+        sessions are not supported: their loop can't be handed lines from
+        another thread.
+        """
+        if isinstance(irc, ManagedIRCSDK):
+            raise ValueError('ConnectionManager sessions cannot be sharded; use IRCSDK or AsyncIRCSDK')
+        connection = len(self._connections)
+        if isinstance(irc, AsyncIRCSDK):
+            loop = asyncio.get_running_loop()
+
+            def send(lines):
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(_sendAll, irc, lines)
+            self._connections.append((irc, send))
+        else:
+            self._connections.append((irc, lambda lines: _sendAll(irc, lines)))
+
+        config = getattr(irc, 'config', None)
+        hello = 'C%d %s %s %s' % (connection, (config and config.nick) or '*', (config and config.user) or '*',
+                                  (config and config.host) or '*')
+        with self._cond:
+            for pending in self._pending:
+                pending.append(hello)
+            self._cond.notify()
+        irc.event.on('message', lambda message: self._forward(connection, irc, message), breaker=False)
+        return connection
+
+    def start(self) -> None:
+        for _ in range(self.workers):
+            inboxReader, inbox = self._context.Pipe(duplex=False)
+            outbox, outboxWriter = self._context.Pipe(duplex=False)
+            process = self._context.Process(target=_workerMain, args=(self.factories, inboxReader, outboxWriter),
+                                            daemon=True, name='pyircsdk-shard')
+            process.start()
+            inboxReader.close()
+            outboxWriter.close()
+            self._processes.append(process)
+            self._inboxes.append(inbox)
+            self._outboxes.append(outbox)
+        self._running = True
+        for target, name in ((self._sendLoop, 'pyircsdk-shard-send'), (self._replyLoop, 'pyircsdk-shard-reply')):
+            thread = threading.Thread(target=target, daemon=True, name=name)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Deliver what is pending, stop the workers and wait for them and their replies"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._threads:
+            self._threads[0].join(timeout)
+        for inbox in self._inboxes:
+            try:
+                inbox.send_bytes(b'')
+            except OSError:
+                pass
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        for thread in self._threads[1:]:
+            thread.join(timeout)
+        for inbox in self._inboxes:
+            inbox.close()
+        self._processes, self._inboxes, self._outboxes, self._threads = [], [], [], []
+
+    def shard(self, connection: int, irc, message) -> int:
+        """Worker index for message: by channel, or by sender for private messages and messages without a target"""
+        target = message.messageTo
+        if not target or target[:1] not in (irc.isupport.chantypes or '#'):
+            target = message.messageFrom or target or ''
+        return hash((connection, irc.casefold(target))) % self.workers
+
+    def _forward(self, connection: int, irc, message) -> None:
+        command = message.command
+        if command in _STATE_COMMANDS:
+            state = 'S%d %s' % (connection, message.data)
+            with self._cond:
+                for pending in self._pending:
+                    pending.append(state)
+                self._cond.notify()
+        if self.ircCommands is not None and command not in self.ircCommands:
+            return
+        shard = self.shard(connection, irc, message)
+        with self._cond:
+            pending = self._pending[shard]  # the send loop swaps the lists, so look it up under the lock
+            if len(pending) >= self.maxPending:
+                self.dropped += 1
+                return
+            pending.append('%d %s' % (connection, message.data))
+            self.forwarded += 1
+            self._cond.notify()
+
+    def _sendLoop(self) -> None:
+        while True:
+            with self._cond:
+                while self._running and not any(self._pending):
+                    self._cond.wait()
+                batches = self._pending
+                self._pending = [[] for _ in range(self.workers)]
+                running = self._running
+            # Records queued while a batch is being written go out together in the next one
+            for inbox, records in zip(self._inboxes, batches):
+                if records:
+                    try:
+                        # surrogatepass: lines decoded with surrogateescape reach the worker unchanged
+                        inbox.send_bytes('\n'.join(records).encode('utf-8', 'surrogatepass'))
+                    except OSError:
+                        pass  # the worker is gone
+                    except Exception:
+                        self.dropped += len(records)
+                        logging.getLogger(LOGGER_NAME).exception('Dropped %d records for a shard', len(records))
+            if not running:
+                return
+
+    def _replyLoop(self) -> None:
+        outboxes = list(self._outboxes)
+        while outboxes:
+            for outbox in wait(outboxes):
+                try:
+                    lines = outbox.recv()
+                except (EOFError, OSError):
+                    outboxes.remove(outbox)
+                    outbox.close()
+                    continue
+                byConnection = {}
+                for connection, priority, line in lines:
+                    byConnection.setdefault(connection, []).append((priority, line))
+                for connection, batch in byConnection.items():
+                    irc, send = self._connections[connection]
+                    try:
+                        send(batch)
+                    except Exception as e:
+                        # e.g. the connection dropped; the other connections still get their lines
+                        self.failed += len(batch)
+                        irc.log.warning('Dropped %d sharded replies: %s', len(batch), e)
+                    else:
+                        self.sent += len(batch)
+
+
+def _sendAll(irc, lines: list) -> None:
+    for priority, line in lines:
+        irc._send(line, priority)
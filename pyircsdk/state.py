@@ -0,0 +1,319 @@
+import sys
+
+from .isupport import ISupport, casefold, folder  # noqa: F401 (casefold re-exported)
+
+
+class User:
+    __slots__ = ('nick', 'user', 'host', 'channels')
+
+    def __init__(self, nick: str) -> None:
+        self.nick = nick
+        self.user = None
+        self.host = None
+        self.channels = set()  # casefolded names of the channels we share
+
+    def __repr__(self):
+        return 'User(%r, channels=%d)' % (self.nick, len(self.channels))
+
+
+class Channel:
+    __slots__ = ('name', 'members', 'synced')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.members = {}  # casefolded nick -> membership modes, e.g. '' or 'ov'
+        self.synced = False  # True once the NAMES list (366) is complete
+
+    def __repr__(self):
+        return 'Channel(%r, members=%d)' % (self.name, len(self.members))
+
+
+class StateTracker:
+    """Channel membership kept up to date from JOIN/PART/QUIT/KICK/NICK/MODE and NAMES.
+
+    Two indexes are kept in step: ``channels`` maps a casefolded channel name
+    to a Channel whose ``members`` maps casefolded nicks to their membership
+    modes, and ``users`` maps casefolded nicks to a User holding the
+    casefolded names of its channels. Only users sharing a channel with us
+    are tracked. Keys are folded with the server's CASEMAPPING and interned,
+    so both indexes share one string per name.
+
+    CASEMAPPING, PREFIX and CHANMODES come from ``isupport``: the
+    connection's model when attached to an IRCSDK, otherwise one fed by the
+    005 lines passed to handleMessage.
+    """
+
+    def __init__(self, irc=None, isupport: ISupport = None) -> None:
+        self.nick = irc.config.nick if irc is not None and getattr(irc, 'config', None) else None
+        self.channels = {}
+        self.users = {}
+        self.isupport = isupport or (irc.isupport if irc is not None else ISupport())
+        self.casemapping = None
+        self.applyISupport()
+        self._handlers = {
+            '001': self._welcome,
+            'JOIN': self._join,
+            'PART': self._part,
+            'KICK': self._kick,
+            'QUIT': self._quit,
+            'NICK': self._nickChange,
+            'MODE': self._mode,
+            '353': self._names,
+            '366': self._endOfNames,
+        }
+        if irc is not None:
+            irc.event.on('message', self.handleMessage, breaker=False)
+            irc.event.on('isupport', lambda isupport: self.applyISupport(), breaker=False)
+            irc.event.on('disconnected', lambda data: self.clear(), breaker=False)
+        else:
+            self._handlers['005'] = self._isupport
+
+    def key(self, name: str) -> str:
+        return sys.intern(self.fold(name))
+
+    def applyISupport(self) -> None:
+        isupport = self.isupport
+        self.setCasemapping(isupport.casemapping)
+        self.setPrefix(*isupport.prefix)
+        self.setChanModes(*isupport.chanmodes)
+
+    def setCasemapping(self, casemapping: str) -> None:
+        if casemapping == self.casemapping:
+            return
+        self.casemapping = casemapping
+        self.fold = folder(casemapping)
+        # Normally sent before any JOIN; if not, re-key what we have
+        channels, users = self.channels, self.users
+        self.channels = {self.key(channel.name): channel for channel in channels.values()}
+        self.users = {self.key(user.nick): user for user in users.values()}
+        for channel in self.channels.values():
+            channel.members = {self.key(users[nick].nick): modes for nick, modes in channel.members.items()}
+        for user in self.users.values():
+            user.channels = {self.key(channels[name].name) for name in user.channels}
+
+    def setPrefix(self, modes: str, prefixes: str) -> None:
+        """Membership modes and their NAMES prefixes, highest rank first (PREFIX=(ov)@+)"""
+        self.prefixModes = modes
+        self.prefixes = dict(zip(prefixes, modes))
+        self._modeStrings = {}
+
+    def setChanModes(self, listModes: str, alwaysArg: str, setArg: str, noArg: str = '') -> None:
+        """Channel modes by how they take arguments (CHANMODES=A,B,C,D)"""
+        self._alwaysArg = frozenset(listModes + alwaysArg)
+        self._setArg = frozenset(setArg)
+
+    def clear(self) -> None:
+        self.channels = {}
+        self.users = {}
+
+    # Lookups
+
+    def channel(self, name: str) -> Channel:
+        return self.channels.get(self.fold(name))
+
+    def user(self, nick: str) -> User:
+        return self.users.get(self.fold(nick))
+
+    def isOn(self, nick: str, channel: str) -> bool:
+        channel = self.channels.get(self.fold(channel))
+        return channel is not None and self.fold(nick) in channel.members
+
+    def modes(self, nick: str, channel: str) -> str:
+        """Membership modes of nick in channel, e.g. 'o', or None if it isn't there"""
+        channel = self.channels.get(self.fold(channel))
+        return None if channel is None else channel.members.get(self.fold(nick))
+
+    def members(self, channel: str) -> list:
+        channel = self.channels.get(self.fold(channel))
+        if channel is None:
+            return []
+        users = self.users
+        return [users[nick].nick for nick in channel.members]
+
+    def channelsOf(self, nick: str) -> list:
+        user = self.users.get(self.fold(nick))
+        if user is None:
+            return []
+        channels = self.channels
+        return [channels[name].name for name in user.channels]
+
+    def commonChannels(self, nick: str, other: str) -> list:
+        first = self.users.get(self.fold(nick))
+        second = self.users.get(self.fold(other))
+        if first is None or second is None:
+            return []
+        return [self.channels[name].name for name in first.channels & second.channels]
+
+    # Updates
+
+    def handleMessage(self, message) -> None:
+        handler = self._handlers.get(message.command)
+        if handler is not None:
+            handler(message)
+
+    def _isMe(self, key: str) -> bool:
+        return self.nick is not None and key == self.fold(self.nick)
+
+    def _welcome(self, message) -> None:
+        if message.params:
+            self.nick = message.params[0]
+
+    def _isupport(self, message) -> None:
+        self.isupport.update(message.params[1:])
+        self.applyISupport()
+
+    def _addMember(self, channel: Channel, channelKey: str, nick: str, modes: str = '') -> User:
+        key = self.key(nick)
+        user = self.users.get(key)
+        if user is None:
+            user = self.users[key] = User(sys.intern(nick))
+        user.channels.add(channelKey)
+        channel.members[key] = modes
+        return user
+
+    def _removeMember(self, channelKey: str, key: str) -> None:
+        if self._isMe(key):
+            self._dropChannel(channelKey)
+            return
+        channel = self.channels.get(channelKey)
+        if channel is None or channel.members.pop(key, None) is None:
+            return
+        user = self.users.get(key)
+        if user is not None:
+            user.channels.discard(channelKey)
+            if not user.channels:
+                del self.users[key]
+
+    def _dropChannel(self, channelKey: str) -> None:
+        channel = self.channels.pop(channelKey, None)
+        if channel is None:
+            return
+        users = self.users
+        for key in channel.members:
+            user = users.get(key)
+            if user is not None:
+                user.channels.discard(channelKey)
+                if not user.channels:
+                    del users[key]
+
+    def _join(self, message) -> None:
+        nick = message.messageFrom
+        target = message.params[0] if message.params else message.trailing
+        if not nick or not target:
+            return
+        for name in target.split(','):
+            channelKey = self.key(name)
+            channel = self.channels.get(channelKey)
+            if channel is None:
+                if not self._isMe(self.fold(nick)):
+                    continue  # a channel we aren't on
+                channel = self.channels[channelKey] = Channel(sys.intern(name))
+            user = self._addMember(channel, channelKey, nick)
+            if message.user is not None:
+                user.user, user.host = message.user, message.host or ''
+
+    def _part(self, message) -> None:
+        nick = message.messageFrom
+        target = message.params[0] if message.params else message.trailing
+        if not nick or not target:
+            return
+        key = self.fold(nick)
+        for name in target.split(','):
+            self._removeMember(self.fold(name), key)
+
+    def _kick(self, message) -> None:
+        if len(message.params) >= 2:
+            self._removeMember(self.fold(message.params[0]), self.fold(message.params[1]))
+
+    def _quit(self, message) -> None:
+        if not message.messageFrom:
+            return
+        user = self.users.pop(self.fold(message.messageFrom), None)
+        if user is None:
+            return
+        key = self.fold(user.nick)
+        for channelKey in user.channels:
+            channel = self.channels.get(channelKey)
+            if channel is not None:
+                channel.members.pop(key, None)
+
+    def _nickChange(self, message) -> None:
+        old = message.messageFrom
+        new = message.params[0] if message.params else message.trailing
+        if not old or not new:
+            return
+        oldKey = self.fold(old)
+        if self._isMe(oldKey):
+            self.nick = new
+        user = self.users.pop(oldKey, None)
+        if user is None:
+            return
+        newKey = self.key(new)
+        user.nick = sys.intern(new)
+        self.users[newKey] = user
+        for channelKey in user.channels:
+            members = self.channels[channelKey].members
+            members[newKey] = members.pop(oldKey, '')
+
+    def _mode(self, message) -> None:
+        params = message.allParams
+        if len(params) < 3:
+            return  # no arguments, so no membership changes
+        channel = self.channels.get(self.fold(params[0]))
+        if channel is None:
+            return
+        args = iter(params[2:])
+        adding = True
+        for mode in params[1]:
+            if mode == '+':
+                adding = True
+            elif mode == '-':
+                adding = False
+            elif mode in self.prefixModes:
+                nick = next(args, None)
+                if nick is None:
+                    return
+                key = self.fold(nick)
+                modes = channel.members.get(key)
+                if modes is not None:
+                    channel.members[key] = self._setMode(modes, mode, adding)
+            elif mode in self._alwaysArg or (adding and mode in self._setArg):
+                next(args, None)
+
+    def _setMode(self, modes: str, mode: str, adding: bool) -> str:
+        result = self._modeStrings.get((modes, mode, adding))
+        if result is None:
+            wanted = set(modes)
+            if adding:
+                wanted.add(mode)
+            else:
+                wanted.discard(mode)
+            # Highest rank first, shared between all members with the same modes
+            result = sys.intern(''.join(m for m in self.prefixModes if m in wanted))
+            self._modeStrings[(modes, mode, adding)] = result
+        return result
+
+    def _names(self, message) -> None:
+        if not message.trailing or not message.params:
+            return
+        channelKey = self.fold(message.params[-1])
+        channel = self.channels.get(channelKey)
+        if channel is None:
+            return
+        prefixes = self.prefixes
+        for name in message.trailing.split():
+            modes = ''
+            start = 0
+            while start < len(name) and name[start] in prefixes:
+                modes = self._setMode(modes, prefixes[name[start]], True)
+                start += 1
+            nick, _, userhost = name[start:].partition('!')
+            user = self._addMember(channel, channelKey, nick, modes)
+            if userhost:
+                user.user, _, user.host = userhost.partition('@')
+
+    def _endOfNames(self, message) -> None:
+        if len(message.params) >= 2:
+            channel = self.channels.get(self.fold(message.params[1]))
+            if channel is not None:
+                channel.synced = True
@@ -0,0 +1,21 @@
+import re
+
+_TAG_ESCAPES = {':': ';', 's': ' ', '\\': '\\', 'r': '\r', 'n': '\n'}
+_TAG_ESCAPE_RE = re.compile(r'\\(.?)', re.DOTALL)
+
+
+def unescapeTagValue(value: str) -> str:
+    """Undo IRCv3 tag value escaping (unknown escapes drop the backslash)"""
+    if '\\' not in value:
+        return value
+    return _TAG_ESCAPE_RE.sub(lambda m: _TAG_ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+def parseTags(rawTags: str) -> dict:
+    """Parse 'key=value;key2;+vendor/key3=value' into a dict (missing values become '')"""
+    tags = {}
+    for item in rawTags.split(';'):
+        key, _, value = item.partition('=')
+        if key:
+            tags[key] = unescapeTagValue(value)
+    return tags
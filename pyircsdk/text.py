@@ -0,0 +1,33 @@
+def splitText(text: str, maxBytes: int) -> list:
+    """Split text into chunks of at most maxBytes bytes of UTF-8.
+
+    Line breaks always start a new chunk (a bare CR or LF inside a message
+    would end the IRC line). Long lines are cut at the last space that
+    leaves the chunk at least half full, otherwise at the last character
+    boundary, so a multi-byte UTF-8 character is never split.
+    """
+    if maxBytes < 4:
+        raise ValueError('maxBytes must leave room for one character')
+    chunks = []
+    for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+        if not line:
+            continue
+        data = line.encode('utf-8')
+        if len(data) <= maxBytes:
+            chunks.append(line)
+            continue
+        start = 0
+        while len(data) - start > maxBytes:
+            end = start + maxBytes
+            while (data[end] & 0xC0) == 0x80:  # continuation byte: back up to the character's start
+                end -= 1
+            space = data.rfind(b' ', start + maxBytes // 2, end + 1)
+            if space != -1:
+                chunks.append(data[start:space].decode('utf-8'))
+                start = space + 1
+            else:
+                chunks.append(data[start:end].decode('utf-8'))
+                start = end
+        if start < len(data):
+            chunks.append(data[start:].decode('utf-8'))
+    return chunks
@@ -0,0 +1,69 @@
+import ssl
+import threading
+
+_shared = {}  # (allowAnySSL, certfile, keyfile) -> ResumingContext
+_sharedLock = threading.Lock()
+
+
+class ResumingContext(ssl.SSLContext):
+    """Client SSLContext that resumes the last TLS session of a server when connecting to it again.
+
+    Sessions are kept per server hostname. wrap_socket and wrap_bio (which
+    asyncio uses) offer the cached one when no session is passed, so a
+    reconnect can skip the full handshake. Safe to share between IRCSDK
+    instances and threads.
+    """
+
+    def __init__(self, protocol=ssl.PROTOCOL_TLS_CLIENT) -> None:
+        self.sessions = {}  # server hostname -> SSLSession
+        self._lock = threading.Lock()
+
+    def session(self, hostname: str):
+        with self._lock:
+            return self.sessions.get(hostname)
+
+    def remember(self, hostname: str, sslobj) -> None:
+        """Keep the session of an established connection for the next one to hostname"""
+        session = sslobj.session
+        # TLS 1.3 sessions are only resumable once the server has sent a ticket
+        if session is None or not (session.has_ticket or sslobj.version() != 'TLSv1.3'):
+            return
+        with self._lock:
+            self.sessions[hostname] = session
+
+    def forget(self, hostname: str) -> None:
+        with self._lock:
+            self.sessions.pop(hostname, None)
+
+    def wrap_socket(self, sock, *args, server_hostname=None, session=None, **kwargs):
+        if session is None and server_hostname is not None:
+            session = self.session(server_hostname)
+        return super().wrap_socket(sock, *args, server_hostname=server_hostname, session=session, **kwargs)
+
+    def wrap_bio(self, incoming, outgoing, *args, server_hostname=None, session=None, **kwargs):
+        if session is None and server_hostname is not None:
+            session = self.session(server_hostname)
+        return super().wrap_bio(incoming, outgoing, *args, server_hostname=server_hostname, session=session,
+                                **kwargs)
+
+
+def clientContext(allowAnySSL: bool = False, certfile: str = None, keyfile: str = None) -> ResumingContext:
+    """Context with the ssl.create_default_context() defaults, optionally with a client certificate"""
+    context = ResumingContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.load_default_certs(ssl.Purpose.SERVER_AUTH)
+    if allowAnySSL:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    if certfile:
+        context.load_cert_chain(certfile, keyfile)
+    return context
+
+
+def sharedContext(allowAnySSL: bool = False, certfile: str = None, keyfile: str = None) -> ResumingContext:
+    """One clientContext per set of arguments for the whole process, so its sessions are shared too"""
+    key = (allowAnySSL, certfile, keyfile)
+    with _sharedLock:
+        context = _shared.get(key)
+        if context is None:
+            context = _shared[key] = clientContext(allowAnySSL, certfile, keyfile)
+        return context
@@ -0,0 +1,198 @@
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+BLOCK = 'block'
+
+
+def _processCommand(moduleClass, message, command):
+    return moduleClass.processCommand(message, command)
+
+
+class _Job:
+    __slots__ = ('message', 'command', 'key', 'state', 'timer')
+
+    def __init__(self, message, command, key):
+        self.message = message
+        self.command = command
+        self.key = key
+        self.state = 'queued'  # queued -> running (-> timed out) -> finished, or dropped
+        self.timer = None
+
+
+class HandlerPool:
+    """Runs a module's handlers off the receive thread.
+
+    With ``executor='thread'`` the module's own handleCommand runs on a
+    ThreadPoolExecutor. With ``executor='process'`` the module's
+    ``processCommand(message, command)`` classmethod runs on a
+    ProcessPoolExecutor (so it must be picklable and cannot touch the
+    connection), and its return value is passed to ``handleResult`` back in
+    this process.
+
+    At most ``maxQueue`` messages wait for a worker; when full, ``overflow``
+    decides whether the oldest waiting message is dropped, the new one is
+    dropped, or the caller blocks. When ``ordered`` is set, messages for the
+    same target (channel or nick) are handled one at a time, in order. A
+    handler running longer than ``timeout`` seconds is reported to
+    handleError as a TimeoutError and its outcome is discarded, but it keeps
+    its worker and its channel until it really returns (see ``hung``), so
+    maxQueue and the overflow policy still apply while handlers hang.
+    """
+
+    def __init__(self, module, executor: str = 'thread', workers: int = 4, maxQueue: int = 100,
+                 overflow: str = DROP_OLDEST, timeout: float = None, ordered: bool = True) -> None:
+        if executor not in ('thread', 'process'):
+            raise ValueError('executor must be "thread" or "process", not %r' % executor)
+        if overflow not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError('Unknown overflow policy %r' % overflow)
+        self.module = module
+        self.process = executor == 'process'
+        self.maxQueue = maxQueue
+        self.overflow = overflow
+        self.timeout = timeout
+        self.ordered = ordered
+        self.dropped = 0
+        self.timedOut = 0
+
+        poolClass = ProcessPoolExecutor if self.process else ThreadPoolExecutor
+        self.executor = poolClass(max_workers=workers)
+        self._workers = workers
+        self._cond = threading.Condition()
+        self._waiting = deque()  # every queued job, oldest first
+        self._queued = 0
+        self._byKey = {}  # key -> deque of its queued jobs, oldest first
+        self._busy = set()  # keys with a running job
+        self._running = 0
+        self._hung = 0
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        return self._queued
+
+    @property
+    def hung(self) -> int:
+        """Timed out handlers still holding a worker"""
+        return self._hung
+
+    def submit(self, message, command) -> bool:
+        """Queue a message for a worker, returning False if it was dropped"""
+        key = message.messageTo if self.ordered else None
+        job = _Job(message, command, key)
+        with self._cond:
+            if self._closed:
+                return False
+            if self._queued >= self.maxQueue:
+                if self.overflow == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.overflow == DROP_OLDEST:
+                    self._dropOldest()
+                else:
+                    while self._queued >= self.maxQueue and not self._closed:
+                        self._cond.wait()
+            self._queued += 1
+            self._waiting.append(job)
+            if self.ordered:
+                self._byKey.setdefault(key, deque()).append(job)
+            self._pump()
+        return True
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self.executor.shutdown(wait=wait)
+
+    def _dropOldest(self) -> None:
+        while self._waiting:
+            job = self._waiting.popleft()
+            if job.state == 'queued':
+                job.state = 'dropped'
+                self._queued -= 1
+                self.dropped += 1
+                if self.ordered:
+                    self._unqueue(job)
+                return
+
+    def _unqueue(self, job: _Job) -> None:
+        queue = self._byKey[job.key]
+        queue.remove(job)
+        if not queue:
+            del self._byKey[job.key]
+
+    def _pump(self) -> None:
+        """Start queued jobs while workers are free (called with the lock held)"""
+        if not self.ordered:
+            while self._running < self._workers and self._waiting:
+                job = self._waiting.popleft()
+                if job.state == 'queued':
+                    self._start(job)
+            return
+        for job in list(self._waiting):
+            if self._running >= self._workers:
+                break
+            # Only the oldest job of a key may start, and only if nothing else for the key runs
+            if job.state == 'queued' and job.key not in self._busy and self._byKey[job.key][0] is job:
+                self._start(job)
+
+    def _start(self, job: _Job) -> None:
+        job.state = 'running'
+        self._queued -= 1
+        self._running += 1
+        try:
+            self._waiting.remove(job)
+        except ValueError:
+            pass
+        if self.ordered:
+            self._unqueue(job)
+            self._busy.add(job.key)
+        self._cond.notify_all()
+
+        if self.process:
+            future = self.executor.submit(_processCommand, type(self.module), job.message, job.command)
+        else:
+            future = self.executor.submit(self.module.runCommand, job.message, job.command)
+        if self.timeout:
+            job.timer = threading.Timer(self.timeout, self._timedOut, (job,))
+            job.timer.daemon = True
+            job.timer.start()
+        future.add_done_callback(lambda f: self._finished(job, f))
+
+    def _release(self, job: _Job) -> bool:
+        """Free job's worker slot once its future is done, returning False if it had timed out"""
+        with self._cond:
+            timedOut = job.state == 'timed out'
+            if timedOut:
+                self._hung -= 1
+            job.state = 'finished'
+            self._running -= 1
+            self._busy.discard(job.key)
+            if not self._closed:
+                self._pump()
+            return not timedOut
+
+    def _timedOut(self, job: _Job) -> None:
+        # The slot and channel stay taken: the handler is still running on its worker
+        with self._cond:
+            if job.state != 'running':
+                return
+            job.state = 'timed out'
+            self.timedOut += 1
+            self._hung += 1
+        self.module.handleError(job.message, job.command, TimeoutError('Handler took longer than %ss' % self.timeout))
+
+    def _finished(self, job: _Job, future) -> None:
+        if job.timer is not None:
+            job.timer.cancel()
+        if not self._release(job) or future.cancelled():
+            return
+        if self.process:
+            error = future.exception()
+            if error is not None:
+                self.module.handleError(job.message, job.command, error)
+            else:
+                self.module.handleResult(job.message, job.command, future.result())
@@ -0,0 +1,226 @@
+import asyncio
+import socket
+import ssl
+import threading
+import time
+from collections import deque
+
+PRIORITY_HIGH = 0  # PONG, QUIT, CAP/SASL: never wait for the token bucket
+PRIORITY_NORMAL = 1  # registration, JOIN, NICK, ...
+PRIORITY_LOW = 2  # PRIVMSG / NOTICE bulk traffic
+
+_HIGH_VERBS = (b'PONG', b'QUIT', b'PING', b'CAP', b'AUTHENTICATE')
+_LOW_VERBS = (b'PRIVMSG', b'NOTICE')
+# Capability/SASL handshake, exchanged while the server holds registration: not counted against the bucket
+_UNCOUNTED_VERBS = (b'CAP ', b'AUTHENTICATE ')
+
+
+# Most lines the writers take from the queue for one write
+WRITE_BATCH = 64
+
+
+def linePriority(data: bytes) -> int:
+    """Guess the lane for a raw line from its verb"""
+    verb = data.split(b' ', 1)[0].upper()
+    if verb in _HIGH_VERBS:
+        return PRIORITY_HIGH
+    if verb in _LOW_VERBS:
+        return PRIORITY_LOW
+    return PRIORITY_NORMAL
+
+
+class TokenBucket:
+    """Allows ``burst`` lines at once, refilled at ``rate`` lines per second (0 = unlimited)"""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available"""
+        if not self.rate:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        if self.rate:
+            self.tokens -= 1
+
+
+class SendQueue:
+    """Priority lanes of outgoing lines, paced by a TokenBucket.
+
+    Unpaced unless a rate is given, so lines go out as soon as they are sent.
+    Not thread safe on its own; Writer and AsyncWriter serialise access.
+    """
+
+    def __init__(self, rate: float = None, burst: int = None) -> None:
+        self.bucket = TokenBucket(rate or 0.0, burst or 5)
+        self.lanes = (deque(), deque(), deque())
+        self.sent = 0
+        self.maxDepth = 0
+        self.waitTotal = 0.0  # seconds lines spent queued
+        self.waitMax = 0.0
+
+    @property
+    def depth(self) -> int:
+        return len(self.lanes[0]) + len(self.lanes[1]) + len(self.lanes[2])
+
+    def put(self, data: bytes, priority: int) -> None:
+        self.lanes[priority].append((data, time.monotonic()))
+        depth = self.depth
+        if depth > self.maxDepth:
+            self.maxDepth = depth
+
+    def pop(self, now: float) -> tuple:
+        """Return (line, None) when a line may be sent now, else (None, seconds to wait or None if empty)"""
+        for priority, lane in enumerate(self.lanes):
+            if lane:
+                break
+        else:
+            return None, None
+
+        if priority != PRIORITY_HIGH:
+            delay = self.bucket.delay(now)
+            if delay:
+                return None, delay
+
+        data, queued = lane.popleft()
+        if priority != PRIORITY_HIGH or not data.startswith(_UNCOUNTED_VERBS):
+            self.bucket.consume()
+        waited = now - queued
+        self.sent += 1
+        self.waitTotal += waited
+        if waited > self.waitMax:
+            self.waitMax = waited
+        return data, None
+
+    def clear(self) -> None:
+        for lane in self.lanes:
+            lane.clear()
+
+    def stats(self) -> dict:
+        return {
+            'depth': self.depth,
+            'depthByPriority': [len(lane) for lane in self.lanes],
+            'maxDepth': self.maxDepth,
+            'sent': self.sent,
+            'waitTotal': self.waitTotal,
+            'waitMax': self.waitMax,
+            'waitAvg': self.waitTotal / self.sent if self.sent else 0.0,
+        }
+
+
+def sendLines(sock, lines: list) -> None:
+    """Write lines with one sendmsg (scatter-gather, no joined copy) on plain sockets, else one sendall"""
+    if len(lines) == 1:
+        sock.sendall(lines[0])
+        return
+    # SSLSocket refuses sendmsg
+    if isinstance(sock, socket.socket) and not isinstance(sock, ssl.SSLSocket) and hasattr(sock, 'sendmsg'):
+        sent = sock.sendmsg(lines)
+        total = sum(map(len, lines))
+        if sent < total:
+            sock.sendall(b''.join(lines)[sent:])
+        return
+    sock.sendall(b''.join(lines))
+
+
+def popReady(queue: SendQueue, first: bytes, now: float) -> list:
+    """first plus the lines the queue allows sending right now, up to WRITE_BATCH"""
+    lines = [first]
+    while len(lines) < WRITE_BATCH:
+        data, _ = queue.pop(now)
+        if data is None:
+            break
+        lines.append(data)
+    return lines
+
+
+class Writer:
+    """Thread draining a SendQueue into a socket, all lines sendable at once in one write"""
+
+    def __init__(self, sock, queue: SendQueue) -> None:
+        self.sock = sock
+        self.queue = queue
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='pyircsdk-writer', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def put(self, data: bytes, priority: int) -> None:
+        with self._cond:
+            self.queue.put(data, priority)
+            self._cond.notify()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not threading.current_thread() and self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if not self._running:
+                        return
+                    now = time.monotonic()
+                    data, delay = self.queue.pop(now)
+                    if data is not None:
+                        lines = popReady(self.queue, data, now)
+                        break
+                    self._cond.wait(delay)
+            try:
+                sendLines(self.sock, lines)
+            except OSError:
+                # The reader notices the broken connection and tears down
+                return
+
+
+class AsyncWriter:
+    """asyncio task draining a SendQueue into a StreamWriter"""
+
+    def __init__(self, stream: asyncio.StreamWriter, queue: SendQueue) -> None:
+        self.stream = stream
+        self.queue = queue
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def start(self) -> None:
+        self._task = asyncio.ensure_future(self._run())
+
+    def put(self, data: bytes, priority: int) -> None:
+        self.queue.put(data, priority)
+        self._wake.set()
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            data, delay = self.queue.pop(now)
+            if data is not None:
+                self.stream.writelines(popReady(self.queue, data, now))
+                try:
+                    await self.stream.drain()
+                except OSError:
+                    return
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
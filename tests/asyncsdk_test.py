@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from pyircsdk import AsyncIRCSDK, IRCSDKConfig, Module
+
+
+class TestAsyncIRCSDK(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.received = []
+        self.server = await asyncio.start_server(self._handle_client, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle_client(self, reader, writer):
+        # Register (ignoring CAP, like a server without IRCv3), then send a PING and a PRIVMSG before hanging up
+        while len(self.received) < 3:
+            self.received.append((await reader.readline()).decode().strip())
+        writer.write(b':server 376 testbot :End of /MOTD command.\r\n')
+        writer.write(b'PING :fake.server\r\n')
+        writer.write(b':nick!user@host PRIVMSG #test :!hello world\r\n')
+        await writer.drain()
+        self.received.append((await reader.readline()).decode().strip())
+        self.received.append((await reader.readline()).decode().strip())
+        writer.close()
+
+    def _config(self, **kwargs):
+        return IRCSDKConfig(host='127.0.0.1', port=self.port, nick='testbot', user='testuser',
+                            realname='Test Bot', channel='#test', ssl=False, **kwargs)
+
+    async def test_connect_registers_and_answers_ping(self):
+        irc = AsyncIRCSDK(self._config())
+        await asyncio.wait_for(irc.connect(), 5)
+
+        self.assertEqual(self.received[:3], ['CAP LS 302', 'USER testuser 0 * :Test Bot', 'NICK testbot'])
+        self.assertIn('PONG fake.server', self.received)
+        self.assertIn('JOIN #test', self.received)
+
+    async def test_async_listener_is_awaited(self):
+        irc = AsyncIRCSDK(self._config())
+        seen = []
+
+        async def on_message(message):
+            await asyncio.sleep(0)
+            seen.append(message.command)
+
+        irc.event.on('message', on_message)
+        await asyncio.wait_for(irc.connect(), 5)
+        await asyncio.sleep(0.01)
+
+        self.assertIn('PRIVMSG', seen)
+
+    async def test_async_module_handle_command(self):
+        irc = AsyncIRCSDK(self._config())
+        module = AsyncTestModule(irc, '!', 'hello')
+        module.startListening()
+        await asyncio.wait_for(irc.connect(), 5)
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(module.args, ['world'])
+
+    async def test_disconnect_emits_without_exiting(self):
+        irc = AsyncIRCSDK(self._config())
+        disconnected = []
+        irc.event.on('disconnected', disconnected.append)
+        await asyncio.wait_for(irc.connect(), 5)
+
+        self.assertEqual(disconnected, ['Connection lost'])
+
+    async def test_exhausted_retries_emit_connect_failed(self):
+        self.server.close()
+        await self.server.wait_closed()
+        irc = AsyncIRCSDK(self._config(connectionTimeout=1, connectRetries=2, reconnectDelay=0))
+        failed = []
+        irc.event.on('connect_failed', failed.append)
+        await asyncio.wait_for(irc.connect(), 5)
+        self.assertEqual(failed, ['Maximum retry attempts reached'])
+
+    async def test_reconnects_with_auto_reconnect(self):
+        irc = AsyncIRCSDK(self._config(autoReconnect=True, reconnectDelay=0.01))
+        disconnected = []
+
+        def on_disconnected(data):
+            disconnected.append(data)
+            if len(disconnected) == 2:
+                irc._closing = True
+
+        irc.event.on('disconnected', on_disconnected)
+        await asyncio.wait_for(irc.connect(), 5)
+        self.assertEqual(len(disconnected), 2)
+
+    async def test_try_connect_awaits_connect(self):
+        self.server.close()
+        await self.server.wait_closed()
+        irc = AsyncIRCSDK(self._config(connectionTimeout=1))
+        failed = []
+        irc.event.on('connect_failed', failed.append)
+        with self.assertWarns(DeprecationWarning):
+            await asyncio.wait_for(irc.try_connect(2, 0), 5)
+        self.assertEqual(failed, ['Maximum retry attempts reached'])
+        self.assertEqual(irc.reconnectPolicy.failures, 0)
+
+    async def test_connect_no_config_raises(self):
+        irc = AsyncIRCSDK(None)
+        irc.config = None
+        with self.assertRaises(ValueError):
+            await irc.connect()
+
+
+class AsyncTestModule(Module):
+    args = None
+
+    async def handleCommand(self, message, command):
+        if message.command == 'PRIVMSG' and command.command == self.fantasy + self.command:
+            await asyncio.sleep(0)
+            self.args = command.args
+
+    def handleError(self, message, command, error):
+        pass
+
+
+class SlowReplyModule(Module):
+    ircCommands = ('PRIVMSG',)
+    executor = 'thread'
+
+    def handleCommand(self, message, command):
+        time.sleep(0.1)
+        self.thread = threading.current_thread()
+        self.irc.privmsg(message.messageTo, 'done')
+
+    def handleError(self, message, command, error):
+        pass
+
+
+class TestSendsFromOtherThreads(unittest.IsolatedAsyncioTestCase):
+
+    async def test_thread_executor_reply_wakes_the_loop(self):
+        replied = asyncio.get_running_loop().create_future()
+        writers = []
+
+        async def handle(reader, writer):
+            writers.append(writer)
+            while not (await reader.readline()).startswith(b'NICK'):
+                pass
+            writer.write(b':server 376 bot :End of /MOTD command.\r\n:n!u@h PRIVMSG #test :!slow\r\n')
+            sent = time.monotonic()
+            while True:
+                line = await reader.readline()
+                if not line or line.startswith(b'PRIVMSG'):
+                    if not replied.done():
+                        replied.set_result((line, time.monotonic() - sent))
+                    writer.close()
+                    return
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        self.addCleanup(lambda: [writer.close() for writer in writers])
+
+        # No keepalive PINGs or other traffic would wake the loop for the reply
+        irc = AsyncIRCSDK(IRCSDKConfig(host='127.0.0.1', port=server.sockets[0].getsockname()[1], nick='bot',
+                                       user='bot', realname='bot', caps=[], pingInterval=0))
+        module = SlowReplyModule(irc, '!', 'slow')
+        module.startListening()
+        self.addCleanup(module.stopListening)
+        task = asyncio.ensure_future(irc.connect())
+        self.addCleanup(task.cancel)
+        self.addCleanup(irc._stopWriter)
+        line, elapsed = await asyncio.wait_for(replied, 5)
+        await asyncio.wait_for(task, 5)
+        self.assertEqual(line, b'PRIVMSG #test :done\r\n')
+        self.assertIsNot(module.thread, threading.main_thread())
+        self.assertLess(elapsed, 1)
+
+
+    async def test_close_from_another_thread(self):
+        quit = asyncio.get_running_loop().create_future()
+
+        async def handle(reader, writer):
+            while not (await reader.readline()).startswith(b'NICK'):
+                pass
+            writer.write(b':server 376 bot :End of /MOTD command.\r\n')
+            line = await reader.readline()
+            while line and not line.startswith(b'QUIT'):
+                line = await reader.readline()
+            quit.set_result(line)
+            writer.close()
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+
+        irc = AsyncIRCSDK(IRCSDKConfig(host='127.0.0.1', port=server.sockets[0].getsockname()[1], nick='bot',
+                                       user='bot', realname='bot', caps=[], pingInterval=0, autoReconnect=True))
+        irc.event.on('message', lambda message: message.command == '376' and threading.Thread(target=irc.close).start())
+        task = asyncio.ensure_future(irc.connect())
+        self.addCleanup(task.cancel)
+        self.assertEqual(await asyncio.wait_for(quit, 5), b'QUIT :bot\r\n')
+        await asyncio.wait_for(task, 5)
+        self.assertIsNone(irc._writer)
+
+
+if __name__ == '__main__':
+    unittest.main()
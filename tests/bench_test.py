@@ -0,0 +1,99 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from benchmarks.harness import FakeIRCServer, selfSignedContext, traffic
+from benchmarks.harness.runner import compare
+from pyircsdk import IRCSDK, IRCSDKConfig
+
+
+class TestTraffic(unittest.TestCase):
+
+    def test_privmsg_storm(self):
+        lines = list(traffic.privmsgStorm(5, channels=2, users=3, text='hi'))
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[4], b':user1!user@host PRIVMSG #chan0 :hi 4\r\n')
+
+    def test_names_flood(self):
+        lines = list(traffic.namesFlood('bot', channels=2, members=45, perLine=30))
+        # two 353 lines and a 366 per channel
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[0].startswith(b':fake.server 353 bot = #chan0 :@user0 user1'))
+        self.assertEqual(lines[2], b':fake.server 366 bot #chan0 :End of /NAMES list.\r\n')
+
+    def test_netsplit_quits_then_rejoins(self):
+        lines = list(traffic.netsplit(users=40, channels=2))
+        self.assertEqual(lines[0], b':user0!user@host QUIT :hub.example.net leaf.example.net\r\n')
+        self.assertEqual(lines[40], b':user0!user@host JOIN #chan0\r\n')
+        self.assertTrue(lines[-1].startswith(b':leaf.example.net MODE #chan1 +o'))
+
+    def test_replay_skips_blank_lines(self):
+        with tempfile.NamedTemporaryFile('wb', delete=False) as log:
+            log.write(b':a!b@c PRIVMSG #x :hi\r\n\r\nPING :x\n')
+        self.addCleanup(os.unlink, log.name)
+        self.assertEqual(list(traffic.replay(log.name, loops=2)),
+                         [b':a!b@c PRIVMSG #x :hi\r\n', b'PING :x\r\n'] * 2)
+
+
+class TestFakeIRCServer(unittest.TestCase):
+
+    def run_client(self, server, **options):
+        """Connect a blocking IRCSDK to server and return the traffic lines it saw before the done marker"""
+        irc = IRCSDK(IRCSDKConfig(host='127.0.0.1', port=server.port, nick='bot', user='bot', realname='bot',
+                                  caps=[], sendRate=0, pingInterval=0, **options))
+        received = []
+        done = threading.Event()
+
+        def on_message(message):
+            if message.prefix == 'bench' and message.trailing == 'done':
+                done.set()
+            elif message.command in ('PRIVMSG', '353'):
+                received.append(message)
+        irc.event.on('message', on_message)
+        threading.Thread(target=irc.connect, daemon=True).start()
+        self.assertTrue(done.wait(10))
+        return received
+
+    def start(self, **options):
+        server = FakeIRCServer(**options).start_in_thread()
+        self.addCleanup(server.stop)
+        return server
+
+    def test_names_flood_over_a_socket(self):
+        server = self.start(traffic=lambda nick: traffic.namesFlood(nick, channels=20, members=300))
+        received = self.run_client(server)
+        self.assertEqual(len(received), 20 * 10)
+        self.assertEqual(received[0].params, ['bot', '=', '#chan0'])
+
+    def test_stamped_lines_keep_their_tags(self):
+        server = self.start(traffic=lambda nick: iter([b'@time=x :a!b@c PRIVMSG #x :hi\r\n']), stamp=True)
+        message, = self.run_client(server)
+        self.assertEqual(set(message.tags), {'+pyircsdk/sent', 'time'})
+        self.assertEqual(message.trailing, 'hi')
+
+    def test_dropped_client_reconnects_and_continues(self):
+        lines = traffic.privmsgStorm(1000)
+        server = self.start(traffic=lambda nick: lines, dropAfter=300)
+        received = self.run_client(server, autoReconnect=True, reconnectDelay=0.01)
+        self.assertEqual(len(received), 1000)
+        self.assertEqual(received[-1].trailing, 'storm payload line 999')
+        self.assertEqual(server.clients, 4)
+
+    def test_tls(self):
+        server = self.start(messages=500, sslContext=selfSignedContext())
+        received = self.run_client(server, ssl=True, allowAnySSL=True)
+        self.assertEqual(len(received), 500)
+
+
+class TestCompare(unittest.TestCase):
+
+    def test_flags_only_changes_beyond_tolerance(self):
+        baseline = {'lines_per_sec': 1000, 'latency_p50_ms': 1.0, 'latency_p99_ms': 2.0, 'max_rss_mb': 30}
+        result = {'lines_per_sec': 700, 'latency_p50_ms': 1.1, 'latency_p99_ms': 3.0, 'max_rss_mb': 20}
+        regressions = compare(result, baseline, 0.2)
+        self.assertEqual([r.split(':')[0] for r in regressions], ['lines_per_sec', 'latency_p99_ms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import base64
+import unittest
+from unittest.mock import MagicMock
+
+from pyircsdk import IRCSDK, IRCSDKConfig
+
+
+class TestCapNegotiator(unittest.TestCase):
+
+    def make(self, **kwargs):
+        config = dict(host='irc.example.com', port=6667, nick='bot', user='bot', realname='Bot', channel='#test',
+                      ssl=False, sendRate=0)
+        config.update(kwargs)
+        irc = IRCSDK(IRCSDKConfig(**config))
+        irc.irc = MagicMock()
+        irc._setup_listeners()
+        return irc
+
+    def sent(self, irc):
+        lines = [c[0][0].decode().rstrip('\r\n') for c in irc.irc.sendall.call_args_list]
+        irc.irc.sendall.reset_mock()
+        return lines
+
+    def feed(self, irc, *lines):
+        irc.handle_raw_message(''.join(line + '\r\n' for line in lines).encode())
+
+    def test_requests_offered_caps(self):
+        irc = self.make()
+        caps = []
+        irc.event.on('caps', lambda negotiator: caps.append(set(negotiator.enabled)))
+        irc.caps.start()
+        self.assertEqual(self.sent(irc), ['CAP LS 302'])
+
+        self.feed(irc, ':server CAP * LS * :multi-prefix sasl=PLAIN,EXTERNAL',
+                  ':server CAP * LS :server-time chghost')
+        self.assertEqual(self.sent(irc), ['CAP REQ :multi-prefix server-time'])
+        self.assertEqual(irc.caps.available['sasl'], 'PLAIN,EXTERNAL')
+
+        self.feed(irc, ':server CAP * ACK :multi-prefix server-time')
+        self.assertEqual(self.sent(irc), ['CAP END'])
+        self.assertTrue(irc.caps.has('server-time'))
+        self.assertEqual(caps, [{'multi-prefix', 'server-time'}])
+
+        self.feed(irc, ':server CAP bot DEL :server-time', ':server CAP bot NEW :away-notify')
+        self.assertFalse(irc.caps.has('server-time'))
+        self.assertEqual(self.sent(irc), ['CAP REQ :away-notify'])
+
+    def test_no_caps_wanted(self):
+        irc = self.make(caps=[])
+        irc.caps.start()
+        self.assertEqual(self.sent(irc), [])
+
+    def test_server_without_cap(self):
+        irc = self.make()
+        irc.caps.start()
+        self.feed(irc, ':server 421 * CAP :Unknown command')
+        self.assertFalse(irc.caps.negotiating)
+
+    def test_sasl_plain(self):
+        irc = self.make(caps=[], saslUsername='account', saslPassword='secret', nickservPassword='secret')
+        results = []
+        irc.event.on('sasl', results.append)
+        irc.caps.start()
+        self.feed(irc, ':server CAP * LS :sasl')
+        self.feed(irc, ':server CAP * ACK :sasl')
+        self.feed(irc, 'AUTHENTICATE +')
+        self.feed(irc, ':server 900 bot bot!bot@host account :You are now logged in as account',
+                  ':server 903 bot :SASL authentication successful')
+        payload = base64.b64encode(b'account\0account\0secret').decode()
+        self.assertEqual(self.sent(irc), ['CAP LS 302', 'CAP REQ :sasl', 'AUTHENTICATE PLAIN',
+                                          'AUTHENTICATE ' + payload, 'CAP END'])
+        self.assertEqual(results, [{'success': True, 'mechanism': 'PLAIN', 'account': 'account', 'reason': None}])
+
+        # Joined as soon as the welcome burst ends, without NickServ
+        self.feed(irc, ':server 001 bot :Welcome', ':server 005 bot CHANTYPES=# :are supported',
+                  ':server 251 bot :There are 3 users')
+        self.assertEqual(self.sent(irc), ['JOIN #test'])
+        self.feed(irc, ':server 376 bot :End of /MOTD command.')
+        self.assertEqual(self.sent(irc), [])
+
+    def test_sasl_long_payload_is_chunked(self):
+        irc = self.make(caps=[], saslPassword='x' * 292)
+        irc.caps.start()
+        self.feed(irc, ':server CAP * LS :sasl', ':server CAP * ACK :sasl', 'AUTHENTICATE +')
+        lines = self.sent(irc)[3:]
+        self.assertEqual([len(line) for line in lines], [len('AUTHENTICATE ') + 400, len('AUTHENTICATE +')])
+
+    def test_sasl_external(self):
+        irc = self.make(caps=[], saslMechanism='external')
+        irc.caps.start()
+        self.feed(irc, ':server CAP * LS :sasl=EXTERNAL', ':server CAP * ACK :sasl', 'AUTHENTICATE +',
+                  ':server 903 bot :SASL authentication successful')
+        self.assertEqual(self.sent(irc), ['CAP LS 302', 'CAP REQ :sasl', 'AUTHENTICATE EXTERNAL',
+                                          'AUTHENTICATE +', 'CAP END'])
+
+    def test_sasl_mechanism_not_offered(self):
+        irc = self.make(caps=[], saslPassword='secret')
+        results = []
+        irc.event.on('sasl', results.append)
+        irc.caps.start()
+        self.feed(irc, ':server CAP * LS :sasl=EXTERNAL', ':server CAP * ACK :sasl')
+        self.assertEqual(self.sent(irc)[-1], 'CAP END')
+        self.assertFalse(results[0]['success'])
+
+    def test_sasl_failure_falls_back_to_nickserv(self):
+        irc = self.make(caps=[], saslPassword='secret', nickservPassword='secret')
+        irc.caps.start()
+        self.feed(irc, ':server CAP * LS :sasl', ':server CAP * ACK :sasl', 'AUTHENTICATE +',
+                  ':server 904 bot :SASL authentication failed')
+        self.assertEqual(self.sent(irc)[-1], 'CAP END')
+        self.assertIsNone(irc.caps.account)
+
+        self.feed(irc, ':server 001 bot :Welcome', ':server 251 bot :There are 3 users')
+        self.assertEqual(self.sent(irc), [])
+        self.feed(irc, ':server 376 bot :End of /MOTD command.')
+        self.assertEqual(self.sent(irc), ['PRIVMSG nickserv :identify secret', 'JOIN #test'])
+
+    def test_reset_on_disconnect(self):
+        irc = self.make()
+        irc.caps.start()
+        self.feed(irc, ':server CAP * LS :server-time', ':server CAP * ACK :server-time')
+        irc._handle_disconnect()
+        self.assertEqual(irc.caps.enabled, set())
+        self.assertFalse(irc.caps.negotiating)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,17 @@
+import asyncio
+import time
 import unittest
-from unittest.mock import MagicMock
-from pyircsdk.event.event import Event
+from unittest.mock import MagicMock, patch
+
+from pyircsdk import IRCSDK
+from pyircsdk.event.event import AsyncEvent, Event
+
+
+class _NoScan(dict):
+    """Subscriptions that fail the test if anything iterates over all of them"""
+
+    def items(self):
+        raise AssertionError('scanned every subscription')
 
 
 class TestEventMethods(unittest.TestCase):
@@ -97,6 +108,256 @@ class TestEventMethods(unittest.TestCase):
         # Should not raise
         event.remove_all('nonexistent')
 
+    def test_priority_order(self):
+        event = Event()
+        calls = []
+        event.on('test', lambda data: calls.append('normal'))
+        event.on('test', lambda data: calls.append('high'), priority=10)
+        event.on('test', lambda data: calls.append('low'), priority=-1)
+        event.on('test', lambda data: calls.append('normal2'))
+        event.emit('test', None)
+        self.assertEqual(calls, ['high', 'normal', 'normal2', 'low'])
+
+    def test_once(self):
+        mock = MagicMock()
+        event = Event()
+        event.once('test', mock)
+        event.emit('test', 1)
+        event.emit('test', 2)
+        mock.assert_called_once_with(1)
+        self.assertEqual(event.listeners, {})
+
+    def test_off_by_handle(self):
+        mock1 = MagicMock()
+        mock2 = MagicMock()
+        event = Event()
+        handle = event.on('test', mock1)
+        event.on('test', mock1)
+        event.on('test', mock2)
+        self.assertTrue(event.off(handle))
+        self.assertFalse(event.off(handle))
+        event.emit('test', 'data')
+        mock1.assert_called_once_with('data')
+        mock2.assert_called_once_with('data')
+
+    def test_remove_takes_the_first_subscription_of_a_callback(self):
+        event = Event()
+        calls = []
+
+        class Unhashable:
+            __hash__ = None
+
+            def __init__(self, tag):
+                self.tag = tag
+
+            def __eq__(self, other):
+                return isinstance(other, Unhashable) and other.tag == self.tag
+
+            def __call__(self, data):
+                calls.append(self.tag)
+        first = event.on('test', calls.append, priority=1)
+        event.on('test', calls.append)
+        event.on('test', Unhashable('u'))
+        event.remove('test', calls.append)
+        event.remove('test', Unhashable('u'))
+        event.remove('test', Unhashable('u'))
+        self.assertFalse(event.off(first))
+        event.emit('test', 'x')
+        self.assertEqual(calls, ['x'])
+        event.remove_all('test')
+        event.remove('test', calls.append)
+        self.assertEqual(event._byCallback, {})
+
+    def test_listeners_is_a_read_only_snapshot(self):
+        event = Event()
+        first = event.on('test', print)
+        event.on('test', repr, priority=1)
+        event.on('join_*', print)
+        self.assertEqual(event.listeners, {'test': (repr, print)})
+        with self.assertRaises(TypeError):
+            event.listeners['other'] = [print]
+        with self.assertRaises(AttributeError):
+            event.listeners['test'].append(print)
+        event.off(first)
+        self.assertEqual(event.listeners, {'test': (repr,)})
+
+    def test_failing_listener_is_found_without_a_scan(self):
+        event = Event()
+        event.maxFailures = 2
+        for i in range(100):
+            event.on('other%d' % i, print)
+
+        def fail(data):
+            raise ValueError(data)
+        handle = event.once('test', fail)
+        pattern = event.on('te*', fail)
+        event._subscriptions = _NoScan(event._subscriptions)
+        event.emit('test', 1)
+        event.emit('test', 2)
+        self.assertIsNotNone(pattern.disabledUntil)
+        self.assertIsNone(handle.disabledUntil)  # once() took itself off before failing
+
+    def test_unsubscribe_during_emit_skips_nobody(self):
+        event = Event()
+        calls = []
+        handles = []
+
+        def first(data):
+            calls.append('first')
+            event.off(handles[0])
+            event.on('test', lambda data: calls.append('late'))
+        handles.append(event.on('test', first))
+        event.on('test', lambda data: calls.append('second'))
+        event.emit('test', None)
+        self.assertEqual(calls, ['first', 'second'])
+        event.emit('test', None)
+        self.assertEqual(calls, ['first', 'second', 'second', 'late'])
+
+    def test_wildcard(self):
+        mock = MagicMock()
+        event = Event()
+        event.emit('nickserv_identified', 'before')  # resolved and cached before the pattern exists
+        event.on('nickserv_*', mock)
+        event.emit('nickserv_identified', True)
+        event.emit('connected', 'x')
+        mock.assert_called_once_with(True)
+
+        star = MagicMock()
+        event.on('*', star, priority=1)
+        event.emit('connected', 'x')
+        star.assert_called_once_with('x')
+
+        event.remove_all('nickserv_*')
+        event.emit('nickserv_identified', True)
+        mock.assert_called_once_with(True)
+
+    def test_numeric_range(self):
+        errors = MagicMock()
+        event = Event()
+        event.on('400-599', errors)
+        for name in ('001', '372', '433', '599', '600', 'message'):
+            event.emit(name, name)
+        self.assertEqual([c[0][0] for c in errors.call_args_list], ['433', '599'])
+
+    def test_numerics_are_emitted_by_name(self):
+        irc = IRCSDK()
+        errors = []
+        irc.event.on('4??', errors.append)
+        irc.handle_raw_message(b':server 433 * bot :Nickname is already in use\r\n:server 001 bot :Hi\r\n')
+        self.assertEqual([message.command for message in errors], ['433'])
+
+    def test_numerics_without_listeners_are_not_emitted_again(self):
+        irc = IRCSDK()
+        with patch.object(irc.event, 'emit', wraps=irc.event.emit) as emit:
+            irc.handle_raw_message(b':server 433 * bot :Nickname is already in use\r\n')
+        self.assertEqual([c[0][0] for c in emit.call_args_list], ['message'])
+        self.assertFalse(irc.event.hasListeners('433'))
+        irc.event.on('4??', lambda message: None)
+        self.assertTrue(irc.event.hasListeners('433'))
+        self.assertFalse(irc.event.hasListeners('001'))
+
+    def test_listener_exception_is_isolated(self):
+        event = Event()
+        after = MagicMock()
+        errors = []
+        error = ValueError('boom')
+
+        def broken(data):
+            raise error
+        event.on('test', broken)
+        event.on('test', after)
+        event.on('error', errors.append)
+        with self.assertLogs('pyircsdk', 'ERROR'):
+            event.emit('test', 'data')
+        after.assert_called_once_with('data')
+        self.assertEqual(errors[0]['event'], 'test')
+        self.assertIs(errors[0]['error'], error)
+        self.assertIs(errors[0]['listener'].callback, broken)
+        self.assertEqual(errors[0]['data'], 'data')
+
+    def test_failing_error_listener_does_not_recurse(self):
+        event = Event()
+        event.on('error', lambda data: 1 / 0)
+        event.on('test', lambda data: 1 / 0)
+        with self.assertLogs('pyircsdk', 'ERROR') as logs:
+            event.emit('test', None)
+        self.assertEqual(len(logs.records), 2)
+
+    def test_circuit_breaker(self):
+        event = Event()
+        event.setBreaker(maxFailures=2, failureWindow=10, cooldown=0.05)
+        calls = []
+        disabled = []
+        enabled = []
+        event.on('listener_disabled', disabled.append)
+        event.on('listener_enabled', enabled.append)
+
+        def flaky(data):
+            calls.append(data)
+            raise RuntimeError(data)
+        handle = event.on('test', flaky)
+        with self.assertLogs('pyircsdk'):
+            for i in range(4):
+                event.emit('test', i)
+        self.assertEqual(calls, [0, 1])
+        self.assertEqual(disabled, [handle])
+
+        time.sleep(0.06)
+        with self.assertLogs('pyircsdk'):
+            event.emit('test', 4)
+        self.assertEqual(enabled, [handle])
+        self.assertEqual(calls, [0, 1, 4])
+
+    def test_breaker_exempt_listener(self):
+        event = Event()
+        event.setBreaker(maxFailures=1)
+        calls = []
+
+        def core(data):
+            calls.append(data)
+            raise RuntimeError(data)
+        event.on('test', core, breaker=False)
+        with self.assertLogs('pyircsdk'):
+            event.emit('test', 1)
+            event.emit('test', 2)
+        self.assertEqual(calls, [1, 2])
+
+    def test_latency_budget(self):
+        event = Event()
+        event.setBreaker(maxFailures=2, latencyBudget=0.001)
+        calls = []
+        event.on('test', lambda data: calls.append(time.sleep(0.005)))
+        with self.assertLogs('pyircsdk', 'WARNING'):
+            for _ in range(3):
+                event.emit('test', None)
+        self.assertEqual(len(calls), 2)
+
+    def test_async_listener_failure_is_reported(self):
+        event = AsyncEvent()
+        errors = []
+        event.on('error', errors.append)
+
+        async def broken(data):
+            raise ValueError(data)
+
+        async def main():
+            event.emit('test', 'data')
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+        event.on('test', broken)
+        with self.assertLogs('pyircsdk', 'ERROR'):
+            asyncio.run(main())
+        self.assertEqual(errors[0]['data'], 'data')
+
+    def test_broken_module_keeps_connection_alive(self):
+        irc = IRCSDK()
+        irc.irc = MagicMock()
+        irc.event.on('raw', irc.handle_raw_message, breaker=False)
+        irc.event.on('message', lambda message: 1 / 0)
+        with self.assertLogs('pyircsdk', 'ERROR'):
+            irc.event.emit('raw', b'PING :server\r\n')
+        irc.irc.sendall.assert_called_once_with(b'PONG server\r\n')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,137 @@
+import socket
+import unittest
+from unittest.mock import MagicMock
+
+from pyircsdk import IRCSDK, IRCSDKConfig
+from pyircsdk.framer import LineFramer, RecvBuffer, readable
+
+
+class TestLineFramerMethods(unittest.TestCase):
+
+    def test_feed_complete_lines(self):
+        framer = LineFramer()
+        self.assertEqual(framer.feed(b'PING :a\r\nPING :b\r\n'), ['PING :a', 'PING :b'])
+        self.assertEqual(framer.pending(), b'')
+
+    def test_feed_partial_line(self):
+        framer = LineFramer()
+        self.assertEqual(framer.feed(b'PING :ser'), [])
+        self.assertEqual(framer.pending(), b'PING :ser')
+        self.assertEqual(framer.feed(b'ver\r\n'), ['PING :server'])
+
+    def test_bare_newline_and_empty_lines(self):
+        framer = LineFramer()
+        self.assertEqual(framer.feed(b'a\n\r\n\nb\r\n'), ['a', 'b'])
+
+    def test_crlf_split_across_chunks(self):
+        framer = LineFramer()
+        self.assertEqual(framer.feed(b'PING :x\r'), [])
+        self.assertEqual(framer.feed(b'\nPING :y\r\n'), ['PING :x', 'PING :y'])
+
+    def test_multibyte_character_split_across_chunks(self):
+        framer = LineFramer()
+        data = 'PRIVMSG #c :你好\r\n'.encode('utf-8')
+        split = data.index('你'.encode('utf-8')) + 1
+        self.assertEqual(framer.feed(data[:split]), [])
+        self.assertEqual(framer.feed(data[split:]), ['PRIVMSG #c :你好'])
+
+    def test_invalid_utf8_uses_latin1_fallback(self):
+        framer = LineFramer()
+        self.assertEqual(framer.feed(b'PRIVMSG #c :caf\xe9\r\n'), ['PRIVMSG #c :café'])
+
+    def test_invalid_utf8_with_error_handler_fallback(self):
+        framer = LineFramer(fallback='surrogateescape')
+        line = framer.feed(b'PRIVMSG #c :caf\xe9\r\n')[0]
+        self.assertEqual(line.encode('utf-8', 'surrogateescape'), b'PRIVMSG #c :caf\xe9')
+
+    def test_unknown_fallback_raises(self):
+        with self.assertRaises(LookupError):
+            LineFramer(fallback='no-such-codec')
+
+    def test_overlong_complete_line_dropped(self):
+        framer = LineFramer(maxLength=10)
+        self.assertEqual(framer.feed(b'x' * 20 + b'\r\nPING :a\r\n'), ['PING :a'])
+        self.assertEqual(framer.dropped, 1)
+
+    def test_overlong_partial_line_discarded_until_newline(self):
+        framer = LineFramer(maxLength=10)
+        self.assertEqual(framer.feed(b'x' * 20), [])
+        self.assertEqual(framer.pending(), b'')
+        self.assertEqual(framer.feed(b'x' * 5 + b'\r\nPING :a\r\n'), ['PING :a'])
+        self.assertEqual(framer.dropped, 1)
+
+    def test_reset(self):
+        framer = LineFramer()
+        framer.feed(b'PING :partial')
+        framer.reset()
+        self.assertEqual(framer.feed(b'PING :a\r\n'), ['PING :a'])
+
+
+class TestRecvBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.client, self.server = socket.socketpair()
+        self.addCleanup(self.client.close)
+        self.addCleanup(self.server.close)
+
+    def test_drains_everything_ready_in_one_batch(self):
+        for i in range(10):
+            self.server.sendall(b'PING :%d\r\n' % i)
+        buffer = RecvBuffer(size=4096)
+        data = buffer.fill(self.client, readable(self.client))
+        self.assertEqual(data, b''.join(b'PING :%d\r\n' % i for i in range(10)))
+
+    def test_grows_when_full_and_shrinks_when_idle(self):
+        buffer = RecvBuffer(size=4096, minSize=4096, maxSize=16384, shrinkAfter=2)
+        self.server.sendall(b'x' * (4096 + 8192 + 16384))
+        self.assertEqual(len(buffer.fill(self.client, readable(self.client))), 4096)
+        self.assertEqual(buffer.size, 8192)
+        self.assertEqual(len(buffer.fill(self.client, readable(self.client))), 8192)
+        self.assertEqual(buffer.size, 16384)
+        buffer.fill(self.client, readable(self.client))
+        self.assertEqual(buffer.size, 16384)
+
+        for _ in range(2):
+            self.server.sendall(b'PING :x\r\n')
+            buffer.fill(self.client, readable(self.client))
+        self.assertEqual(buffer.size, 8192)
+
+    def test_nonblocking_drain_and_close(self):
+        self.client.setblocking(False)
+        buffer = RecvBuffer()
+        with self.assertRaises(BlockingIOError):
+            buffer.fill(self.client)
+        self.server.sendall(b'PING :a\r\n')
+        self.server.sendall(b'PING :b\r\n')
+        self.assertEqual(buffer.fill(self.client), b'PING :a\r\nPING :b\r\n')
+        self.server.close()
+        self.assertEqual(buffer.fill(self.client), b'')
+
+    def test_close_after_data_is_kept_for_the_next_fill(self):
+        self.server.sendall(b'PING :a\r\n')
+        self.server.close()
+        buffer = RecvBuffer()
+        self.assertEqual(buffer.fill(self.client, readable(self.client)), b'PING :a\r\n')
+        self.assertTrue(buffer.eof)
+        self.assertEqual(buffer.fill(self.client, readable(self.client)), b'')
+        self.assertFalse(buffer.eof)
+
+
+class TestIRCSDKFraming(unittest.TestCase):
+
+    def test_config_controls_framer(self):
+        config = IRCSDKConfig(host='irc.example.com', port=6667, ssl=False,
+                              encodingFallback='replace', maxLineLength=100)
+        irc = IRCSDK(config)
+        irc.irc = MagicMock()
+        received = []
+        irc.event.on('message', received.append)
+
+        irc.handle_raw_message(b'PRIVMSG #c :' + b'x' * 200 + b'\r\nPRIVMSG #c :caf\xe9\r\n')
+
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0].message, 'caf�')
+
+
+if __name__ == '__main__':
+    unittest.main()
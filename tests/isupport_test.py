@@ -0,0 +1,134 @@
+import unittest
+from unittest.mock import MagicMock
+
+from pyircsdk import IRCSDK, IRCSDKConfig
+from pyircsdk.isupport import ISupport
+
+
+class TestISupport(unittest.TestCase):
+
+    def test_defaults(self):
+        isupport = ISupport()
+        self.assertEqual(isupport.casemapping, 'rfc1459')
+        self.assertEqual(isupport.chantypes, '#&+!')
+        self.assertEqual(isupport.prefix, ('ov', '@+'))
+        self.assertEqual(isupport.linelen, 512)
+        self.assertEqual(isupport.maxTargets('PRIVMSG'), 1)
+        self.assertIsNone(isupport.maxTargets('JOIN'))
+
+    def test_update(self):
+        isupport = ISupport()
+        isupport.update(['CASEMAPPING=ascii', 'CHANTYPES=#', 'PREFIX=(qaohv)~&@%+', 'CHANMODES=beI,k,l,imnpst',
+                         'NETWORK=Example\\x20Net', 'EXCEPTS', 'LINELEN=1024', 'CHANNELLEN=32',
+                         'TARGMAX=PRIVMSG:4,NOTICE:3,JOIN:,KICK:1'])
+        self.assertEqual(isupport.casemapping, 'ascii')
+        self.assertEqual(isupport.fold('Nick[1]'), 'nick[1]')
+        self.assertEqual(isupport.chantypes, '#')
+        self.assertEqual(isupport.prefix, ('qaohv', '~&@%+'))
+        self.assertEqual(isupport.network, 'Example Net')
+        self.assertEqual(isupport.get('EXCEPTS'), '')
+        self.assertEqual(isupport.linelen, 1024)
+        self.assertEqual(isupport.channellen, 32)
+        self.assertEqual(isupport.maxTargets('privmsg'), 4)
+        self.assertEqual(isupport.maxTargets('NOTICE'), 3)
+        self.assertIsNone(isupport.maxTargets('JOIN'))
+
+        isupport.update(['-CHANTYPES', '-TARGMAX', 'MAXTARGETS=2'])
+        self.assertEqual(isupport.chantypes, '#&+!')
+        self.assertEqual(isupport.maxTargets('PRIVMSG'), 2)
+
+        isupport.clear()
+        self.assertEqual(isupport.tokens, {})
+        self.assertEqual(isupport.linelen, 512)
+
+    def test_pack_targets_by_count(self):
+        isupport = ISupport()
+        isupport.update(['TARGMAX=JOIN:2,PRIVMSG:3'])
+        self.assertEqual(isupport.packTargets('JOIN', ['#a', '#b', '#c']), ['JOIN #a,#b\r\n', 'JOIN #c\r\n'])
+        self.assertEqual(isupport.packTargets('PRIVMSG', ['a', 'b', 'c', 'd'], 'hi'),
+                         ['PRIVMSG a,b,c :hi\r\n', 'PRIVMSG d :hi\r\n'])
+
+    def test_pack_targets_by_length(self):
+        isupport = ISupport()
+        channels = ['#channel%03d' % i for i in range(100)]
+        lines = isupport.packTargets('JOIN', channels)
+        self.assertGreater(len(lines), 1)
+        for line in lines:
+            self.assertLessEqual(len(line.encode()), 512)
+        self.assertEqual(','.join(line[5:-2] for line in lines), ','.join(channels))
+
+
+class TestIRCSDKISupport(unittest.TestCase):
+
+    def setUp(self):
+        self.irc = IRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, nick='bot', ssl=False, sendRate=0,
+                                       trackState=True))
+        self.irc.irc = MagicMock()
+
+    def sent(self):
+        return [c[0][0].decode() for c in self.irc.irc.sendall.call_args_list]
+
+    def test_005_updates_model_and_state(self):
+        seen = []
+        self.irc.event.on('isupport', seen.append)
+        self.irc.handle_raw_message(b':server 005 bot CASEMAPPING=ascii LINELEN=2048 :are supported\r\n')
+        self.assertEqual(seen, [self.irc.isupport])
+        self.assertEqual(self.irc.casefold('A[b]'), 'a[b]')
+        self.assertEqual(self.irc.state.casemapping, 'ascii')
+        self.assertEqual(self.irc._framer.maxLength, 2048 + 8191)
+
+    def test_join_uses_chantypes(self):
+        self.irc.handle_raw_message(b':server 005 bot CHANTYPES=& CHANNELLEN=8 :are supported\r\n')
+        self.irc.join('test')
+        errors = []
+        self.irc.event.on('join_error', errors.append)
+        self.irc.join('&waytoolong')
+        self.assertEqual(self.sent(), ['JOIN &test\r\n'])
+        self.assertEqual(errors[0]['code'], 'INVALID')
+
+    def test_join_channels_batches(self):
+        self.irc.handle_raw_message(b':server 005 bot TARGMAX=JOIN:2 :are supported\r\n')
+        self.irc._join_channels(['#a', 'b', '#c', 'bad channel'])
+        self.assertEqual(self.sent(), ['JOIN #a,#b\r\n', 'JOIN #c\r\n'])
+
+    def test_join_many_with_keys(self):
+        self.irc.join_many(['#a', '#b', 'c'], {'#b': 'secret', 'c': 'pw'})
+        self.assertEqual(self.sent(), ['JOIN #b,#c,#a secret,pw\r\n'])
+
+    def test_join_many_splits_on_length(self):
+        channels = ['#channel%03d' % i for i in range(200)]
+        self.irc.join_many(channels, ['key%d' % i for i in range(200)])
+        lines = self.sent()
+        self.assertGreater(len(lines), 1)
+        joined = []
+        for line in lines:
+            self.assertLessEqual(len(line.encode()), 512)
+            names, keys = line[5:-2].split(' ')
+            self.assertEqual(len(names.split(',')), len(keys.split(',')))
+            joined.extend(names.split(','))
+        self.assertEqual(joined, channels)
+
+    def test_privmsg_many(self):
+        self.irc.handle_raw_message(b':server 005 bot TARGMAX=PRIVMSG:2 :are supported\r\n')
+        self.irc.privmsg_many(['#a', '#b', 'nick'], 'one\ntwo')
+        self.assertEqual(self.sent(), ['PRIVMSG #a,#b :one\r\n', 'PRIVMSG nick :one\r\n',
+                                       'PRIVMSG #a,#b :two\r\n', 'PRIVMSG nick :two\r\n'])
+
+    def test_privmsg_splits_long_text(self):
+        text = ' '.join(['wörd'] * 300)
+        self.irc.privmsg('#test', text)
+        lines = self.sent()
+        self.assertGreater(len(lines), 1)
+        for line in lines:
+            # Leave room for the ':nick!~user@host ' prefix the server adds when relaying
+            self.assertLessEqual(len(line.encode()) + len(':bot!~bot@') + 63 + 1, 512)
+        self.assertEqual(' '.join(line[len('PRIVMSG #test :'):-2] for line in lines), text)
+
+    def test_cleared_on_disconnect(self):
+        self.irc.handle_raw_message(b':server 005 bot CHANTYPES=& :are supported\r\n')
+        self.irc._handle_disconnect()
+        self.assertEqual(self.irc.isupport.chantypes, '#&+!')
+
+
+if __name__ == '__main__':
+    unittest.main()
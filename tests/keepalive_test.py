@@ -0,0 +1,89 @@
+import socket
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from pyircsdk import IRCSDK, IRCSDKConfig
+from pyircsdk.keepalive import Keepalive
+
+
+class TestKeepalive(unittest.TestCase):
+
+    def test_check(self):
+        keepalive = Keepalive(IRCSDKConfig(pingInterval=10, pingTimeout=5))
+        keepalive.reset(100.0)
+        self.assertEqual(keepalive.check(104.0), (None, 6.0))
+        self.assertEqual(keepalive.check(110.0), ('ping', 5.0))
+        token = keepalive.ping(110.0)
+        self.assertEqual(keepalive.check(112.0), (None, 3.0))
+        self.assertEqual(keepalive.check(115.0), ('dead', None))
+
+        keepalive.lastReceived = 112.5
+        self.assertEqual(keepalive.pong('other', 112.5), None)
+        self.assertEqual(keepalive.pong(token, 112.5), 2.5)
+        self.assertEqual(keepalive.rtt, 2.5)
+        self.assertEqual(keepalive.check(123.0), ('ping', 4.5))
+
+    def test_defaults_and_nodata_timeout(self):
+        keepalive = Keepalive()
+        self.assertEqual((keepalive.interval, keepalive.timeout), (60.0, 30.0))
+        keepalive = Keepalive(IRCSDKConfig(nodataTimeout=120))
+        self.assertEqual((keepalive.interval, keepalive.timeout), (60.0, 60.0))
+        keepalive = Keepalive(IRCSDKConfig(pingInterval=0))
+        keepalive.reset(0.0)
+        self.assertEqual(keepalive.check(1e9), (None, None))
+
+
+class TestIRCSDKPing(unittest.TestCase):
+
+    def setUp(self):
+        self.irc = IRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, nick='bot', ssl=False, sendRate=0))
+        self.irc.irc = MagicMock()
+
+    def sent(self):
+        return [c[0][0] for c in self.irc.irc.sendall.call_args_list]
+
+    def test_pong_goes_out_before_listeners_run(self):
+        seenBefore = []
+        self.irc.event.on('message', lambda message: seenBefore.append(list(self.sent())))
+        self.irc.handle_raw_message(b':nick!u@h PRIVMSG #c :hello\r\nPING :token\r\n')
+        self.assertEqual(seenBefore[0], [b'PONG token\r\n'])
+        self.assertEqual(self.sent(), [b'PONG token\r\n'])
+
+    def test_prefixed_tagged_and_split_pings(self):
+        self.irc.handle_raw_message(b':server PING :one\r\n@time=x PING :two\r\nPI')
+        self.irc.handle_raw_message(b'NG three\r\n')
+        self.assertEqual(self.sent(), [b'PONG one\r\n', b'PONG two\r\n', b'PONG three\r\n'])
+
+    def test_ping_text_is_not_a_ping(self):
+        self.irc.handle_raw_message(b':nick!u@h PRIVMSG #c :PING me\r\n')
+        self.assertEqual(self.sent(), [])
+
+    def test_rtt(self):
+        self.irc.enableMetrics()
+        latencies = []
+        self.irc.event.on('latency', latencies.append)
+        self.irc.keepalive.reset(0.0)
+        self.assertEqual(self.irc._keepalive(60.0), (True, 30.0))
+        self.assertEqual(self.sent(), [b'PING :pyircsdk-1\r\n'])
+        self.irc.handle_raw_message(b':server PONG server :pyircsdk-1\r\n')
+        self.assertEqual(len(latencies), 1)
+        self.assertEqual(self.irc.getMetrics()['histograms']['ping_rtt_seconds']['count'], 1)
+
+    def test_dead_connection_ends_startRecv(self):
+        irc = IRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, nick='bot', ssl=False,
+                                  pingInterval=0.05, pingTimeout=0.05))
+        irc.irc, server = socket.socketpair()
+        irc.keepalive.reset(time.monotonic())
+        thread = threading.Thread(target=irc.startRecv, daemon=True)
+        with self.assertLogs('pyircsdk', 'WARNING'):
+            thread.start()
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(server.recv(100), b'PING :pyircsdk-1\r\n')
+        server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
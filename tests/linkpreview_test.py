@@ -0,0 +1,257 @@
+import asyncio
+import socket
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+
+from pyircsdk import AsyncIRCSDK, IRCSDK, IRCSDKConfig
+from pyircsdk.linkpreview import ConnectionPool, LinkPreview, TitleFetcher, TTLCache, extractTitle, normalizeUrl
+from pyircsdk.parser import parse
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.hits[self.path] = server.hits.get(self.path, 0) + 1
+        server.connections.add(self.client_address)
+        server.hosts.append(self.headers['Host'])
+        if self.path == '/slow':
+            time.sleep(0.3)
+        if self.path == '/redirect':
+            self.send(301, b'', location='/page')
+        elif self.path == '/big':
+            # the title is followed by 1 MB the fetcher should never read
+            self.send(200, b'<html><head><title>Big</title></head>' + b'x' * (1 << 20))
+        elif self.path == '/late':
+            self.send(200, b'<html>' + b' ' * 65536 + b'<title>Too late</title>')
+        elif self.path == '/latin1':
+            self.send(200, '<title>Caf\xe9 &amp; co</title>'.encode('latin-1'), 'text/html; charset=iso-8859-1')
+        elif self.path == '/image':
+            self.send(200, b'GIF89a', 'image/gif')
+        elif self.path == '/missing':
+            self.send(404, b'<title>Not found</title>')
+        else:
+            self.send(200, b'<html><head><title>\n  Page %s\n</title></head></html>' % self.path.encode())
+
+    def send(self, status, body, contentType='text/html', location=None):
+        self.send_response(status)
+        self.send_header('Content-Type', contentType)
+        self.send_header('Content-Length', str(len(body)))
+        if location:
+            self.send_header('Location', location)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except ConnectionError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHelpers(unittest.TestCase):
+
+    def test_normalize_url(self):
+        self.assertEqual(normalizeUrl('HTTP://Example.COM:80'), 'http://example.com/')
+        self.assertEqual(normalizeUrl('https://u:p@example.com:8443/a?b=1#frag'), 'https://example.com:8443/a?b=1')
+        self.assertEqual(normalizeUrl('https://example.com/page.'), 'https://example.com/page')
+        self.assertEqual(normalizeUrl('https://en.wikipedia.org/wiki/Foo_(bar)'),
+                         'https://en.wikipedia.org/wiki/Foo_(bar)')
+        self.assertEqual(normalizeUrl('https://example.com/x)'), 'https://example.com/x')
+        self.assertIsNone(normalizeUrl('ftp://example.com/'))
+        self.assertIsNone(normalizeUrl('http://[bad/'))
+
+    def test_extract_title(self):
+        self.assertEqual(extractTitle(b'<TITLE lang="en">  A\n &lt;b&gt;\x01 </TITLE>'), 'A <b>')
+        self.assertEqual(extractTitle(b'<meta charset="windows-1252"><title>\x93q\x94</title>'), '“q”')
+        self.assertIsNone(extractTitle(b'<title></title>'))
+        self.assertIsNone(extractTitle(b'<html>no title'))
+
+    def test_ttl_cache_expires_and_evicts_least_recently_used(self):
+        now = [0.0]
+        cache = TTLCache(maxSize=2, ttl=10, clock=lambda: now[0])
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)  # evicts b, used less recently than a
+        self.assertIsNone(cache.get('b'))
+        now[0] = 10.0
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 1)
+
+
+class TestTitleFetcher(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+        self.server.daemon_threads = True
+        self.server.hits = {}
+        self.server.connections = set()
+        self.server.hosts = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.fetcher = TitleFetcher(allowPrivate=True, maxBytes=16384)
+        self.addCleanup(self.fetcher.close)
+        self.base = 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def title(self, path):
+        return self.fetcher.fetch(self.base + path).result(5)
+
+    def test_titles(self):
+        self.assertEqual(self.title('/page'), 'Page /page')
+        self.assertEqual(self.title('/redirect'), 'Page /page')
+        self.assertEqual(self.title('/latin1'), 'Caf\xe9 & co')
+        self.assertEqual(self.title('/big'), 'Big')
+        self.assertIsNone(self.title('/late'))
+        self.assertIsNone(self.title('/image'))
+        self.assertIsNone(self.title('/missing'))
+
+    def test_cache_and_keep_alive(self):
+        for _ in range(3):
+            self.assertEqual(self.title('/a'), 'Page /a')
+        self.assertEqual(self.title('/b#section'), 'Page /b')
+        self.assertEqual(self.server.hits, {'/a': 1, '/b': 1})
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_concurrent_fetches_share_one_request(self):
+        futures = [self.fetcher.fetch(self.base + '/slow') for _ in range(10)]
+        self.assertEqual({future.result(5) for future in futures}, {'Page /slow'})
+        self.assertEqual(self.server.hits['/slow'], 1)
+        self.assertEqual(self.fetcher.requests, 1)
+
+    def test_refuses_private_addresses(self):
+        fetcher = TitleFetcher()
+        self.addCleanup(fetcher.close)
+        self.assertIsNone(fetcher.fetch(self.base + '/page').result(5))
+        self.assertEqual(self.server.hits, {})
+
+    def test_connects_to_the_checked_address(self):
+        # A rebinding host: public for the check, this test server for any later lookup
+        port = self.server.server_address[1]
+        answers = [[(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('93.184.216.34', port))]]
+        getaddrinfo = socket.getaddrinfo
+        createConnection = socket.create_connection
+        connected = []
+
+        def rebinding(host, *args, **kwargs):
+            if host != 'rebind.example':
+                return getaddrinfo(host, *args, **kwargs)
+            return answers.pop() if answers else getaddrinfo('127.0.0.1', *args, **kwargs)
+
+        def create_connection(address, *args, **kwargs):
+            connected.append(address)
+            if address[0] == '93.184.216.34':
+                raise ConnectionRefusedError('not going out to the internet')
+            return createConnection(address, *args, **kwargs)
+
+        fetcher = TitleFetcher()
+        self.addCleanup(fetcher.close)
+        with patch('socket.getaddrinfo', rebinding), patch('socket.create_connection', create_connection):
+            self.assertIsNone(fetcher.fetch('http://rebind.example:%d/page' % port).result(5))
+        self.assertEqual(connected, [('93.184.216.34', port)])
+        self.assertEqual(self.server.hits, {})
+
+    def test_pinned_connection_keeps_the_host_header(self):
+        pool = ConnectionPool()
+        connection, _ = pool.get(('http', 'rebind.example', 80), [('127.0.0.1', self.server.server_address[1])])
+        connection.request('GET', '/page')
+        self.assertEqual(connection.getresponse().status, 200)
+        connection.close()
+        self.assertEqual(self.server.hosts, ['rebind.example'])
+
+
+class TestLinkPreview(unittest.TestCase):
+
+    def setUp(self):
+        self.irc = IRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, ssl=False))
+        self.irc.irc = MagicMock()
+        self.irc.privmsg = MagicMock()
+        self.fetcher = MagicMock()
+        self.fetcher.fetch.side_effect = self.fetch
+        self.module = LinkPreview(self.irc, self.fetcher)
+        self.module.startListening()
+
+    def fetch(self, url):
+        future = Future()
+        future.set_result('T ' + url)
+        return future
+
+    def receive(self, line):
+        self.irc.handle_raw_message(line.encode() + b'\r\n')
+
+    def test_previews_every_link_once(self):
+        self.receive(':nick!u@h PRIVMSG #chan :see http://a.example/x, HTTP://A.example/x and https://b.example')
+        self.assertEqual([c.args for c in self.irc.privmsg.call_args_list],
+                         [('#chan', 'Title: T http://a.example/x'), ('#chan', 'Title: T https://b.example/')])
+
+    def test_private_message_answers_sender(self):
+        self.receive(':nick!u@h PRIVMSG bot :http://a.example/')
+        self.irc.privmsg.assert_called_once_with('nick', 'Title: T http://a.example/')
+
+    def test_rate_limited_per_channel(self):
+        for i in range(5):
+            self.receive(':nick!u@h PRIVMSG #chan :http://a.example/%d' % i)
+        self.receive(':nick!u@h PRIVMSG #other :http://a.example/')
+        targets = [c.args[0] for c in self.irc.privmsg.call_args_list]
+        self.assertEqual(targets, ['#chan'] * LinkPreview.channelBurst + ['#other'])
+
+    def test_ignores_text_without_links(self):
+        self.module.handleCommand(parse(':nick!u@h PRIVMSG #chan :no links here'), None)
+        self.fetcher.fetch.assert_not_called()
+
+    def test_fetch_errors_are_logged(self):
+        failed = Future()
+        failed.set_exception(OSError('unreachable'))
+        self.fetcher.fetch.side_effect = lambda url: failed
+        with self.assertLogs('pyircsdk', 'WARNING') as logs:
+            self.receive(':nick!u@h PRIVMSG #chan :http://a.example/')
+        self.irc.privmsg.assert_not_called()
+        self.assertIn('unreachable', logs.output[0])
+
+    def test_idle_buckets_are_pruned(self):
+        self.module.channelRate = 1000  # refills within a few milliseconds
+        for i in range(50):
+            self.receive(':nick!u@h PRIVMSG #c%d :http://a.example/' % i)
+        self.assertEqual(len(self.module._buckets), 50)
+        time.sleep(0.01)
+        self.module._nextPrune = 0
+        self.receive(':nick!u@h PRIVMSG #last :http://a.example/')
+        self.assertEqual(list(self.module._buckets), [(id(self.irc), '#last')])
+
+
+class TestLinkPreviewAsync(unittest.TestCase):
+
+    def test_reply_from_the_fetcher_thread_runs_on_the_loop(self):
+        async def main():
+            irc = AsyncIRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, nick='bot', user='bot'))
+            irc._loop, irc._loopThread = asyncio.get_running_loop(), threading.get_ident()  # as connect() does
+            sent = asyncio.Event()
+            threads = []
+
+            def sendNow(data):
+                threads.append((data, threading.current_thread()))
+                sent.set()
+            irc._sendNow = sendNow
+            fetcher = MagicMock()
+
+            def fetch(url):
+                future = Future()
+                threading.Timer(0.05, future.set_result, ('Page',)).start()
+                return future
+            fetcher.fetch.side_effect = fetch
+            LinkPreview(irc, fetcher).startListening()
+            irc.handle_raw_message(b':nick!u@h PRIVMSG #chan :http://a.example/\r\n')
+            await asyncio.wait_for(sent.wait(), 5)
+            return threads
+
+        self.assertEqual(asyncio.run(main()), [(b'PRIVMSG #chan :Title: Page\r\n', threading.current_thread())])
+
+
+if __name__ == '__main__':
+    unittest.main()
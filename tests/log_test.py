@@ -0,0 +1,99 @@
+import logging
+import unittest
+from logging.handlers import QueueHandler
+from unittest.mock import MagicMock
+
+from pyircsdk import IRCSDK, IRCSDKConfig, setupLogging
+from pyircsdk.log import ConnectionLogger, StructuredFormatter, stopLogging
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestLogMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = ListHandler()
+
+    def tearDown(self):
+        stopLogging()
+        logging.getLogger('pyircsdk').setLevel(logging.NOTSET)
+
+    def make_irc(self, host, **kwargs):
+        irc = IRCSDK(IRCSDKConfig(host=host, port=6667, nick='testbot', user='testuser', **kwargs))
+        irc.irc = MagicMock()
+        return irc
+
+    def test_connection_logger_fields(self):
+        setupLogging(logging.DEBUG, self.handler)
+        log = ConnectionLogger('irc.fields.test')
+        log.info('joined', extra={'channel': '#test', 'command': 'JOIN'})
+        log.info('plain')
+        stopLogging()
+
+        joined, plain = self.handler.records
+        self.assertEqual(joined.name, 'pyircsdk.irc.fields.test')
+        self.assertEqual((joined.network, joined.channel, joined.command), ('irc.fields.test', '#test', 'JOIN'))
+        self.assertEqual((plain.network, plain.channel, plain.command), ('irc.fields.test', None, None))
+
+    def test_structured_formatter(self):
+        log = ConnectionLogger('irc.format.test')
+        record = log.logger.makeRecord(log.logger.name, logging.INFO, __file__, 1, 'hello %s', ('world',), None,
+                                       extra={'network': 'irc.format.test', 'channel': '#test', 'command': None})
+        text = StructuredFormatter('%(message)s').format(record)
+        self.assertEqual(text, 'hello world network=irc.format.test channel=#test')
+
+    def test_join_warning_has_channel(self):
+        setupLogging(logging.INFO, self.handler)
+        irc = self.make_irc('irc.join.test')
+        irc.join('test')
+        stopLogging()
+
+        record, = self.handler.records
+        self.assertEqual(record.levelno, logging.WARNING)
+        self.assertEqual(record.channel, 'test')
+        self.assertEqual(record.command, 'JOIN')
+
+    def test_ping_logged_at_debug_only(self):
+        setupLogging(logging.INFO, self.handler)
+        irc = self.make_irc('irc.ping.test')
+        irc.handle_raw_message(b'PING :token\r\n')
+        stopLogging()
+        self.assertEqual(self.handler.records, [])
+
+        setupLogging(logging.DEBUG, self.handler)
+        irc.handle_raw_message(b'PING :token\r\n')
+        stopLogging()
+        record, = self.handler.records
+        self.assertEqual(record.getMessage(), 'PING token')
+        self.assertEqual(record.command, 'PING')
+
+    def test_per_connection_level(self):
+        setupLogging(logging.DEBUG, self.handler)
+        quiet = self.make_irc('irc.quiet.test', logLevel=logging.ERROR)
+        loud = self.make_irc('irc.loud.test')
+        quiet.join('')
+        loud.join('')
+        stopLogging()
+        logging.getLogger('pyircsdk.irc.quiet.test').setLevel(logging.NOTSET)
+
+        record, = self.handler.records
+        self.assertEqual(record.network, 'irc.loud.test')
+
+    def test_setup_replaces_previous(self):
+        setupLogging(logging.INFO, self.handler)
+        ConnectionLogger('irc.replace.test').info('hello')
+        setupLogging(logging.INFO, self.handler)  # stops, and so flushes, the first listener
+        self.assertEqual(len(self.handler.records), 1)
+        queueHandlers = [h for h in logging.getLogger('pyircsdk').handlers if isinstance(h, QueueHandler)]
+        self.assertEqual(len(queueHandlers), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+import socket
+import socketserver
+import threading
+import time
+import unittest
+from unittest import mock
+
+from pyircsdk import ConnectionManager, IRCSDKConfig, Module
+from pyircsdk import manager as manager_module
+
+
+class FakeIRCHandler(socketserver.StreamRequestHandler):
+    """Welcomes the client, sends one fantasy command and records what comes back"""
+
+    def handle(self):
+        server = self.server
+        nick = None
+        for line in self.rfile:
+            line = line.decode().strip()
+            server.lines.append(line)
+            if line.startswith('NICK '):
+                nick = line[5:]
+                self.wfile.write(b':server 376 %s :End of /MOTD command.\r\n' % nick.encode())
+                self.wfile.write(b':op!u@h PRIVMSG #test :!whoami\r\n')
+            if line.startswith('PRIVMSG') or line.startswith('QUIT') or line.startswith('NOTICE'):
+                server.done.release()
+            if server.hangup and line.startswith('JOIN'):
+                return
+
+
+class FakeIRCServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, hangup=False):
+        super().__init__(('127.0.0.1', 0), FakeIRCHandler)
+        self.lines = []
+        self.done = threading.Semaphore(0)
+        self.hangup = hangup
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class WhoAmIModule(Module):
+    ircCommands = ('PRIVMSG',)
+
+    def __init__(self):
+        super().__init__(None, '!', 'whoami')
+
+    def handleCommand(self, message, command):
+        self.irc.privmsg(message.messageTo, 'I am %s' % self.irc.config.nick)
+
+    def handleError(self, message, command, error):
+        raise error
+
+
+def make_config(port, nick, host='127.0.0.1', **kwargs):
+    return IRCSDKConfig(host=host, port=port, nick=nick, user='u', realname='r', channel='#test',
+                        ssl=False, sendRate=0, **kwargs)
+
+
+class TestConnectionManager(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeIRCServer()
+        self.manager = ConnectionManager()
+
+    def tearDown(self):
+        self.manager.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def run_manager(self):
+        thread = threading.Thread(target=self.manager.run, daemon=True)
+        thread.start()
+        return thread
+
+    def test_sessions_share_a_module(self):
+        self.manager.addModule(WhoAmIModule())
+        self.manager.add(make_config(self.server.port, 'bot1'))
+        self.manager.add(make_config(self.server.port, 'bot2'))
+        self.run_manager()
+
+        for _ in range(2):
+            self.assertTrue(self.server.done.acquire(timeout=5))
+        self.assertIn('PRIVMSG #test :I am bot1', self.server.lines)
+        self.assertIn('PRIVMSG #test :I am bot2', self.server.lines)
+        self.assertEqual(self.server.lines.count('JOIN #test'), 2)
+
+    def test_each_session_has_its_own_event_bus(self):
+        first = self.manager.add(make_config(self.server.port, 'bot1'))
+        second = self.manager.add(make_config(self.server.port, 'bot2'))
+        self.assertIsNot(first.event, second.event)
+
+    def test_close_sends_quit_and_finishes_run(self):
+        session = self.manager.add(make_config(self.server.port, 'bot1'))
+        session.event.on('message', lambda message: message.command == '376' and session.close())
+        thread = self.run_manager()
+
+        self.assertTrue(self.server.done.acquire(timeout=5))
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertIn('QUIT :bot1', self.server.lines)
+
+    def test_reconnects_after_server_hangup(self):
+        self.server.hangup = True
+        session = self.manager.add(make_config(self.server.port, 'bot1', autoReconnect=True, reconnectDelay=0.01))
+        connected = threading.Semaphore(0)
+        session.event.on('message', lambda message: message.command == '376' and connected.release())
+        self.run_manager()
+
+        self.assertTrue(connected.acquire(timeout=5))
+        self.assertTrue(connected.acquire(timeout=5))
+
+    def test_connect_failure_emits_connect_failed(self):
+        # Stop serve_forever first, or it can still accept on the port it is polling
+        self.server.shutdown()
+        self.server.server_close()
+        session = self.manager.add(make_config(self.server.port, 'bot1', connectRetries=1))
+        failed = []
+        session.event.on('connect_failed', failed.append)
+        thread = self.run_manager()
+
+        thread.join(5)
+        self.assertEqual(len(failed), 1)
+
+    def test_host_names_resolve_off_the_manager_thread(self):
+        session = self.manager.add(make_config(self.server.port, 'bot1', host='localhost'))
+        resolved = []
+        original = socket.getaddrinfo
+
+        def getaddrinfo(*args, **kwargs):
+            resolved.append(threading.current_thread().name)
+            return original(*args, **kwargs)
+        with mock.patch('socket.getaddrinfo', getaddrinfo):
+            session.event.on('message', lambda message: message.command == '376' and session.close())
+            thread = self.run_manager()
+            self.assertTrue(self.server.done.acquire(timeout=5))
+            thread.join(5)
+        self.assertIn('QUIT :bot1', self.server.lines)
+        self.assertTrue(any(name.startswith('pyircsdk-resolve') for name in resolved))
+
+    def test_sends_from_other_threads_wake_the_manager(self):
+        session = self.manager.add(make_config(self.server.port, 'bot1'))
+        connected = threading.Event()
+        session.event.on('message', lambda message: message.command == '376' and connected.set())
+        self.run_manager()
+        self.assertTrue(connected.wait(5))
+        time.sleep(0.1)  # let the manager go back to waiting on its selector
+        started = time.monotonic()
+        session.sendCommand('NOTICE', '#test', trailing='from a thread')
+        self.assertTrue(self.server.done.acquire(timeout=5))
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertIn('NOTICE #test :from a thread', self.server.lines)
+
+
+    def test_failing_callback_only_drops_its_session(self):
+        self.manager.addModule(WhoAmIModule())
+        first = self.manager.add(make_config(self.server.port, 'bot1'))
+        second = self.manager.add(make_config(self.server.port, 'bot2'))
+        disconnected = []
+        first.event.on('disconnected', disconnected.append)
+
+        def boom():
+            raise RuntimeError('boom')
+
+        first.event.on('message', lambda message: message.command == '376' and first._schedule(0, boom))
+        thread = self.run_manager()
+
+        for _ in range(2):
+            self.assertTrue(self.server.done.acquire(timeout=5))
+        self.manager.callSoon(boom)  # no session to drop: only logged
+        time.sleep(0.1)
+        self.assertTrue(thread.is_alive())
+        self.assertEqual(disconnected, ['Connection lost'])
+        self.assertEqual(first._state, manager_module._DONE)
+        second.sendCommand('NOTICE', '#test', trailing='still here')
+        self.assertTrue(self.server.done.acquire(timeout=5))
+        self.assertIn('NOTICE #test :still here', self.server.lines)
+
+    def test_falls_back_to_the_next_resolved_address(self):
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))  # bound but not listening: connections are refused
+        self.addCleanup(closed.close)
+        session = self.manager.add(make_config(self.server.port, 'bot1', host='irc.example.com', connectRetries=1))
+        original = socket.getaddrinfo
+
+        def getaddrinfo(host, port, *args, **kwargs):
+            if host != 'irc.example.com':
+                return original(host, port, *args, **kwargs)
+            refused = original('127.0.0.1', closed.getsockname()[1], type=socket.SOCK_STREAM)
+            return refused + original('127.0.0.1', port, type=socket.SOCK_STREAM)
+        with mock.patch('socket.getaddrinfo', getaddrinfo):
+            session.event.on('message', lambda message: message.command == '376' and session.close())
+            thread = self.run_manager()
+            self.assertTrue(self.server.done.acquire(timeout=5))
+            thread.join(5)
+        self.assertIn('QUIT :bot1', self.server.lines)
+        self.assertEqual(session.reconnectPolicy.failures, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
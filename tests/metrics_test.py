@@ -0,0 +1,120 @@
+import unittest
+import urllib.request
+from unittest.mock import MagicMock
+
+from pyircsdk import IRCSDK, IRCSDKConfig, Module
+from pyircsdk.event.event import Event
+from pyircsdk.metrics import Histogram, Metrics
+
+
+class TestMetricsMethods(unittest.TestCase):
+
+    def test_histogram(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2, 1])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 6.05)
+
+    def test_counters_and_labels(self):
+        metrics = Metrics(True)
+        metrics.inc('lines_received_total', 2)
+        metrics.inc('lines_received_total')
+        metrics.inc('handled_total', labels=(('module', 'Quit'),))
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters['lines_received_total'], 3)
+        self.assertEqual(counters['handled_total{module="Quit"}'], 1)
+
+    def test_exposition(self):
+        metrics = Metrics(True)
+        metrics.inc('bytes_received_total', 10)
+        metrics.observe('parse_seconds', 0.00002)
+        metrics.gauge('send_queue_depth', lambda: 4)
+        text = metrics.exposition()
+        self.assertIn('# TYPE pyircsdk_bytes_received_total counter', text)
+        self.assertIn('pyircsdk_bytes_received_total 10', text)
+        self.assertIn('pyircsdk_parse_seconds_bucket{le="5e-05"} 1', text)
+        self.assertIn('pyircsdk_parse_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn('pyircsdk_parse_seconds_count 1', text)
+        self.assertIn('pyircsdk_send_queue_depth 4', text)
+
+    def test_label_escaping(self):
+        metrics = Metrics(True)
+        metrics.inc('x_total', labels=(('listener', 'a"b\\c'),))
+        self.assertIn('pyircsdk_x_total{listener="a\\"b\\\\c"} 1', metrics.exposition())
+
+    def test_serve(self):
+        metrics = Metrics(True)
+        metrics.inc('reconnects_total')
+        server = metrics.serve(0)
+        try:
+            port = server.server_address[1]
+            body = urllib.request.urlopen('http://127.0.0.1:%d/metrics' % port, timeout=5).read().decode()
+            self.assertIn('pyircsdk_reconnects_total 1', body)
+        finally:
+            metrics.stopServing()
+
+    def test_event_metrics(self):
+        metrics = Metrics(True)
+        event = Event()
+        event.enableMetrics(metrics)
+        received = []
+        event.on('message', received.append)
+        event.emit('message', 'data')
+        self.assertEqual(received, ['data'])
+        histograms = metrics.snapshot()['histograms']
+        self.assertEqual(histograms['emit_seconds{event="message"}']['count'], 1)
+        self.assertEqual(histograms['listener_seconds{event="message",listener="list.append"}']['count'], 1)
+
+
+class TestIRCSDKMetrics(unittest.TestCase):
+
+    def make_irc(self, **kwargs):
+        irc = IRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, ssl=False, **kwargs))
+        irc.irc = MagicMock()
+        return irc
+
+    def test_disabled_by_default(self):
+        irc = self.make_irc()
+        irc.handle_raw_message(b'PING :server\r\n')
+        self.assertFalse(irc.metrics.enabled)
+        self.assertEqual(irc.getMetrics(), {'counters': {}, 'histograms': {}, 'gauges': {}})
+
+    def test_receive_send_and_parse(self):
+        irc = self.make_irc(metrics=True)
+        irc._connectStarted = 0.0
+        irc.event.on('message', lambda message: None)
+        irc.handle_raw_message(b'PING :server\r\n:server 376 nick :End of /MOTD command.\r\n')
+        snapshot = irc.getMetrics()
+        counters = snapshot['counters']
+        self.assertEqual(counters['lines_received_total'], 2)
+        self.assertEqual(counters['bytes_received_total'], 55)
+        self.assertEqual(counters['lines_sent_total'], 1)
+        self.assertEqual(counters['bytes_sent_total'], len(b'PONG server\r\n'))
+        self.assertEqual(snapshot['histograms']['parse_seconds']['count'], 2)
+        self.assertEqual(snapshot['histograms']['motd_seconds']['count'], 1)
+        self.assertEqual(snapshot['histograms']['emit_seconds{event="message"}']['count'], 2)
+        self.assertEqual(snapshot['gauges']['send_queue_depth'], 0)
+
+    def test_module_handler_latency(self):
+        irc = self.make_irc(metrics=True)
+        module = MetricsModule(irc, '!', 'test')
+        module.startListening()
+        irc.handle_raw_message(b':n!u@h PRIVMSG #c :!test\r\n')
+        histograms = irc.getMetrics()['histograms']
+        self.assertEqual(histograms['handler_seconds{module="MetricsModule"}']['count'], 1)
+
+
+class MetricsModule(Module):
+    ircCommands = ('PRIVMSG',)
+
+    def handleCommand(self, message, command):
+        pass
+
+    def handleError(self, message, command, error):
+        pass
+
+
+if __name__ == '__main__':
+    unittest.main()
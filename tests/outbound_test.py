@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import MagicMock
+
+from pyircsdk import IRCSDK, IRCSDKConfig
+from pyircsdk.outbound import PRIVMSG, buildLine
+
+
+class TestBuildLine(unittest.TestCase):
+
+    def test_mixed_str_and_bytes(self):
+        self.assertEqual(buildLine(PRIVMSG, '#chan', trailing=b'caf\xc3\xa9'), b'PRIVMSG #chan :caf\xc3\xa9\r\n')
+        self.assertEqual(buildLine('MODE', b'#chan', '+o', 'nick'), b'MODE #chan +o nick\r\n')
+        self.assertEqual(buildLine('AWAY', trailing=''), b'AWAY :\r\n')
+
+    def test_rejects_line_breaks_anywhere(self):
+        for args, trailing in (((), 'a\r\nQUIT'), (('#a\n',), 'x'), (('#a',), b'x\0y'), (('x\rQUIT',), None)):
+            with self.assertRaises(ValueError):
+                buildLine(PRIVMSG, *args, trailing=trailing)
+
+
+class TestBytesFirstSends(unittest.TestCase):
+
+    def setUp(self):
+        self.irc = IRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, nick='bot', user='bot', ssl=False))
+        self.irc.irc = MagicMock()
+
+    def sent(self):
+        return [c.args[0] for c in self.irc.irc.sendall.call_args_list]
+
+    def test_privmsg_accepts_encoded_payloads(self):
+        self.irc.privmsg(b'#chan', b'pre-encoded \xe2\x9c\x93')
+        self.irc.privmsg('#chan', bytearray(b'buffer'))
+        self.assertEqual(self.sent(), [b'PRIVMSG #chan :pre-encoded \xe2\x9c\x93\r\n', b'PRIVMSG #chan :buffer\r\n'])
+
+    def test_long_and_multiline_bytes_are_split(self):
+        self.irc.privmsg('#chan', b'one\r\ntwo')
+        self.irc.privmsg('#chan', ('✓' * 300).encode('utf-8'))
+        lines = self.sent()
+        self.assertEqual(lines[:2], [b'PRIVMSG #chan :one\r\n', b'PRIVMSG #chan :two\r\n'])
+        self.assertEqual(b''.join(line[len(b'PRIVMSG #chan :'):-2] for line in lines[2:]),
+                         ('✓' * 300).encode('utf-8'))
+        self.assertTrue(all(len(line) <= 512 for line in lines))
+
+    def test_long_text_fitting_the_line_takes_one_line(self):
+        self.irc.privmsg('#chan', 'x' * 400)
+        self.assertEqual(self.sent(), [b'PRIVMSG #chan :' + b'x' * 400 + b'\r\n'])
+
+    def test_rejects_injected_targets(self):
+        for target in ('#chan\r\nQUIT', '#a b', '', b'#chan\nQUIT'):
+            with self.assertRaises(ValueError):
+                self.irc.privmsg(target, 'hi')
+        self.irc.irc.sendall.assert_not_called()
+
+    def test_send_command(self):
+        self.irc.sendCommand('TOPIC', '#chan', trailing=b'new topic')
+        self.irc.sendRaw(b'PING :x\r\n')
+        self.assertEqual(self.sent(), [b'TOPIC #chan :new topic\r\n', b'PING :x\r\n'])
+        with self.assertRaises(ValueError):
+            self.irc.sendCommand('TOPIC', '#chan', trailing='a\nQUIT :bye')
+
+    def test_join_rejects_injected_names_and_keys(self):
+        errors = []
+        self.irc.event.on('join_error', errors.append)
+        self.irc.join('#a\r\nQUIT')
+        self.assertEqual(len(errors), 1)
+        for key in ('key\r\nQUIT', 'a,b', 'a b', 'k\0'):
+            with self.assertRaises(ValueError):
+                self.irc.join_many(['#a', '#b'], {'#a': key})
+        self.irc.irc.sendall.assert_not_called()
+        self.irc.join_many(['#a', '#b'], {'#b': 'secret'})
+        self.assertEqual(self.sent(), [b'JOIN #b,#a secret\r\n'])
+
+    def test_split_and_multi_target_lines_are_checked(self):
+        for send in (lambda: self.irc.privmsg('#chan', 'a\0b'), lambda: self.irc.privmsg_many(['#a', '#b'], 'x\0y'),
+                     lambda: self.irc.privmsg('#chan', 'one\ntwo\0')):
+            with self.assertRaises(ValueError):
+                send()
+        self.irc.irc.sendall.assert_not_called()
+        self.irc.privmsg_many(['#a', '#b'], 'hi')
+        self.assertEqual(self.sent(), [b'PRIVMSG #a :hi\r\n', b'PRIVMSG #b :hi\r\n'])
+
+
+if __name__ == '__main__':
+    unittest.main()
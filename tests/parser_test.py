@@ -0,0 +1,181 @@
+import os
+import pickle
+import random
+import subprocess
+import sys
+import unittest
+
+from benchmarks.harness.corpus import PARSER_CORPUS
+from pyircsdk.parser import BACKENDS, parse, parsePython, parseRegex
+from pyircsdk.tags import parseTags, unescapeTagValue
+
+
+class TestParserMethods(unittest.TestCase):
+
+    def test_parse_privmsg(self):
+        msg = parse(':nick!user@host PRIVMSG #channel :Hello world')
+        self.assertIsNone(msg.rawTags)
+        self.assertEqual(msg.prefix, 'nick!user@host')
+        self.assertEqual(msg.command, 'PRIVMSG')
+        self.assertEqual(msg.params, ['#channel'])
+        self.assertEqual(msg.trailing, 'Hello world')
+        self.assertEqual(msg.messageFrom, 'nick')
+        self.assertEqual(msg.messageTo, '#channel')
+        self.assertEqual(msg.message, 'Hello world')
+
+    def test_parse_tagged_privmsg(self):
+        msg = parse('@time=2024-01-01T00:00:00.000Z;msgid=abc :nick!user@host PRIVMSG #channel :Hi there')
+        self.assertEqual(msg.rawTags, 'time=2024-01-01T00:00:00.000Z;msgid=abc')
+        self.assertEqual(msg.prefix, 'nick!user@host')
+        self.assertEqual(msg.command, 'PRIVMSG')
+        self.assertEqual(msg.messageFrom, 'nick')
+        self.assertEqual(msg.messageTo, '#channel')
+        self.assertEqual(msg.message, 'Hi there')
+        self.assertEqual(msg.tags, {'time': '2024-01-01T00:00:00.000Z', 'msgid': 'abc'})
+
+    def test_parse_tags_without_prefix(self):
+        msg = parse('@account=bob PING :server')
+        self.assertIsNone(msg.prefix)
+        self.assertEqual(msg.command, 'PING')
+        self.assertEqual(msg.trailing, 'server')
+        self.assertEqual(msg.tags, {'account': 'bob'})
+
+    def test_tags_are_lazy(self):
+        msg = parse('@a=1 PING :x')
+        self.assertIsNone(msg._tags)
+        self.assertIs(msg.tags, msg.tags)
+
+    def test_untagged_message_has_empty_tags(self):
+        self.assertEqual(parse('PING :x').tags, {})
+
+    def test_parse_no_trailing(self):
+        msg = parse(':nick!user@host JOIN #channel')
+        self.assertEqual(msg.params, ['#channel'])
+        self.assertIsNone(msg.trailing)
+        self.assertIsNone(msg.message)
+
+    def test_parse_trailing_with_colons_and_spaces(self):
+        msg = parse(':n!u@h PRIVMSG #c :a :b  c ')
+        self.assertEqual(msg.trailing, 'a :b  c ')
+        self.assertEqual(msg.message, 'a :b  c ')
+
+    def test_parse_empty_trailing(self):
+        msg = parse(':n!u@h PRIVMSG #c :')
+        self.assertEqual(msg.trailing, '')
+        self.assertEqual(msg.message, '')
+
+    def test_parse_numeric_with_middle_params(self):
+        msg = parse(':server 353 nick = #channel :@op +voice regular')
+        self.assertEqual(msg.command, '353')
+        self.assertEqual(msg.params, ['nick', '=', '#channel'])
+        self.assertEqual(msg.trailing, '@op +voice regular')
+        self.assertEqual(msg.messageTo, 'nick')
+        self.assertEqual(msg.message, '= #channel @op +voice regular')
+        self.assertEqual(msg.allParams, ['nick', '=', '#channel', '@op +voice regular'])
+
+    def test_parse_extra_spaces(self):
+        msg = parse(':server  PING   a  b  :c')
+        self.assertEqual(msg.command, 'PING')
+        self.assertEqual(msg.params, ['a', 'b'])
+        self.assertEqual(msg.trailing, 'c')
+
+    def test_parse_command_only(self):
+        msg = parse('AWAY')
+        self.assertEqual(msg.command, 'AWAY')
+        self.assertEqual(msg.params, [])
+        self.assertIsNone(msg.trailing)
+        self.assertEqual(msg.allParams, [])
+
+    def test_parse_prefix_only_edge_cases(self):
+        msg = parse(':server  :x')
+        self.assertIsNone(msg.prefix)
+        self.assertEqual(msg.command, ':server')
+        self.assertEqual(msg.trailing, 'x')
+        msg = parse(' :x')
+        self.assertEqual(msg.command, '')
+        self.assertEqual(msg.params, [])
+        self.assertEqual(msg.trailing, 'x')
+        self.assertEqual(parse('').command, '')
+
+    def test_fields_are_lazy(self):
+        msg = parse(':nick!user@host PRIVMSG #channel :Hello')
+        self.assertEqual(msg.command, 'PRIVMSG')
+        for field in ('_prefix', '_params', '_trailing', '_messageFrom', '_messageTo', '_message'):
+            self.assertNotIsInstance(getattr(msg, field), (str, list), field)
+        self.assertIs(msg.params, msg.params)
+        self.assertIs(msg.prefix, msg.prefix)
+
+    def test_nick_user_host(self):
+        msg = parse(':nick!user@host PRIVMSG #channel :Hello')
+        self.assertEqual((msg.nick, msg.user, msg.host), ('nick', 'user', 'host'))
+        msg = parse(':nick@host PRIVMSG #channel :Hello')
+        self.assertEqual((msg.nick, msg.user, msg.host), ('nick', None, 'host'))
+        msg = parse(':irc.example.com 001 nick :Welcome')
+        self.assertEqual((msg.nick, msg.user, msg.host), ('irc.example.com', None, None))
+        msg = parse('PING :x')
+        self.assertEqual((msg.nick, msg.user, msg.host), (None, None, None))
+
+    def test_setting_a_field_refreshes_the_derived_ones(self):
+        msg = parse(':nick!user@host PRIVMSG #channel :Hello')
+        self.assertEqual(msg.message, 'Hello')
+        msg.trailing = 'Bye'
+        msg.prefix = 'other!u@h'
+        self.assertEqual(msg.message, 'Bye')
+        self.assertEqual(msg.messageFrom, 'other')
+        self.assertEqual(msg.nick, 'other')
+
+    def test_pickle_keeps_every_field(self):
+        msg = pickle.loads(pickle.dumps(parse('@a=1 :nick!user@host PRIVMSG #channel :Hello')))
+        self.assertEqual((msg.prefix, msg.command, msg.params, msg.trailing, msg.messageFrom, msg.messageTo,
+                          msg.message, msg.tags),
+                         ('nick!user@host', 'PRIVMSG', ['#channel'], 'Hello', 'nick', '#channel', 'Hello',
+                          {'a': '1'}))
+
+    def test_unescape_tag_value(self):
+        self.assertEqual(unescapeTagValue('a\\sb\\:c\\\\d\\r\\n'), 'a b;c\\d\r\n')
+        self.assertEqual(unescapeTagValue('unknown\\x'), 'unknownx')
+        self.assertEqual(unescapeTagValue('trailing\\'), 'trailing')
+        self.assertEqual(unescapeTagValue('plain'), 'plain')
+
+    def test_parse_tags(self):
+        self.assertEqual(parseTags('a=1;b;c=;+example.com/d=x\\sy;a=2'),
+                         {'a': '2', 'b': '', 'c': '', '+example.com/d': 'x y'})
+
+
+class TestParserBackends(unittest.TestCase):
+
+    def fields(self, message):
+        return message.rawTags, message.prefix, message.command, message.params, message.trailing
+
+    def test_corpus(self):
+        for name, backend in BACKENDS.items():
+            for line, *expected in PARSER_CORPUS:
+                with self.subTest(backend=name, line=line):
+                    self.assertEqual(self.fields(backend(line)), tuple(expected))
+
+    def test_backends_agree_on_random_lines(self):
+        rng = random.Random(0)
+        pieces = [' ', '  ', ':', '@', '!', 'a', 'b=1', ';', '\t', '#c', 'PRIVMSG', '001', '\xe9']
+        for _ in range(5000):
+            line = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+            python, regex = parsePython(line), parseRegex(line)
+            self.assertEqual(self.fields(regex), self.fields(python), line)
+            self.assertEqual((regex.messageFrom, regex.messageTo, regex.message),
+                             (python.messageFrom, python.messageTo, python.message), line)
+
+    def run_python(self, backend):
+        env = dict(os.environ, PYIRCSDK_PARSER=backend)
+        code = 'from pyircsdk import parser; print(parser.BACKEND, parser.parse.__name__)'
+        return subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+
+    def test_backend_selected_at_import(self):
+        self.assertEqual(self.run_python('re').stdout.split(), ['re', 'parseRegex'])
+        self.assertEqual(self.run_python('').stdout.split(), ['python', 'parsePython'])
+        result = self.run_python('cython')
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout.split(), ['python', 'parsePython'])
+        self.assertIn("PYIRCSDK_PARSER must be one of python, re, not 'cython'; using python", result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
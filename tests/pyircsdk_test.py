@@ -1,6 +1,8 @@
+import socket
+import threading
+import time
 import unittest
 from unittest.mock import MagicMock, patch, call
-import socket
 
 from pyircsdk import IRCSDK, IRCSDKConfig
 
@@ -11,7 +13,7 @@ class TestIRCSDKMethods(unittest.TestCase):
         irc = IRCSDK(None)
         self.assertTrue(irc)
         self.assertIsNotNone(irc.event)
-        self.assertEqual(irc._recv_buffer, '')
+        self.assertEqual(irc._framer.pending(), b'')
 
     def test_create_irc_with_config(self):
         config = IRCSDKConfig(
@@ -57,7 +59,7 @@ class TestIRCSDKMethods(unittest.TestCase):
         irc.irc = MagicMock()
 
         irc.privmsg('#channel', 'Hello, World!')
-        irc.irc.send.assert_called_once_with(b'PRIVMSG #channel :Hello, World!\r\n')
+        irc.irc.sendall.assert_called_once_with(b'PRIVMSG #channel :Hello, World!\r\n')
 
     def test_privmsg_to_user(self):
         config = IRCSDKConfig(host='irc.example.com', port=6667, ssl=False)
@@ -65,7 +67,7 @@ class TestIRCSDKMethods(unittest.TestCase):
         irc.irc = MagicMock()
 
         irc.privmsg('someuser', 'Private message')
-        irc.irc.send.assert_called_once_with(b'PRIVMSG someuser :Private message\r\n')
+        irc.irc.sendall.assert_called_once_with(b'PRIVMSG someuser :Private message\r\n')
 
     def test_sendRaw(self):
         config = IRCSDKConfig(host='irc.example.com', port=6667, ssl=False)
@@ -73,7 +75,7 @@ class TestIRCSDKMethods(unittest.TestCase):
         irc.irc = MagicMock()
 
         irc.sendRaw('RAW COMMAND\r\n')
-        irc.irc.send.assert_called_once_with(b'RAW COMMAND\r\n')
+        irc.irc.sendall.assert_called_once_with(b'RAW COMMAND\r\n')
 
     def test_close(self):
         config = IRCSDKConfig(host='irc.example.com', port=6667, nick='testbot', ssl=False)
@@ -81,16 +83,47 @@ class TestIRCSDKMethods(unittest.TestCase):
         irc.irc = MagicMock()
 
         irc.close()
-        irc.irc.send.assert_called_once_with(b'QUIT :testbot\r\n')
+        irc.irc.sendall.assert_called_once_with(b'QUIT :testbot\r\n')
         irc.irc.close.assert_called_once()
 
+    def test_close_from_another_thread_wakes_the_reader(self):
+        listener = socket.create_server(('127.0.0.1', 0))
+        self.addCleanup(listener.close)
+        received = []
+
+        def serve():
+            conn = listener.accept()[0]
+            with conn, conn.makefile('rb') as lines:
+                for line in lines:
+                    received.append(line)
+                    if line.startswith(b'NICK'):
+                        conn.sendall(b':server 376 testbot :End of /MOTD command.\r\n')
+        threading.Thread(target=serve, daemon=True).start()
+
+        # Nothing arrives after the MOTD, so the reader sits in select() for the whole keepalive wait
+        irc = IRCSDK(IRCSDKConfig(host='127.0.0.1', port=listener.getsockname()[1], nick='testbot', user='u',
+                                  realname='r', ssl=False, caps=[], pingInterval=60))
+        welcomed = threading.Event()
+        irc.event.on('message', lambda message: message.command == '376' and welcomed.set())
+        thread = threading.Thread(target=irc.connect, daemon=True)
+        thread.start()
+        self.assertTrue(welcomed.wait(5))
+        time.sleep(0.1)
+
+        started = time.monotonic()
+        irc.close()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertIn(b'QUIT :testbot\r\n', received)
+
     def test_sendPassword(self):
         config = IRCSDKConfig(host='irc.example.com', port=6667, ssl=False)
         irc = IRCSDK(config)
         irc.irc = MagicMock()
 
         irc.sendPassword('secretpass')
-        irc.irc.send.assert_called_once_with(b'PASS secretpass\r\n')
+        irc.irc.sendall.assert_called_once_with(b'PASS secretpass\r\n')
 
     def test_join(self):
         config = IRCSDKConfig(host='irc.example.com', port=6667, ssl=False)
@@ -98,7 +131,7 @@ class TestIRCSDKMethods(unittest.TestCase):
         irc.irc = MagicMock()
 
         irc.join('#testchannel')
-        irc.irc.send.assert_called_once_with(b'JOIN #testchannel\r\n')
+        irc.irc.sendall.assert_called_once_with(b'JOIN #testchannel\r\n')
 
     def test_setUser(self):
         config = IRCSDKConfig(host='irc.example.com', port=6667, ssl=False)
@@ -106,7 +139,7 @@ class TestIRCSDKMethods(unittest.TestCase):
         irc.irc = MagicMock()
 
         irc.setUser('testuser', 'Test Real Name')
-        irc.irc.send.assert_called_once_with(b'USER testuser 0 * :Test Real Name\r\n')
+        irc.irc.sendall.assert_called_once_with(b'USER testuser 0 * :Test Real Name\r\n')
 
     def test_setNick(self):
         config = IRCSDKConfig(host='irc.example.com', port=6667, ssl=False)
@@ -114,7 +147,7 @@ class TestIRCSDKMethods(unittest.TestCase):
         irc.irc = MagicMock()
 
         irc.setNick('testnick')
-        irc.irc.send.assert_called_once_with(b'NICK testnick\r\n')
+        irc.irc.sendall.assert_called_once_with(b'NICK testnick\r\n')
 
     def test_nickServIdentify(self):
         config = IRCSDKConfig(host='irc.example.com', port=6667, ssl=False)
@@ -122,7 +155,7 @@ class TestIRCSDKMethods(unittest.TestCase):
         irc.irc = MagicMock()
 
         irc.nickServIdentify('nickserv :identify %s', 'mypassword')
-        irc.irc.send.assert_called_once_with(b'PRIVMSG nickserv :identify mypassword\r\n')
+        irc.irc.sendall.assert_called_once_with(b'PRIVMSG nickserv :identify mypassword\r\n')
 
     def test_nickServIdentify_no_password(self):
         config = IRCSDKConfig(host='irc.example.com', port=6667, ssl=False)
@@ -130,7 +163,7 @@ class TestIRCSDKMethods(unittest.TestCase):
         irc.irc = MagicMock()
 
         irc.nickServIdentify('nickserv :identify %s', None)
-        irc.irc.send.assert_not_called()
+        irc.irc.sendall.assert_not_called()
 
     def test_connect_no_config_raises(self):
         irc = IRCSDK(None)
@@ -139,10 +172,10 @@ class TestIRCSDKMethods(unittest.TestCase):
             irc.connect()
         self.assertEqual(str(context.exception), 'No config passed to connect')
 
-    @patch('pyircsdk.pyircsdk.socket.socket')
-    def test_try_connect_success(self, mock_socket_class):
+    @patch('pyircsdk.pyircsdk.socket.create_connection')
+    def test_open_success(self, mock_create_connection):
         mock_socket = MagicMock()
-        mock_socket_class.return_value = mock_socket
+        mock_create_connection.return_value = mock_socket
 
         config = IRCSDKConfig(
             host='irc.example.com',
@@ -155,22 +188,20 @@ class TestIRCSDKMethods(unittest.TestCase):
             connectionTimeout=10
         )
         irc = IRCSDK(config)
-        irc.startRecv = MagicMock()
 
-        irc.try_connect(3, 1)
+        self.assertTrue(irc._open('irc.example.com', 6667))
+        irc._stopWriter()
 
-        mock_socket.connect.assert_called_once_with(('irc.example.com', 6667))
-        mock_socket.settimeout.assert_any_call(10)
+        mock_create_connection.assert_called_once_with(('irc.example.com', 6667), 10)
+        mock_socket.settimeout.assert_called_once_with(None)
 
-    @patch('pyircsdk.pyircsdk.socket.socket')
+    @patch('pyircsdk.pyircsdk.socket.create_connection')
     @patch('pyircsdk.pyircsdk.time.sleep')
-    def test_try_connect_retry_on_failure(self, mock_sleep, mock_socket_class):
-        mock_socket = MagicMock()
-        mock_socket_class.return_value = mock_socket
-        mock_socket.connect.side_effect = [
+    def test_connect_retries_with_backoff(self, mock_sleep, mock_create_connection):
+        mock_create_connection.side_effect = [
             socket.error("Connection refused"),
             socket.error("Connection refused"),
-            None
+            MagicMock()
         ]
 
         config = IRCSDKConfig(
@@ -181,38 +212,90 @@ class TestIRCSDKMethods(unittest.TestCase):
             user='testuser',
             realname='Test Bot',
             ssl=False,
-            connectionTimeout=10
+            connectionTimeout=10,
+            reconnectDelay=2
         )
         irc = IRCSDK(config)
+        irc.reconnectPolicy.backoff.rand = lambda: 1.0
         irc.startRecv = MagicMock()
 
-        irc.try_connect(3, 2)
+        irc.connect()
+
+        self.assertEqual(mock_create_connection.call_count, 3)
+        self.assertEqual(mock_sleep.call_args_list, [call(2), call(4)])
+        irc.startRecv.assert_called_once()
+
+    @patch('pyircsdk.pyircsdk.socket.create_connection')
+    @patch('pyircsdk.pyircsdk.time.sleep')
+    def test_connect_exhausted_retries_emits_connect_failed(self, mock_sleep, mock_create_connection):
+        mock_create_connection.side_effect = socket.error("Connection refused")
+
+        config = IRCSDKConfig(
+            host='irc.example.com',
+            port=6667,
+            nick='testbot',
+            ssl=False,
+            connectionTimeout=10,
+            connectRetries=3
+        )
+        irc = IRCSDK(config)
+        failed = []
+        irc.event.on('connect_failed', failed.append)
+
+        irc.connect()
 
-        self.assertEqual(mock_socket.connect.call_count, 3)
+        self.assertEqual(failed, ['Maximum retry attempts reached'])
+        self.assertEqual(mock_create_connection.call_count, 3)
         self.assertEqual(mock_sleep.call_count, 2)
-        mock_sleep.assert_called_with(2)
 
-    @patch('pyircsdk.pyircsdk.socket.socket')
-    @patch('pyircsdk.pyircsdk.exit')
-    def test_try_connect_exhausted_retries_exits(self, mock_exit, mock_socket_class):
-        mock_socket = MagicMock()
-        mock_socket_class.return_value = mock_socket
-        mock_socket.connect.side_effect = socket.error("Connection refused")
+    @patch('pyircsdk.pyircsdk.socket.create_connection')
+    @patch('pyircsdk.pyircsdk.time.sleep')
+    def test_connect_rotates_servers(self, mock_sleep, mock_create_connection):
+        mock_create_connection.side_effect = socket.error("Connection refused")
 
         config = IRCSDKConfig(
             host='irc.example.com',
             port=6667,
             nick='testbot',
             ssl=False,
-            connectionTimeout=10
+            connectRetries=3,
+            servers=['irc1.example.com:6697', 'irc2.example.com', '[2001:db8::1]:6697']
         )
         irc = IRCSDK(config)
+        irc.connect()
+
+        self.assertEqual([args[0] for args, _ in mock_create_connection.call_args_list], [
+            ('irc1.example.com', 6697),
+            ('irc2.example.com', 6667),
+            ('2001:db8::1', 6697),
+        ])
 
-        irc.try_connect(3, 0)
+    @patch('pyircsdk.pyircsdk.socket.create_connection')
+    @patch('pyircsdk.pyircsdk.time.sleep')
+    def test_try_connect_is_a_deprecated_connect(self, mock_sleep, mock_create_connection):
+        mock_create_connection.side_effect = socket.error("Connection refused")
+        config = IRCSDKConfig(host='irc.example.com', port=6667, nick='testbot', ssl=False, connectRetries=1)
+        irc = IRCSDK(config)
+        policy = irc.reconnectPolicy
+        failed = []
+        irc.event.on('connect_failed', failed.append)
+
+        with self.assertWarns(DeprecationWarning):
+            irc.try_connect(3, 7)
+
+        self.assertEqual(mock_create_connection.call_count, 3)
+        self.assertEqual(mock_sleep.call_args_list, [call(7), call(7)])
+        self.assertEqual(failed, ['Maximum retry attempts reached'])
+        self.assertIs(irc.reconnectPolicy, policy)
+
+    def test_disconnect_without_auto_reconnect_stops(self):
+        config = IRCSDKConfig(host='irc.example.com', port=6667, nick='testbot', ssl=False)
+        irc = IRCSDK(config)
+        disconnected = []
+        irc.event.on('disconnected', disconnected.append)
 
-        mock_exit.assert_called_once_with(1)
-        self.assertEqual(mock_socket.connect.call_count, 3)
-        self.assertEqual(mock_socket.close.call_count, 3)
+        self.assertIsNone(irc._handle_disconnect())
+        self.assertEqual(disconnected, ['Connection lost'])
 
 
 class TestIRCSDKParseMessage(unittest.TestCase):
@@ -268,7 +351,7 @@ class TestIRCSDKHandleRawMessage(unittest.TestCase):
     def test_handle_ping(self):
         raw = b'PING :server.example.com\r\n'
         self.irc.handle_raw_message(raw)
-        self.irc.irc.send.assert_called_with(b'PONG server.example.com\r\n')
+        self.irc.irc.sendall.assert_called_with(b'PONG server.example.com\r\n')
 
     def test_handle_motd_end_376(self):
         mock_callback = MagicMock()
@@ -292,7 +375,7 @@ class TestIRCSDKHandleRawMessage(unittest.TestCase):
         raw = b'PING :server1\r\nPING :server2\r\n'
         self.irc.handle_raw_message(raw)
 
-        calls = self.irc.irc.send.call_args_list
+        calls = self.irc.irc.sendall.call_args_list
         self.assertEqual(len(calls), 2)
         self.assertEqual(calls[0], call(b'PONG server1\r\n'))
         self.assertEqual(calls[1], call(b'PONG server2\r\n'))
@@ -301,25 +384,25 @@ class TestIRCSDKHandleRawMessage(unittest.TestCase):
         """Test that partial messages are buffered correctly"""
         # First chunk - incomplete message
         self.irc.handle_raw_message(b'PING :serv')
-        self.irc.irc.send.assert_not_called()
+        self.irc.irc.sendall.assert_not_called()
 
         # Second chunk - completes the message
         self.irc.handle_raw_message(b'er1\r\n')
-        self.irc.irc.send.assert_called_once_with(b'PONG server1\r\n')
+        self.irc.irc.sendall.assert_called_once_with(b'PONG server1\r\n')
 
     def test_handle_partial_message_with_complete(self):
         """Test buffer with complete message followed by partial"""
         self.irc.handle_raw_message(b'PING :server1\r\nPING :ser')
-        self.irc.irc.send.assert_called_once_with(b'PONG server1\r\n')
+        self.irc.irc.sendall.assert_called_once_with(b'PONG server1\r\n')
 
-        self.irc.irc.send.reset_mock()
+        self.irc.irc.sendall.reset_mock()
         self.irc.handle_raw_message(b'ver2\r\n')
-        self.irc.irc.send.assert_called_once_with(b'PONG server2\r\n')
+        self.irc.irc.sendall.assert_called_once_with(b'PONG server2\r\n')
 
     def test_buffer_cleared_on_complete_messages(self):
         """Test that buffer is empty after processing complete messages"""
         self.irc.handle_raw_message(b'PING :server1\r\n')
-        self.assertEqual(self.irc._recv_buffer, '')
+        self.assertEqual(self.irc._framer.pending(), b'')
 
 
 class TestIRCSDKSetupListeners(unittest.TestCase):
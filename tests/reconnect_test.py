@@ -0,0 +1,181 @@
+import logging
+import socket
+import sys
+import threading
+import tracemalloc
+import unittest
+
+from pyircsdk import IRCSDK, IRCSDKConfig
+from pyircsdk.reconnect import Backoff, ReconnectPolicy, parseServer
+
+
+class HangupServer:
+    """Accepts connections, ends the MOTD and hangs up straight away"""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(128)
+        self.port = self.sock.getsockname()[1]
+        self.accepted = 0
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.accepted += 1
+            try:
+                conn.sendall(b':server 376 bot :End of /MOTD command.\r\n')
+            except OSError:
+                pass
+            conn.close()
+
+    def close(self):
+        self.sock.close()
+
+
+class TestBackoff(unittest.TestCase):
+
+    def test_doubles_up_to_cap(self):
+        backoff = Backoff(1, 10, rand=lambda: 1.0)
+        self.assertEqual([backoff.next() for _ in range(6)], [1, 2, 4, 8, 10, 10])
+        backoff.reset()
+        self.assertEqual(backoff.next(), 1)
+
+    def test_full_jitter(self):
+        backoff = Backoff(1, 10)
+        for _ in range(100):
+            delay = backoff.next()
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, 10)
+
+    def test_huge_attempt_count(self):
+        backoff = Backoff(1, 10, rand=lambda: 1.0)
+        backoff.attempt = 10000
+        self.assertEqual(backoff.next(), 10)
+
+
+class TestReconnectPolicy(unittest.TestCase):
+
+    def test_parse_server(self):
+        self.assertEqual(parseServer('irc.example.com:6697', 6667), ('irc.example.com', 6697))
+        self.assertEqual(parseServer('irc.example.com', 6667), ('irc.example.com', 6667))
+        self.assertEqual(parseServer('[::1]:6697', 6667), ('::1', 6697))
+        self.assertEqual(parseServer('::1', 6667), ('::1', 6667))
+        self.assertEqual(parseServer(('irc.example.com', '7000'), 6667), ('irc.example.com', 7000))
+
+    def test_rotation_and_give_up(self):
+        config = IRCSDKConfig(host='irc.example.com', port=6667, servers=['a:1', 'b:2'], connectRetries=3)
+        policy = ReconnectPolicy(config, rand=lambda: 1.0)
+        self.assertEqual(policy.server, ('a', 1))
+        self.assertEqual(policy.failed(), 5)
+        self.assertEqual(policy.server, ('b', 2))
+        self.assertEqual(policy.failed(), 10)
+        self.assertEqual(policy.server, ('a', 1))
+        self.assertIsNone(policy.failed())
+
+    def test_registered_resets(self):
+        config = IRCSDKConfig(host='irc.example.com', port=6667, autoReconnect=True, reconnectDelay=1)
+        policy = ReconnectPolicy(config, rand=lambda: 1.0)
+        policy.failed()
+        policy.failed()
+        policy.registered()
+        self.assertEqual(policy.failures, 0)
+        self.assertEqual(policy.disconnected(), 1)
+
+    def test_unlimited_retries(self):
+        config = IRCSDKConfig(host='irc.example.com', port=6667, connectRetries=0)
+        policy = ReconnectPolicy(config)
+        for _ in range(100):
+            self.assertIsNotNone(policy.failed())
+
+    def test_disconnected_without_auto_reconnect(self):
+        policy = ReconnectPolicy(IRCSDKConfig(host='irc.example.com', port=6667))
+        self.assertIsNone(policy.disconnected())
+
+    def test_disconnected_moves_to_the_next_server(self):
+        config = IRCSDKConfig(host='irc.example.com', port=6667, servers=['a:1', 'b:2'], autoReconnect=True)
+        policy = ReconnectPolicy(config)
+        policy.registered()
+        policy.disconnected()
+        self.assertEqual(policy.server, ('b', 2))
+        policy.disconnected()
+        self.assertEqual(policy.server, ('a', 1))
+
+    def test_fails_over_after_an_established_session_drops(self):
+        first, second = HangupServer(), HangupServer()
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        irc = IRCSDK(IRCSDKConfig(host='127.0.0.1', port=6667, nick='bot', user='u', realname='r', ssl=False,
+                                  autoReconnect=True, reconnectDelay=0.001,
+                                  servers=['127.0.0.1:%d' % first.port, '127.0.0.1:%d' % second.port]))
+        connected = []
+
+        def on_connecting(data):
+            connected.append(data['port'])
+            if len(connected) == 3:
+                irc._closing = True
+        disconnected = []
+        irc.event.on('connecting', on_connecting)
+        irc.event.on('disconnected', disconnected.append)
+        thread = threading.Thread(target=irc.connect, daemon=True)
+        thread.start()
+        thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        # every attempt connected, so each move was a failover after a drop rather than a failed attempt
+        self.assertEqual(connected, [first.port, second.port, first.port])
+        self.assertEqual(len(disconnected), 3)
+        self.assertEqual(irc.reconnectPolicy.failures, 0)
+
+
+class TestReconnectSoak(unittest.TestCase):
+
+    CYCLES = 2000
+
+    def test_thousands_of_disconnects(self):
+        server = HangupServer()
+        irc = IRCSDK(IRCSDKConfig(host='127.0.0.1', port=server.port, nick='bot', user='u', realname='r',
+                                  ssl=False, sendRate=0, autoReconnect=True, reconnectDelay=0.0001,
+                                  reconnectMaxDelay=0.0005, connectRetries=0,
+                                  logLevel=logging.CRITICAL))  # captured log records would grow memory
+        depths = []
+        memory = []
+
+        def on_disconnected(data):
+            count = len(depths)
+            frame, depth = sys._getframe(), 0
+            while frame:
+                frame, depth = frame.f_back, depth + 1
+            depths.append(depth)
+            if count == 200 or count == self.CYCLES - 1:
+                memory.append(tracemalloc.get_traced_memory()[0])
+            if count == self.CYCLES - 1:
+                irc._closing = True
+
+        irc.event.on('disconnected', on_disconnected)
+        tracemalloc.start()
+        try:
+            thread = threading.Thread(target=irc.connect, daemon=True)
+            thread.start()
+            thread.join(120)
+        finally:
+            tracemalloc.stop()
+            server.close()
+            irc.log.logger.setLevel(logging.NOTSET)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(depths), self.CYCLES)
+        # Iterative: the stack is as deep on the last reconnect as on the first
+        self.assertEqual(min(depths), max(depths))
+        # Constant memory: nothing accumulates per reconnect
+        self.assertLess(memory[1] - memory[0], 256 * 1024)
+        self.assertLess(threading.active_count(), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import MagicMock
+
+from pyircsdk import IRCSDK, IRCSDKConfig, Module
+from pyircsdk.parser import parse
+from pyircsdk.router import Router
+
+
+class TestRouterMethods(unittest.TestCase):
+
+    def setUp(self):
+        config = IRCSDKConfig(host='irc.example.com', port=6667, ssl=False)
+        self.irc = IRCSDK(config)
+        self.irc.irc = MagicMock()
+
+    def test_irc_has_router(self):
+        self.assertIsInstance(self.irc.router, Router)
+
+    def test_trigger_module_only_gets_its_command(self):
+        quit_module = RoutedModule(self.irc, '!', 'quit')
+        hello_module = RoutedModule(self.irc, '!', 'hello')
+        quit_module.startListening()
+        hello_module.startListening()
+
+        self.irc.handle_raw_message(b':nick!user@host PRIVMSG #c :!quit now\r\n'
+                                    b':nick!user@host PRIVMSG #c :just chatting\r\n'
+                                    b'PING :server\r\n')
+
+        self.assertEqual([(m.command, c.command, c.args) for m, c in quit_module.handled],
+                         [('PRIVMSG', '!quit', ['now'])])
+        self.assertEqual(hello_module.handled, [])
+
+    def test_command_module_gets_every_matching_command(self):
+        module = RoutedModule(self.irc, '', '')
+        module.ircCommands = ('privmsg', 'NOTICE')
+        module.startListening()
+
+        self.irc.handle_raw_message(b':a!u@h PRIVMSG #c :hi\r\n:a!u@h NOTICE #c :yo\r\n:a!u@h JOIN #c\r\n')
+
+        self.assertEqual([m.command for m, c in module.handled], ['PRIVMSG', 'NOTICE'])
+
+    def test_command_without_text_gets_none_command(self):
+        module = RoutedModule(self.irc, '', '')
+        module.ircCommands = ('JOIN',)
+        module.startListening()
+
+        self.irc.handle_raw_message(b':a!u@h JOIN #c\r\n')
+
+        self.assertEqual(len(module.handled), 1)
+        self.assertIsNone(module.handled[0][1])
+
+    def test_matching_modules_share_one_tokenization(self):
+        first = RoutedModule(self.irc, '!', 'quit')
+        second = RoutedModule(self.irc, '', '')
+        first.startListening()
+        second.startListening()
+
+        self.irc.router.dispatch(parse(':a!u@h PRIVMSG #c :!quit'))
+
+        self.assertIs(first.handled[0][1], second.handled[0][1])
+
+    def test_router_subscribes_once(self):
+        for i in range(5):
+            RoutedModule(self.irc, '!', 'cmd%d' % i).startListening()
+        self.assertEqual(len(self.irc.event.listeners['message']), 1)
+
+    def test_stop_listening(self):
+        module = RoutedModule(self.irc, '!', 'quit')
+        module.startListening()
+        module.stopListening()
+
+        self.irc.handle_raw_message(b':nick!user@host PRIVMSG #c :!quit\r\n')
+
+        self.assertEqual(module.handled, [])
+
+    def test_handler_error_goes_to_handle_error(self):
+        module = RoutedModule(self.irc, '!', 'quit')
+        module.handleCommand = MagicMock(side_effect=Exception('boom'))
+        module.handleError = MagicMock()
+        module.startListening()
+
+        self.irc.handle_raw_message(b':nick!user@host PRIVMSG #c :!quit\r\n')
+
+        module.handleError.assert_called_once()
+
+
+class RoutedModule(Module):
+    ircCommands = ('PRIVMSG',)
+
+    def __init__(self, irc, fantasy, command):
+        super().__init__(irc, fantasy, command)
+        self.handled = []
+
+    def handleCommand(self, message, command):
+        self.handled.append((message, command))
+
+    def handleError(self, message, command, error):
+        pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import socket
+import time
+import unittest
+from functools import partial
+
+from pyircsdk import AsyncIRCSDK, ConnectionManager, IRCSDK, IRCSDKConfig, Module
+from pyircsdk.shards import ShardedRuntime
+
+
+class EchoModule(Module):
+    ircCommands = ('PRIVMSG',)
+
+    def handleCommand(self, message, command):
+        self.irc.privmsg(message.messageTo, '%s %d %d' % (' '.join(command.args), os.getpid(),
+                                                          self.irc.isupport.linelen))
+
+    def handleError(self, message, command, error):
+        pass
+
+
+def make_irc(nick):
+    irc = IRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, nick=nick, user=nick))
+    irc.sent = []
+    irc._sendNow = irc.sent.append
+    return irc
+
+
+class TestShardedRuntime(unittest.TestCase):
+
+    def setUp(self):
+        self.runtime = ShardedRuntime([partial(EchoModule, fantasy='!', command='echo')], workers=2)
+        self.first = make_irc('first')
+        self.second = make_irc('second')
+        self.assertEqual(self.runtime.attach(self.first), 0)
+        self.assertEqual(self.runtime.attach(self.second), 1)
+        self.runtime.start()
+        self.addCleanup(self.runtime.stop)
+
+    def receive(self, irc, line):
+        irc.handle_raw_message(line.encode() + b'\r\n')
+
+    def wait_for(self, count):
+        deadline = time.monotonic() + 10
+        while self.runtime.sent < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.runtime.sent, count)
+
+    def replies(self, irc):
+        return [line.decode().split(' ', 2)[1:] for line in irc.sent]
+
+    def test_replies_reach_the_owning_connection_in_channel_order(self):
+        for i in range(50):
+            self.receive(self.first, ':n!u@h PRIVMSG #a :!echo a%d' % i)
+            self.receive(self.second, ':n!u@h PRIVMSG #b :!echo b%d' % i)
+        self.wait_for(100)
+        first, second = self.replies(self.first), self.replies(self.second)
+        self.assertEqual([target for target, _ in first], ['#a'] * 50)
+        self.assertEqual([text.split()[0] for _, text in first], [':a%d' % i for i in range(50)])
+        self.assertEqual([text.split()[0] for _, text in second], [':b%d' % i for i in range(50)])
+        # A channel always lands on the same worker, and never on this process
+        pids = {text.split()[1] for _, text in first}
+        self.assertEqual(len(pids), 1)
+        self.assertNotIn(str(os.getpid()), pids)
+
+    def test_channels_spread_over_workers(self):
+        for i in range(40):
+            self.receive(self.first, ':n!u@h PRIVMSG #c%d :!echo x' % i)
+        self.wait_for(40)
+        self.assertEqual(len({text.split()[1] for _, text in self.replies(self.first)}), 2)
+
+    def test_every_worker_gets_isupport(self):
+        self.receive(self.first, ':server 005 first LINELEN=1024 :are supported by this server')
+        for i in range(20):
+            self.receive(self.first, ':n!u@h PRIVMSG #c%d :!echo x' % i)
+        self.wait_for(20)
+        self.assertEqual({text.split()[2] for _, text in self.replies(self.first)}, {'1024'})
+
+    def test_only_forwards_the_given_commands(self):
+        runtime = ShardedRuntime([partial(EchoModule, fantasy='!', command='echo')], workers=1,
+                                 ircCommands=('PRIVMSG',))
+        irc = make_irc('third')
+        runtime.attach(irc)
+        self.receive(irc, ':n!u@h JOIN #a')
+        self.receive(irc, ':n!u@h PRIVMSG #a :!echo x')
+        self.assertEqual(runtime.forwarded, 1)
+
+    def test_asyncio_replies_arrive_on_the_loop(self):
+        async def main():
+            irc = AsyncIRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, nick='bot', user='bot'))
+            sent = []
+            irc._sendNow = sent.append
+            self.runtime.attach(irc)
+            self.receive(irc, ':n!u@h PRIVMSG #a :!echo hi')
+            while not sent:
+                await asyncio.sleep(0.01)
+            return sent
+
+        sent = asyncio.run(asyncio.wait_for(main(), 10))
+        self.assertTrue(sent[0].startswith(b'PRIVMSG #a :hi '))
+
+    def test_a_dropped_connection_does_not_stop_the_replies(self):
+        # The first connection's socket closes while its replies are on the way: sendall raises EBADF
+        sock, peer = socket.socketpair()
+        peer.close()
+        sock.close()
+        del self.first._sendNow
+        self.first.irc = sock
+        for i in range(5):
+            self.receive(self.first, ':n!u@h PRIVMSG #a :!echo a%d' % i)
+        deadline = time.monotonic() + 10
+        while self.runtime.failed < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.runtime.failed, 5)
+        self.receive(self.second, ':n!u@h PRIVMSG #b :!echo b')
+        self.wait_for(1)
+        self.assertEqual(self.replies(self.second)[0][0], '#b')
+
+    def test_lines_with_surrogates_reach_the_workers(self):
+        self.receive(self.first, ':n!u@h PRIVMSG #a :!echo a')
+        self.first._parseLine(':n!u@h PRIVMSG #a :!echo \udcff')
+        self.receive(self.first, ':n!u@h PRIVMSG #a :!echo b')
+        # The worker's reply to the middle line fails to encode, in the module, like it would inline
+        self.wait_for(2)
+        self.assertEqual([text.split()[0] for _, text in self.replies(self.first)], [':a', ':b'])
+
+    def test_manager_sessions_are_refused(self):
+        session = ConnectionManager().add(IRCSDKConfig(host='irc.example.com', port=6667, nick='bot'))
+        with self.assertRaises(ValueError):
+            self.runtime.attach(session)
+
+
+if __name__ == '__main__':
+    unittest.main()
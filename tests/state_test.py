@@ -0,0 +1,131 @@
+import unittest
+from unittest.mock import MagicMock
+
+from pyircsdk import IRCSDK, IRCSDKConfig
+from pyircsdk.parser import parse
+from pyircsdk.state import StateTracker, casefold
+
+
+def feed(state, *lines):
+    for line in lines:
+        state.handleMessage(parse(line))
+
+
+class TestStateTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.state = StateTracker()
+        feed(self.state,
+             ':server 001 bot :Welcome',
+             ':bot!b@host JOIN #Test',
+             ':server 353 bot = #test :bot @Op +Voiced Plain[1]',
+             ':server 366 bot #test :End of /NAMES list.')
+
+    def test_casefold(self):
+        self.assertEqual(casefold('Nick[1]~'), 'nick{1}^')
+        self.assertEqual(casefold('Nick[1]~', 'strict-rfc1459'), 'nick{1}~')
+        self.assertEqual(casefold('Nick[1]~', 'ascii'), 'nick[1]~')
+
+    def test_names(self):
+        channel = self.state.channel('#TEST')
+        self.assertEqual(channel.name, '#Test')
+        self.assertTrue(channel.synced)
+        self.assertEqual(sorted(self.state.members('#test')), ['Op', 'Plain[1]', 'Voiced', 'bot'])
+        self.assertEqual(self.state.modes('op', '#test'), 'o')
+        self.assertEqual(self.state.modes('VOICED', '#test'), 'v')
+        self.assertTrue(self.state.isOn('plain{1}', '#test'))
+        self.assertEqual(self.state.channelsOf('PLAIN[1]'), ['#Test'])
+
+    def test_join_part_kick_quit(self):
+        feed(self.state,
+             ':bot!b@host JOIN #other',
+             ':new!ident@example.com JOIN #test',
+             ':new!ident@example.com JOIN :#other',
+             ':op!o@h PART #test :bye')
+        self.assertEqual(sorted(self.state.channelsOf('new')), ['#Test', '#other'])
+        self.assertEqual((self.state.user('new').user, self.state.user('new').host), ('ident', 'example.com'))
+        self.assertIsNone(self.state.user('op'))
+        self.assertEqual(sorted(self.state.commonChannels('new', 'bot')), ['#Test', '#other'])
+
+        feed(self.state, ':op2!o@h KICK #test new :out')
+        self.assertEqual(self.state.channelsOf('new'), ['#other'])
+        self.assertFalse(self.state.isOn('new', '#test'))
+
+        feed(self.state, ':new!ident@example.com QUIT :gone')
+        self.assertIsNone(self.state.user('new'))
+        self.assertEqual(self.state.members('#other'), ['bot'])
+
+    def test_join_of_unknown_channel_is_ignored(self):
+        feed(self.state, ':someone!u@h JOIN #elsewhere')
+        self.assertIsNone(self.state.channel('#elsewhere'))
+        self.assertIsNone(self.state.user('someone'))
+
+    def test_nick_change(self):
+        feed(self.state, ':Voiced!v@h NICK :Renamed')
+        self.assertIsNone(self.state.user('voiced'))
+        self.assertEqual(self.state.user('renamed').nick, 'Renamed')
+        self.assertEqual(self.state.modes('renamed', '#test'), 'v')
+
+        feed(self.state, ':bot!b@host NICK bot2')
+        self.assertEqual(self.state.nick, 'bot2')
+        self.assertTrue(self.state.isOn('bot2', '#test'))
+
+    def test_own_part_drops_channel(self):
+        feed(self.state, ':bot!b@host JOIN #other', ':server 353 bot = #other :bot Op Lonely')
+        feed(self.state, ':bot!b@host PART #test')
+        self.assertIsNone(self.state.channel('#test'))
+        self.assertIsNone(self.state.user('voiced'))
+        self.assertEqual(self.state.channelsOf('op'), ['#other'])
+        self.assertEqual(self.state.modes('op', '#other'), '')
+
+    def test_mode(self):
+        feed(self.state, ':op!o@h MODE #test +ov-v+kl Plain[1] Plain[1] Voiced secret 10')
+        self.assertEqual(self.state.modes('plain[1]', '#test'), 'ov')
+        self.assertEqual(self.state.modes('voiced', '#test'), '')
+        feed(self.state, ':op!o@h MODE #test -k+b-o secret *!*@spam Plain[1]')
+        self.assertEqual(self.state.modes('plain[1]', '#test'), 'v')
+
+    def test_isupport(self):
+        state = StateTracker()
+        feed(state,
+             ':server 001 bot :Welcome',
+             ':server 005 bot CASEMAPPING=ascii PREFIX=(qaohv)~&@%+ CHANMODES=beI,k,l,imnpst :are supported',
+             ':bot!b@host JOIN #test',
+             ':server 353 bot = #test :~Owner @%Both Nick[1]!u@h',
+             ':op!o@h MODE #test +h Owner')
+        self.assertEqual(state.modes('owner', '#test'), 'qh')
+        self.assertEqual(state.modes('both', '#test'), 'oh')
+        self.assertIsNone(state.user('nick{1}'))
+        self.assertEqual(state.user('nick[1]').host, 'h')
+
+    def test_casemapping_change_rekeys(self):
+        self.state.setCasemapping('ascii')
+        self.assertIsNone(self.state.user('plain{1}'))
+        self.assertTrue(self.state.isOn('plain[1]', '#test'))
+
+    def test_shared_keys(self):
+        feed(self.state, ':bot!b@host JOIN #other', ':server 353 bot = #other :Op')
+        userKey = next(key for key in self.state.users if key == 'op')
+        for channel in self.state.channels.values():
+            memberKey = next(key for key in channel.members if key == 'op')
+            self.assertIs(memberKey, userKey)
+
+
+class TestIRCSDKState(unittest.TestCase):
+
+    def test_track_state(self):
+        irc = IRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, nick='bot', ssl=False, trackState=True))
+        irc.irc = MagicMock()
+        irc.handle_raw_message(b':bot!b@h JOIN #test\r\n:server 353 bot = #test :bot @op\r\n')
+        self.assertEqual(irc.state.modes('op', '#test'), 'o')
+
+        irc.event.emit('disconnected', 'Connection lost')
+        self.assertEqual(irc.state.channels, {})
+
+    def test_off_by_default(self):
+        irc = IRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, nick='bot', ssl=False))
+        self.assertIsNone(irc.state)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -88,7 +88,7 @@ class TestHighVolumeMessages(unittest.TestCase):
         # Should have received all messages (PRIVMSG + PING + JOIN + PART + 376)
         self.assertEqual(len(received_messages), 401)
         # Should have 50 PONG responses
-        self.assertEqual(self.irc.irc.send.call_count, 50)
+        self.assertEqual(self.irc.irc.sendall.call_count, 50)
         # Should have triggered connected event
         self.assertEqual(len(connected_events), 1)
 
@@ -322,11 +322,11 @@ class TestBufferHandling(unittest.TestCase):
     def test_buffer_state_preserved(self):
         """Test that buffer state is preserved across calls"""
         self.irc.handle_raw_message(b'PING :incomplete')
-        self.assertEqual(self.irc._recv_buffer, 'PING :incomplete')
+        self.assertEqual(self.irc._framer.pending(), b'PING :incomplete')
 
         self.irc.handle_raw_message(b'_server\r\n')
-        self.assertEqual(self.irc._recv_buffer, '')
-        self.irc.irc.send.assert_called_once_with(b'PONG incomplete_server\r\n')
+        self.assertEqual(self.irc._framer.pending(), b'')
+        self.irc.irc.sendall.assert_called_once_with(b'PONG incomplete_server\r\n')
 
 
 if __name__ == '__main__':
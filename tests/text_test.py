@@ -0,0 +1,31 @@
+import unittest
+
+from pyircsdk.text import splitText
+
+
+class TestSplitText(unittest.TestCase):
+
+    def test_short_text_is_kept(self):
+        self.assertEqual(splitText('hello world', 100), ['hello world'])
+
+    def test_line_breaks_start_new_chunks(self):
+        self.assertEqual(splitText('one\r\ntwo\rthree\n\nfour\n', 100), ['one', 'two', 'three', 'four'])
+
+    def test_splits_on_spaces(self):
+        chunks = splitText('aaaa bbbb cccc dddd', 10)
+        self.assertEqual(chunks, ['aaaa bbbb', 'cccc dddd'])
+
+    def test_never_splits_a_character(self):
+        text = 'é' * 50 + '😀' * 50
+        chunks = splitText(text, 11)
+        self.assertEqual(''.join(chunks), text)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk.encode('utf-8')), 11)
+
+    def test_too_small(self):
+        with self.assertRaises(ValueError):
+            splitText('abc', 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
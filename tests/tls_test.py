@@ -0,0 +1,201 @@
+import asyncio
+import socket
+import ssl
+import threading
+import time
+import unittest
+
+from benchmarks.harness import FakeIRCServer, selfSignedContext, traffic
+from pyircsdk import AsyncIRCSDK, ConnectionManager, IRCSDK, IRCSDKConfig
+from pyircsdk.tls import ResumingContext, clientContext, sharedContext
+
+
+def make_config(port, **options):
+    return IRCSDKConfig(host='127.0.0.1', port=port, nick='bot', user='bot', realname='bot', ssl=True,
+                        allowAnySSL=True, caps=[], pingInterval=0, metrics=True, **options)
+
+
+class TestContexts(unittest.TestCase):
+
+    def test_client_context_defaults(self):
+        context = clientContext()
+        self.assertIsInstance(context, ResumingContext)
+        self.assertTrue(context.check_hostname)
+        self.assertEqual(context.verify_mode, ssl.CERT_REQUIRED)
+
+    def test_shared_context_per_settings(self):
+        self.assertIs(sharedContext(True), sharedContext(True))
+        self.assertIsNot(sharedContext(True), sharedContext(False))
+        self.assertIsNot(clientContext(True), clientContext(True))
+
+    def test_config_selects_context(self):
+        first = IRCSDK(make_config(6697, sslShareContext=True))
+        second = IRCSDK(make_config(6697, sslShareContext=True))
+        own = IRCSDK(make_config(6697))
+        self.assertIs(first.sslContext, second.sslContext)
+        self.assertIsNot(first.sslContext, own.sslContext)
+        self.assertFalse(own.sslContext.check_hostname)
+
+
+class TestSessionResumption(unittest.TestCase):
+    """Each client is dropped after its first batch and resumes its TLS session on the reconnect"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.serverContext = selfSignedContext()
+
+    def setUp(self):
+        lines = traffic.privmsgStorm(250)
+        self.server = FakeIRCServer(traffic=lambda nick: lines, dropAfter=100,
+                                    sslContext=self.serverContext).start_in_thread()
+        self.addCleanup(self.server.stop)
+
+    def track(self, irc, done):
+        def on_message(message):
+            if message.prefix == 'bench' and message.trailing == 'done':
+                done()
+        irc.event.on('message', on_message)
+
+    def assertResumed(self, irc):
+        counters = irc.getMetrics()['counters']
+        histograms = irc.getMetrics()['histograms']
+        self.assertEqual(histograms['tls_handshake_seconds']['count'], 3)
+        self.assertEqual(counters['tls_resumed_total'], 2)
+        self.assertIn('127.0.0.1', irc.sslContext.sessions)
+
+    def test_blocking(self):
+        irc = IRCSDK(make_config(self.server.port, autoReconnect=True, reconnectDelay=0.01))
+        done = threading.Event()
+        self.track(irc, done.set)
+        threading.Thread(target=irc.connect, daemon=True).start()
+        self.assertTrue(done.wait(10))
+        self.assertResumed(irc)
+
+    def test_asyncio(self):
+        async def main():
+            irc = AsyncIRCSDK(make_config(self.server.port, autoReconnect=True, reconnectDelay=0.01))
+            done = asyncio.Event()
+            self.track(irc, done.set)
+            task = asyncio.ensure_future(irc.connect())
+            await asyncio.wait_for(done.wait(), 10)
+            task.cancel()
+            return irc
+
+        self.assertResumed(asyncio.run(main()))
+
+    def test_manager(self):
+        manager = ConnectionManager()
+        irc = manager.add(make_config(self.server.port, autoReconnect=True, reconnectDelay=0.01))
+        self.track(irc, manager.stop)
+        manager.run()
+        self.assertResumed(irc)
+
+
+class TestBlockingTLSReads(unittest.TestCase):
+
+    def test_bytes_left_in_the_ssl_object_are_read(self):
+        # A 16000 byte record then a 1000 byte one: the first batch fills the 16 KiB buffer part way into the
+        # second record, and the rest sits decrypted in the SSL object with nothing left on the socket
+        serverContext = selfSignedContext()
+        listener = socket.create_server(('127.0.0.1', 0))
+        self.addCleanup(listener.close)
+        first = b''.join(b':n!u@h PRIVMSG #c :%s\r\n' % (b'%03d' % i).ljust(79, b'x') for i in range(160))
+        second = b':n!u@h PRIVMSG #c :%s\r\n' % (b'y' * 954) + b':n!u@h PRIVMSG #c :last\r\n'
+        self.assertEqual((len(first), len(second)), (16000, 1000))
+        connections = []
+
+        def serve():
+            conn = serverContext.wrap_socket(listener.accept()[0], server_side=True)
+            connections.append(conn)
+            time.sleep(0.2)  # let the client reach select() with nothing buffered
+            conn.sendall(first)
+            conn.sendall(second)
+        threading.Thread(target=serve, daemon=True).start()
+
+        irc = IRCSDK(IRCSDKConfig(host='127.0.0.1', port=listener.getsockname()[1], nick='bot', user='bot',
+                                  realname='bot', ssl=True, allowAnySSL=True, caps=[], pingInterval=0))
+        received = threading.Event()
+        irc.event.on('message', lambda message: message.trailing == 'last' and received.set())
+        threading.Thread(target=irc.connect, daemon=True).start()
+        try:
+            self.assertTrue(received.wait(5))
+        finally:
+            irc._closing = True
+            for conn in connections:
+                conn.close()
+
+
+
+def ipv6Available():
+    try:
+        with socket.socket(socket.AF_INET6) as sock:
+            sock.bind(('::1', 0))
+        return True
+    except OSError:
+        return False
+
+
+@unittest.skipUnless(ipv6Available(), 'needs IPv6')
+class TestIPv6Servers(unittest.TestCase):
+    """A '[::1]:port' entry in servers connects over IPv6 with and without TLS"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.serverContext = selfSignedContext()
+
+    def start(self, tls):
+        server = FakeIRCServer(host='::1', messages=1, sslContext=self.serverContext if tls else None)
+        self.addCleanup(server.stop)
+        return server.start_in_thread()
+
+    def config(self, server, tls):
+        return IRCSDKConfig(host='::1', port=6667, nick='bot', user='bot', realname='bot', ssl=tls, allowAnySSL=True,
+                            caps=[], pingInterval=0, servers=['[::1]:%d' % server.port], connectRetries=1)
+
+    def done(self, irc, callback):
+        irc.event.on('message', lambda message: message.prefix == 'bench' and message.trailing == 'done'
+                     and callback())
+
+    def test_blocking(self):
+        for tls in (False, True):
+            with self.subTest(tls=tls):
+                irc = IRCSDK(self.config(self.start(tls), tls))
+                families = []
+                self.done(irc, lambda: families.append(irc.irc.family) or irc.close())
+                thread = threading.Thread(target=irc.connect, daemon=True)
+                thread.start()
+                thread.join(5)
+                self.assertFalse(thread.is_alive())
+                self.assertEqual(families, [socket.AF_INET6])
+
+    def test_asyncio(self):
+        async def main(server, tls):
+            irc = AsyncIRCSDK(self.config(server, tls))
+            done = asyncio.Event()
+            self.done(irc, done.set)
+            task = asyncio.ensure_future(irc.connect())
+            try:
+                await asyncio.wait_for(done.wait(), 5)
+                return irc.irc.get_extra_info('socket').family
+            finally:
+                task.cancel()
+
+        for tls in (False, True):
+            with self.subTest(tls=tls):
+                self.assertEqual(asyncio.run(main(self.start(tls), tls)), socket.AF_INET6)
+
+    def test_manager(self):
+        for tls in (False, True):
+            with self.subTest(tls=tls):
+                manager = ConnectionManager()
+                irc = manager.add(self.config(self.start(tls), tls))
+                families = []
+                self.done(irc, lambda: families.append(irc.irc.family) or manager.stop())
+                thread = threading.Thread(target=manager.run, daemon=True)
+                thread.start()
+                thread.join(5)
+                self.assertFalse(thread.is_alive())
+                self.assertEqual(families, [socket.AF_INET6])
+
+if __name__ == '__main__':
+    unittest.main()
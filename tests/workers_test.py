@@ -0,0 +1,211 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from pyircsdk import IRCSDK, IRCSDKConfig, Module
+from pyircsdk.parser import parse
+from pyircsdk.workers import HandlerPool
+
+
+class RecordingModule(Module):
+    ircCommands = ('PRIVMSG',)
+    executor = 'thread'
+
+    def __init__(self, irc, gate=None, delay=0):
+        super().__init__(irc, '', '')
+        self.gate = gate
+        self.delay = delay
+        self.handled = []
+        self.threads = set()
+        self.errors = []
+        self.done = threading.Semaphore(0)
+
+    def handleCommand(self, message, command):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.delay:
+            time.sleep(self.delay)
+        self.threads.add(threading.current_thread().name)
+        self.handled.append((message.messageTo, message.message))
+        self.done.release()
+
+    def handleError(self, message, command, error):
+        self.errors.append(error)
+        self.done.release()
+
+
+class SquareModule(Module):
+    ircCommands = ('PRIVMSG',)
+    executor = 'process'
+    workers = 2
+
+    def __init__(self, irc):
+        super().__init__(irc, '!', 'square')
+        self.results = []
+        self.done = threading.Semaphore(0)
+
+    def handleCommand(self, message, command):
+        pass
+
+    @classmethod
+    def processCommand(cls, message, command):
+        return int(command.args[0]) ** 2
+
+    def handleResult(self, message, command, result):
+        self.results.append(result)
+        self.done.release()
+
+    def handleError(self, message, command, error):
+        self.results.append(error)
+        self.done.release()
+
+
+def privmsg(target, text):
+    return parse(':nick!user@host PRIVMSG %s :%s' % (target, text))
+
+
+class TestHandlerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.irc = IRCSDK(IRCSDKConfig(host='irc.example.com', port=6667, ssl=False))
+        self.irc.irc = MagicMock()
+        self.modules = []
+
+    def tearDown(self):
+        for module in self.modules:
+            module.stopListening()
+
+    def start(self, module):
+        module.startListening()
+        self.modules.append(module)
+        return module
+
+    def test_slow_handler_does_not_block_ping(self):
+        gate = threading.Event()
+        module = self.start(RecordingModule(self.irc, gate))
+
+        start = time.monotonic()
+        self.irc.handle_raw_message(b':n!u@h PRIVMSG #a :slow\r\nPING :server\r\n')
+
+        self.assertLess(time.monotonic() - start, 1)
+        self.irc.irc.sendall.assert_called_once_with(b'PONG server\r\n')
+        gate.set()
+        self.assertTrue(module.done.acquire(timeout=5))
+        self.assertNotIn(threading.current_thread().name, module.threads)
+
+    def test_per_channel_ordering(self):
+        module = RecordingModule(self.irc, delay=0.001)
+        module.workers = 4
+        self.start(module)
+
+        for i in range(20):
+            for channel in ('#a', '#b'):
+                module.dispatchCommand(privmsg(channel, str(i)), None)
+        for _ in range(40):
+            self.assertTrue(module.done.acquire(timeout=5))
+
+        for channel in ('#a', '#b'):
+            self.assertEqual([text for target, text in module.handled if target == channel],
+                             [str(i) for i in range(20)])
+
+    def test_drop_newest(self):
+        gate = threading.Event()
+        module = RecordingModule(self.irc, gate)
+        module.workers, module.maxQueue, module.overflow = 1, 2, 'drop_newest'
+        self.start(module)
+
+        for i in range(5):
+            module.dispatchCommand(privmsg('#a', str(i)), None)
+        gate.set()
+        for _ in range(3):
+            self.assertTrue(module.done.acquire(timeout=5))
+
+        self.assertEqual([text for _, text in module.handled], ['0', '1', '2'])
+        self.assertEqual(module.pool.dropped, 2)
+
+    def test_drop_oldest(self):
+        gate = threading.Event()
+        module = RecordingModule(self.irc, gate)
+        module.workers, module.maxQueue, module.overflow = 1, 2, 'drop_oldest'
+        self.start(module)
+
+        for i in range(5):
+            module.dispatchCommand(privmsg('#a', str(i)), None)
+        gate.set()
+        for _ in range(3):
+            self.assertTrue(module.done.acquire(timeout=5))
+
+        self.assertEqual([text for _, text in module.handled], ['0', '3', '4'])
+        self.assertEqual(module.pool.dropped, 2)
+
+    def test_block_waits_for_space(self):
+        module = RecordingModule(self.irc, delay=0.02)
+        module.workers, module.maxQueue, module.overflow = 1, 1, 'block'
+        self.start(module)
+
+        for i in range(4):
+            module.dispatchCommand(privmsg('#a', str(i)), None)
+        for _ in range(4):
+            self.assertTrue(module.done.acquire(timeout=5))
+
+        self.assertEqual([text for _, text in module.handled], ['0', '1', '2', '3'])
+        self.assertEqual(module.pool.dropped, 0)
+
+    def test_timeout_reports_error_and_keeps_the_channel_until_done(self):
+        gate = threading.Event()
+        module = RecordingModule(self.irc, gate)
+        module.handlerTimeout = 0.05
+        self.start(module)
+
+        module.dispatchCommand(privmsg('#a', 'stuck'), None)
+        module.dispatchCommand(privmsg('#a', 'next'), None)
+        self.assertTrue(module.done.acquire(timeout=5))
+
+        self.assertIsInstance(module.errors[0], TimeoutError)
+        self.assertEqual(module.pool.timedOut, 1)
+        self.assertEqual(module.pool.hung, 1)
+        self.assertEqual(module.pool.pending, 1)  # 'next' waits for 'stuck' to really finish
+        gate.set()
+        for _ in range(2):
+            self.assertTrue(module.done.acquire(timeout=5))
+        self.assertEqual([text for _, text in module.handled], ['stuck', 'next'])
+        self.assertEqual(module.pool.hung, 0)
+
+    def test_hung_handlers_still_count_against_the_queue(self):
+        gate = threading.Event()
+        module = RecordingModule(self.irc, gate)
+        module.workers = 1
+        module.maxQueue = 2
+        module.overflow = 'drop_newest'
+        module.handlerTimeout = 0.05
+        self.start(module)
+
+        for i in range(40):
+            module.dispatchCommand(privmsg('#%d' % i, str(i)), None)
+            time.sleep(0.005)
+        self.assertTrue(module.done.acquire(timeout=5))
+
+        self.assertGreater(module.pool.dropped, 0)
+        self.assertEqual(module.pool.pending, 2)
+        self.assertEqual(module.pool.executor._work_queue.qsize(), 0)
+        gate.set()
+
+    def test_process_executor(self):
+        module = self.start(SquareModule(self.irc))
+
+        self.irc.handle_raw_message(b':n!u@h PRIVMSG #a :!square 7\r\n:n!u@h PRIVMSG #b :!square 3\r\n')
+        for _ in range(2):
+            self.assertTrue(module.done.acquire(timeout=10))
+
+        self.assertEqual(sorted(module.results), [9, 49])
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            HandlerPool(None, executor='fiber')
+        with self.assertRaises(ValueError):
+            HandlerPool(None, overflow='explode')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import socket
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from pyircsdk import IRCSDK, IRCSDKConfig
+from pyircsdk.writer import (PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, SendQueue, TokenBucket, Writer,
+                             linePriority, popReady, sendLines)
+
+
+class TestTokenBucketMethods(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(2.0, 3)
+        now = time.monotonic()
+        for _ in range(3):
+            self.assertEqual(bucket.delay(now), 0)
+            bucket.consume()
+        self.assertAlmostEqual(bucket.delay(now), 0.5, places=2)
+        self.assertEqual(bucket.delay(now + 0.5), 0)
+
+    def test_unlimited(self):
+        bucket = TokenBucket(0, 1)
+        for _ in range(100):
+            self.assertEqual(bucket.delay(time.monotonic()), 0)
+            bucket.consume()
+
+
+class TestSendQueueMethods(unittest.TestCase):
+
+    def test_line_priority(self):
+        self.assertEqual(linePriority(b'PONG :x\r\n'), PRIORITY_HIGH)
+        self.assertEqual(linePriority(b'quit :bye\r\n'), PRIORITY_HIGH)
+        self.assertEqual(linePriority(b'PRIVMSG #c :hi\r\n'), PRIORITY_LOW)
+        self.assertEqual(linePriority(b'JOIN #c\r\n'), PRIORITY_NORMAL)
+
+    def test_high_priority_goes_first(self):
+        queue = SendQueue(0, 5)
+        queue.put(b'PRIVMSG #c :1\r\n', PRIORITY_LOW)
+        queue.put(b'JOIN #c\r\n', PRIORITY_NORMAL)
+        queue.put(b'PONG :x\r\n', PRIORITY_HIGH)
+        now = time.monotonic()
+        self.assertEqual([queue.pop(now)[0] for _ in range(3)],
+                         [b'PONG :x\r\n', b'JOIN #c\r\n', b'PRIVMSG #c :1\r\n'])
+        self.assertEqual(queue.pop(now), (None, None))
+
+    def test_unpaced_by_default(self):
+        queue = SendQueue()
+        for i in range(20):
+            queue.put(b'PRIVMSG #c :%d\r\n' % i, PRIORITY_LOW)
+        now = time.monotonic()
+        self.assertEqual([queue.pop(now)[1] for _ in range(20)], [None] * 20)
+        self.assertEqual(queue.depth, 0)
+
+    def test_rate_limited_lines_wait_but_pong_does_not(self):
+        queue = SendQueue(1.0, 1)
+        now = time.monotonic()
+        queue.put(b'PRIVMSG #c :1\r\n', PRIORITY_LOW)
+        queue.put(b'PRIVMSG #c :2\r\n', PRIORITY_LOW)
+        self.assertEqual(queue.pop(now)[0], b'PRIVMSG #c :1\r\n')
+        data, delay = queue.pop(now)
+        self.assertIsNone(data)
+        self.assertGreater(delay, 0)
+
+        queue.put(b'PONG :x\r\n', PRIORITY_HIGH)
+        self.assertEqual(queue.pop(now)[0], b'PONG :x\r\n')
+
+    def test_cap_handshake_is_not_counted(self):
+        queue = SendQueue(1.0, 1)
+        now = time.monotonic()
+        queue.put(b'CAP LS 302\r\n', linePriority(b'CAP LS 302\r\n'))
+        queue.put(b'AUTHENTICATE PLAIN\r\n', linePriority(b'AUTHENTICATE PLAIN\r\n'))
+        queue.put(b'NICK bot\r\n', PRIORITY_NORMAL)
+        self.assertEqual([queue.pop(now)[0] for _ in range(3)],
+                         [b'CAP LS 302\r\n', b'AUTHENTICATE PLAIN\r\n', b'NICK bot\r\n'])
+
+    def test_stats(self):
+        queue = SendQueue(0, 5)
+        for i in range(3):
+            queue.put(b'PRIVMSG #c :%d\r\n' % i, PRIORITY_LOW)
+        self.assertEqual(queue.stats()['depth'], 3)
+        queue.pop(time.monotonic())
+        stats = queue.stats()
+        self.assertEqual(stats['depth'], 2)
+        self.assertEqual(stats['depthByPriority'], [0, 0, 2])
+        self.assertEqual(stats['maxDepth'], 3)
+        self.assertEqual(stats['sent'], 1)
+        self.assertGreaterEqual(stats['waitMax'], 0)
+
+
+class TestWriterMethods(unittest.TestCase):
+
+    def test_writer_drains_queue_with_sendall(self):
+        left, right = socket.socketpair()
+        writer = Writer(left, SendQueue(0, 5))
+        writer.start()
+        try:
+            writer.put(b'JOIN #a\r\n', PRIORITY_NORMAL)
+            writer.put(b'JOIN #b\r\n', PRIORITY_NORMAL)
+            right.settimeout(2)
+            received = b''
+            while received.count(b'\r\n') < 2:
+                received += right.recv(1024)
+            self.assertEqual(received, b'JOIN #a\r\nJOIN #b\r\n')
+        finally:
+            writer.stop()
+            left.close()
+            right.close()
+
+    def test_ready_lines_go_out_in_one_sendmsg(self):
+        queue = SendQueue(0, 5)
+        for i in range(3):
+            queue.put(b'PRIVMSG #c :%d\r\n' % i, PRIORITY_LOW)
+        first, _ = queue.pop(time.monotonic())
+        lines = popReady(queue, first, time.monotonic())
+        self.assertEqual(len(lines), 3)
+
+        sock = MagicMock(spec=socket.socket)
+        sock.sendmsg.return_value = 5  # a partial write
+        sendLines(sock, lines)
+        sock.sendmsg.assert_called_once_with(lines)
+        sock.sendall.assert_called_once_with(b''.join(lines)[5:])
+
+        other = MagicMock()
+        sendLines(other, lines)
+        other.sendall.assert_called_once_with(b''.join(lines))
+
+    def test_popReady_respects_the_bucket(self):
+        queue = SendQueue(1, 2)
+        for i in range(5):
+            queue.put(b'PRIVMSG #c :%d\r\n' % i, PRIORITY_LOW)
+        now = time.monotonic()
+        first, _ = queue.pop(now)
+        self.assertEqual(len(popReady(queue, first, now)), 2)
+
+    def test_send_does_not_block_caller_when_rate_limited(self):
+        config = IRCSDKConfig(host='irc.example.com', port=6667, ssl=False, sendRate=1, sendBurst=1)
+        irc = IRCSDK(config)
+        irc.irc = MagicMock()
+        sent = threading.Event()
+        irc.irc.sendall.side_effect = lambda data: sent.set()
+        irc._startWriter()
+        try:
+            start = time.monotonic()
+            for i in range(50):
+                irc.privmsg('#c', 'line %d' % i)
+            self.assertLess(time.monotonic() - start, 0.5)
+            self.assertTrue(sent.wait(2))
+            self.assertGreater(irc.sendQueue.depth, 40)
+        finally:
+            irc._stopWriter()
+
+    def test_close_sends_quit_immediately(self):
+        config = IRCSDKConfig(host='irc.example.com', port=6667, nick='bot', ssl=False, sendRate=1, sendBurst=1)
+        irc = IRCSDK(config)
+        irc.irc = MagicMock()
+        irc._startWriter()
+        for i in range(10):
+            irc.privmsg('#c', 'line %d' % i)
+        irc.close()
+
+        irc.irc.sendall.assert_called_with(b'QUIT :bot\r\n')
+        self.assertIsNone(irc._writer)
+        irc.irc.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()